@@ -0,0 +1,115 @@
+"""
+Parse-throughput benchmark of the JavaScript/TypeScript parser backends.
+
+Generates synthetic JS modules (plus TypeScript copies and one deeply
+nested bundle) and parses them in a single process with each available
+backend, reporting files and megabytes per second:
+
+    python -m benchmarks.bench_parsers --files 2000 --output parsers.json
+
+Sources are read before timing starts, so only parsing is measured. A
+backend that gives up on a file (esprima on the nested bundle, which
+exceeds its own recursion limit) reports no functions for it.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+def _nested_bundle(path: str, depth: int):
+    # A callback pyramid like the ones minified bundles contain
+    with open(path, "w") as f:
+        f.write("export function outer(cb) {\n")
+        f.write("".join(f"{'  ' * i}cb(function (a{i}) {{ if (a{i}) {{\n" for i in range(depth)))
+        f.write("".join(f"{'  ' * i}}} }});\n" for i in reversed(range(depth))))
+        f.write("}\n")
+
+def make_corpus(root: str, n_files: int, depth: int) -> dict[str, list[str]]:
+    from benchmarks.synthetic import make_repo
+
+    js_files = make_repo(os.path.join(root, "js"), n_files, js_ratio=1.0)
+    ts_files = []
+    for path in js_files:
+        # Plain JavaScript is valid TypeScript
+        ts_path = path.replace(os.path.join(root, "js"), os.path.join(root, "ts"), 1)[:-3] + ".ts"
+        os.makedirs(os.path.dirname(ts_path), exist_ok=True)
+        shutil.copyfile(path, ts_path)
+        ts_files.append(ts_path)
+    bundle = os.path.join(root, "bundle.js")
+    _nested_bundle(bundle, depth)
+    return {"js": js_files, "ts": ts_files, "nested": [bundle]}
+
+def bench(parser, files: list[str]) -> dict:
+    from docuai.source import sources
+
+    size = sum(len(sources.text(path).encode("utf-8")) for path in files)
+    errors = 0
+    functions = 0
+    start = time.perf_counter()
+    for path in files:
+        try:
+            metadata = parser.parse_compact(path)
+            functions += len(metadata.function_names)
+        except Exception:
+            errors += 1
+    seconds = time.perf_counter() - start
+    return {
+        "files": len(files),
+        "seconds": round(seconds, 4),
+        "files_per_second": round(len(files) / seconds, 1) if seconds else None,
+        "mb_per_second": round(size / 1e6 / seconds, 2) if seconds else None,
+        "functions": functions,
+        "errors": errors,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000, help="Synthetic JS files to generate.")
+    parser.add_argument("--depth", type=int, default=2000, help="Nesting depth of the bundle file.")
+    parser.add_argument("--work-dir", default=None, help="Where the corpus is generated.")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    from docuai.parsers.js_parser import JSParser
+    from docuai.parsers import ts_parser
+
+    work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), "docuai-bench-parsers")
+    print(f"Generating {args.files} synthetic files...", file=sys.stderr)
+    corpus = make_corpus(work_dir, args.files, args.depth)
+
+    backends = {"esprima": JSParser()}
+    if ts_parser.available():
+        backends["tree-sitter"] = ts_parser.TreeSitterParser()
+    else:
+        print('tree-sitter is not installed (pip install "docuai[tree-sitter]"); skipping it', file=sys.stderr)
+
+    results = []
+    for name, backend in backends.items():
+        for kind, files in corpus.items():
+            result = {"backend": name, "corpus": kind, **bench(backend, files)}
+            results.append(result)
+            print(
+                f"{name:<12} {kind:<7} {result['files']:>6} files  {result['seconds']:>8.3f}s  "
+                f"{result['files_per_second'] or 0:>9.1f} files/s  {result['mb_per_second'] or 0:>7.2f} MB/s  "
+                f"{result['functions']:>7} functions  {result['errors']} errors",
+                file=sys.stderr
+            )
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
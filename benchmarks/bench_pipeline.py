@@ -0,0 +1,165 @@
+"""
+Offline benchmark of DocuAI's own overhead.
+
+Generates synthetic repositories, swaps ChatOpenAI for a deterministic local
+stand-in, and measures each stage in a fresh subprocess so peak RSS is per
+stage:
+
+    python -m benchmarks.bench_pipeline --sizes 10,1000,10000 --output bench.json
+    python -m benchmarks.bench_pipeline --sizes 1000 --compare old.json
+
+Stages: discover, parse, prompt, generate, analyze, generate-mapreduce.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+STAGES = ["discover", "parse", "prompt", "generate", "analyze", "generate-mapreduce"]
+
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _fake_agent(args):
+    from docuai.agent import DocuAIAgent
+    from benchmarks.fake_llm import FakeChatModel
+    llm = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens)
+    return DocuAIAgent(llm=llm)
+
+def _run_cli(cli_args: list[str], args):
+    # Drive the real Typer commands, with the agent's model replaced by the fake
+    import docuai.cli as cli
+    from typer.testing import CliRunner
+    cli.build_agent = lambda *a, **k: _fake_agent(args)
+    result = CliRunner().invoke(cli.app, cli_args)
+    if result.exit_code != 0:
+        raise RuntimeError(result.output)
+
+def run_stage(stage: str, repo: str, args) -> dict:
+    from docuai.git_utils import get_repo_files
+    from docuai.parsers.pool import parse_files
+
+    rss_before = _peak_rss_kb()
+    extra = {}
+    out_dir = tempfile.mkdtemp(prefix="docuai-bench-out-")
+    start = time.perf_counter()
+    try:
+        if stage == "discover":
+            extra["files"] = sum(1 for _ in get_repo_files(repo))
+        elif stage == "parse":
+            files = list(get_repo_files(repo))
+            errors = sum(1 for _, _, error in parse_files(files, args.workers) if error)
+            extra.update(files=len(files), errors=errors)
+        elif stage == "prompt":
+            files = list(get_repo_files(repo))
+            metadata = [m for _, m, _ in parse_files(files, args.workers) if m is not None]
+            agent = _fake_agent(args)
+            start = time.perf_counter()  # only time prompt construction
+            chars = sum(len(agent.doc_prompt.format(**agent._doc_inputs(m))) for m in metadata)
+            extra.update(prompts=len(metadata), prompt_chars=chars)
+        elif stage == "generate":
+            _run_cli(["generate", repo, "--per-file", "--no-cache", "--jobs", str(args.jobs), "--output", out_dir], args)
+        elif stage == "analyze":
+            _run_cli(["analyze", repo, "--per-file", "--no-cache", "--jobs", str(args.jobs), "--output", out_dir], args)
+        elif stage == "generate-mapreduce":
+            out_path = os.path.join(out_dir, "report.md")
+            _run_cli(["generate", repo, "--map-reduce", "--no-cache", "--jobs", str(args.jobs), "--output", out_path], args)
+        else:
+            raise ValueError(f"Unknown stage: {stage}")
+        seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    return {"stage": stage, "seconds": round(seconds, 4), "rss_before_kb": rss_before, "peak_rss_kb": _peak_rss_kb(), **extra}
+
+def _child_main(args):
+    print(json.dumps(run_stage(args.child, args.repo, args)))
+
+def _version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("docuai")
+    except Exception:
+        return "unknown"
+
+def compare(results: list[dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(r["files"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"\n{'files':>8}  {'stage':<20} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for r in results:
+        old = baseline.get((r["files"], r["stage"]))
+        if old and old["seconds"]:
+            print(f"{r['files']:>8}  {r['stage']:<20} {old['seconds']:>11.3f} {r['seconds']:>10.3f} {r['seconds'] / old['seconds']:>7.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated repository sizes in files.")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake model time to first token, in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Fake model output speed (0 = instant).")
+    parser.add_argument("--output-tokens", type=int, default=200, help="Fake model response length.")
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--work-dir", default=None, help="Where synthetic repositories are generated (kept between runs).")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file.")
+    parser.add_argument("--compare", default=None, help="Baseline JSON results to compare against.")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--repo", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child_main(args)
+        return
+
+    from benchmarks.synthetic import make_repo
+
+    work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), "docuai-bench-repos")
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "benchmark"))
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        repo = os.path.join(work_dir, f"repo-{size}")
+        if not os.path.isdir(repo):
+            print(f"Generating synthetic repository with {size} files...", file=sys.stderr)
+            make_repo(repo, size)
+
+        for stage in args.stages.split(","):
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_pipeline", "--child", stage, "--repo", repo,
+                "--latency", str(args.latency), "--tokens-per-second", str(args.tokens_per_second),
+                "--output-tokens", str(args.output_tokens), "--jobs", str(args.jobs), "--workers", str(args.workers),
+            ]
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"{stage} on {size} files failed:\n{out.stderr}", file=sys.stderr)
+                continue
+            result = {"files": size, **json.loads(out.stdout.strip().splitlines()[-1])}
+            results.append(result)
+            print(f"{size:>8} files  {stage:<20} {result['seconds']:>9.3f}s  peak RSS {result['peak_rss_kb'] / 1024:>7.1f} MB", file=sys.stderr)
+
+    report = {
+        "docuai_version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {k: getattr(args, k) for k in ("latency", "tokens_per_second", "output_tokens", "jobs", "workers")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
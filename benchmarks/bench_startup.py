@@ -0,0 +1,102 @@
+"""
+CLI startup benchmark with a latency budget, for CI and pre-commit loops.
+
+Measures, each in fresh interpreters, the time to import `docuai.cli` (from
+`python -X importtime`) and the wall time of `docuai --help`, and checks that
+no heavy dependency (the LLM stack, parser backends, pydantic) is imported
+just to start the CLI. Exits non-zero when the median import time exceeds
+the budget or a heavy module is loaded:
+
+    python -m benchmarks.bench_startup --budget-ms 400
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+# Modules that must only load once a command actually needs them
+HEAVY_MODULES = (
+    "docuai.agent", "docuai.mapreduce", "langchain", "langchain_core", "langchain_openai", "openai",
+    "esprima", "tree_sitter", "tiktoken", "pydantic",
+)
+DEFAULT_BUDGET_MS = 400
+
+def import_times() -> dict[str, tuple[int, int]]:
+    """
+    Returns module -> (self, cumulative) microseconds for one import of docuai.cli.
+    """
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import docuai.cli"],
+        capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+def help_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import sys; sys.argv[0] = 'docuai'; from docuai.cli import app; app()", "--help"],
+        capture_output=True, check=True
+    )
+    return time.perf_counter() - start
+
+def loaded_heavy_modules() -> list[str]:
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, json, docuai.cli; print(json.dumps(sorted(sys.modules)))"],
+        capture_output=True, text=True, check=True
+    )
+    modules = json.loads(out.stdout)
+    return sorted({m.split(".")[0] if not m.startswith("docuai.") else m for m in modules
+                   if any(m == heavy or m.startswith(heavy + ".") for heavy in HEAVY_MODULES)})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement; the median is reported.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time of docuai.cli.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules (by self time) to list.")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    runs = [import_times() for _ in range(args.runs)]
+    import_ms = statistics.median(r["docuai.cli"][1] for r in runs) / 1000
+    help_ms = statistics.median(help_seconds() for _ in range(args.runs)) * 1000
+    heavy = loaded_heavy_modules()
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    print(f"import docuai.cli  {import_ms:>8.1f} ms  (budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+    print(f"docuai --help      {help_ms:>8.1f} ms  (including interpreter startup)", file=sys.stderr)
+    print("slowest modules by self time:", file=sys.stderr)
+    for name, (own, _) in slowest:
+        print(f"  {own / 1000:>8.1f} ms  {name}", file=sys.stderr)
+    if heavy:
+        print(f"heavy modules loaded at startup: {', '.join(heavy)}", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "import_ms": round(import_ms, 1),
+        "help_ms": round(help_ms, 1),
+        "budget_ms": args.budget_ms,
+        "heavy_modules": heavy,
+        "slowest_modules": [{"module": name, "self_ms": own / 1000} for name, (own, _) in slowest],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if import_ms > args.budget_ms or heavy:
+        print("FAIL: startup budget exceeded" if import_ms > args.budget_ms else "FAIL: heavy modules loaded at startup", file=sys.stderr)
+        sys.exit(1)
+    print("OK", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
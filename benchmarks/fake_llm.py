@@ -0,0 +1,72 @@
+import time
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic local stand-in for ChatOpenAI.
+
+    Every call waits `latency` seconds (time to first token), then produces
+    `output_tokens` words at `tokens_per_second`. The text depends only on
+    the prompt, so responses are stable across runs and cacheable.
+    Usage metadata is reported like a real provider's.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    output_tokens: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "docuai-fake"
+
+    def _words(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "".join(str(m.content) for m in messages)
+        seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        words = ["# Documentation", seed[:12]]
+        while len(words) < self.output_tokens:
+            words.append(seed[len(words) % 56:len(words) % 56 + 8])
+        return words
+
+    def _usage(self, messages: List[BaseMessage]) -> dict:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": prompt_tokens + self.output_tokens,
+        }
+
+    def _generation_time(self) -> float:
+        if not self.tokens_per_second:
+            return self.latency
+        return self.latency + self.output_tokens / self.tokens_per_second
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._generation_time())
+        message = AIMessage(content=" ".join(self._words(messages)), usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._generation_time())
+        message = AIMessage(content=" ".join(self._words(messages)), usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for word in self._words(messages):
+            time.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for word in self._words(messages):
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages)))
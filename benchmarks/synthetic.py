@@ -0,0 +1,111 @@
+import os
+import random
+
+FILES_PER_DIR = 50
+
+PY_TEMPLATE = '''"""
+Synthetic module {index}.
+"""
+import os
+import json
+from typing import Optional
+
+CONSTANT_{index} = {index}
+
+class Service{index}:
+    """Service number {index}."""
+
+    def __init__(self, name: str, retries: int = 3):
+        self.name = name
+        self.retries = retries
+
+{methods}
+
+{functions}
+'''
+
+PY_METHOD = '''    def handle_{n}(self, payload: dict, flag: bool = False) -> Optional[dict]:
+        """Handles request kind {n}."""
+        if flag and payload.get("key") == {n}:
+            return None
+        for attempt in range(self.retries):
+            if attempt > {n} % 3:
+                payload["attempt"] = attempt
+        return payload
+'''
+
+PY_FUNCTION = '''def helper_{n}(path: str, limit: int = {n}) -> list:
+    """Reads up to `limit` lines from `path`."""
+    lines = []
+    with open(path) as f:
+        for i, line in enumerate(f):
+            if i >= limit:
+                break
+            lines.append(line.strip())
+    return lines
+'''
+
+JS_TEMPLATE = '''// Synthetic module {index}
+import {{ helper }} from "./shared";
+
+export class Widget{index} {{
+  constructor(name, size = {index}) {{
+    this.name = name;
+    this.size = size;
+  }}
+
+{methods}
+}}
+
+{functions}
+'''
+
+JS_METHOD = '''  render{n}(props, ...rest) {{
+    if (props.visible && this.size > {n}) {{
+      return helper(props, rest);
+    }}
+    return null;
+  }}
+'''
+
+JS_FUNCTION = '''export function compute{n}(items, factor = {n}) {{
+  return items.filter((x) => x > factor).map((x) => x * factor);
+}}
+'''
+
+def make_repo(root: str, n_files: int, js_ratio: float = 0.3, functions_per_file: int = 4, seed: int = 0) -> list[str]:
+    """
+    Writes `n_files` synthetic Python/JS modules under `root`, nested
+    FILES_PER_DIR to a directory, and returns their paths. The output is
+    deterministic for a given seed.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(n_files):
+        directory = os.path.join(root, *[f"pkg{part}" for part in _dir_parts(index // FILES_PER_DIR)])
+        os.makedirs(directory, exist_ok=True)
+        n = max(1, functions_per_file + rng.randint(-2, 2))
+
+        if rng.random() < js_ratio:
+            path = os.path.join(directory, f"module{index}.js")
+            content = JS_TEMPLATE.format(
+                index=index,
+                methods="\n".join(JS_METHOD.format(n=i) for i in range(n)),
+                functions="\n".join(JS_FUNCTION.format(n=i) for i in range(n)),
+            )
+        else:
+            path = os.path.join(directory, f"module{index}.py")
+            content = PY_TEMPLATE.format(
+                index=index,
+                methods="\n".join(PY_METHOD.format(n=i) for i in range(n)),
+                functions="\n".join(PY_FUNCTION.format(n=i) for i in range(n)),
+            )
+
+        with open(path, "w") as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+def _dir_parts(dir_index: int) -> list[str]:
+    # Spread directories over two levels so large repos have a realistic tree
+    return [str(dir_index // FILES_PER_DIR), str(dir_index % FILES_PER_DIR)]
@@ -1,22 +1,58 @@
 import os
+import time
+import asyncio
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from docuai.models import FileMetadata
+from langchain_core.language_models import BaseChatModel
+from typing import AsyncIterator, Iterator, Optional
+from docuai.compact import AnyMetadata
+from docuai.parsers import get_parser
+from docuai.cache import ResponseCache
+from docuai.ratelimit import RateLimiter
+from docuai.symbols import SymbolIndex
+from docuai.retrieval import Chunk
+from docuai.tracing import tracer
+from docuai.fanout import run_sync
+from docuai.chunking import DOC_CHUNK_TOKENS, MIN_PART_TOKENS, split_definitions
+from docuai.tokens import CHARS_PER_TOKEN, DEFAULT_CONTEXT_LIMIT, DEFAULT_OUTPUT_RESERVE, count_tokens, prompt_tokens
+from docuai.source import sources
+from docuai.prompt_compaction import DEFAULT_LEVEL, check_level, compact
+
+# Bump whenever a prompt changes, so incremental runs regenerate outputs built with the old prompts
+PROMPT_VERSION = "5"
+
+SUMMARY_FOCUS = {
+    "generate": "its purpose, public classes and functions, key data structures and how it is used by other code.",
+    "analyze": "code quality problems, security risks, performance concerns and notable design choices, with names and locations.",
+}
+
+FOCUSED_TASK = {
+    "generate": "what the relevant components do, how they fit together and how to use them, with short examples.",
+    "analyze": "code smells, bugs, security and performance issues in the relevant code, each with its location, severity and a suggested fix.",
+}
 
 class DocuAIAgent:
-    def __init__(self):
-        # Check for OpenAI API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "OpenAI API key not found. Please set it using one of these methods:\n"
-                "1. Environment variable: export OPENAI_API_KEY='your-key-here'\n"
-                "2. Create a .env file in your current directory with: OPENAI_API_KEY=your-key-here\n"
-                "3. Set it in your shell profile (~/.bashrc, ~/.zshrc, etc.)"
-            )
-        
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
+    def __init__(
+        self,
+        model: str = "gpt-4o",
+        temperature: float = 0.3,
+        cache: Optional[ResponseCache] = None,
+        context_limit: int = DEFAULT_CONTEXT_LIMIT,
+        rate_limiter: Optional[RateLimiter] = None,
+        llm: Optional[BaseChatModel] = None,
+        compaction: str = DEFAULT_LEVEL,
+    ):
+        self.model = model
+        self.temperature = temperature
+        # Built on first use (see `llm`), so dry runs can plan requests without an API key
+        self._llm = llm
+        self.cache = cache
+        self.context_limit = context_limit
+        self.rate_limiter = rate_limiter
+        self.compaction = check_level(compaction)
+        # file path -> (tokens before, tokens after) compaction
+        self.compaction_stats = {}
         
         self.doc_prompt = ChatPromptTemplate.from_template(
             """
@@ -27,6 +63,9 @@ class DocuAIAgent:
             Code Structure:
             {structure}
             
+            Signatures of repository symbols this file imports (for reference; document only this file):
+            {context}
+            
             Source Code:
             ```
             {code}
@@ -61,12 +100,75 @@ class DocuAIAgent:
             """
         )
         
+        self.doc_part_prompt = ChatPromptTemplate.from_template(
+            """
+            You are an expert software engineer and technical writer documenting one part of a large file.
+            
+            File: {file_path}
+            Part {part} of {parts}: {names}
+            
+            Structure of the whole file:
+            {structure}
+            
+            Signatures of repository symbols this file imports (for reference; document only this file):
+            {context}
+            
+            Source Code of this part:
+            ```
+            {code}
+            ```
+            
+            Document every class and function defined in this part, in source order. Start each one with a level-3 heading (### Name) and cover:
+            - **Name and Signature**: Include full signature with types
+            - **Purpose**: What it does in 1-2 sentences
+            - **Parameters**: Describe each parameter with type and purpose
+            - **Returns**: What it returns and when
+            - **Example Usage**: Provide realistic code examples
+            - **Notes**: Any important details, edge cases, or gotchas
+            
+            If the part continues a class or function from the previous part, document only what is new here.
+            If it has no classes or functions, describe its module-level code under ### Module-level code.
+            Do not add a title, overview or closing remarks; they are written separately.
+            """
+        )
+
+        self.doc_overview_prompt = ChatPromptTemplate.from_template(
+            """
+            You are an expert software engineer and technical writer. A large file was documented in parts; write the opening of its documentation.
+            
+            File: {file_path}
+            
+            Code Structure:
+            {structure}
+            
+            Documentation of its components:
+            {sections}
+            
+            Write these Markdown sections, without a title:
+            
+            ## Overview
+            Provide a clear, concise summary of what this file does and its purpose in the project.
+            
+            ## Architecture
+            How the main classes and functions relate to each other, and the typical flow through them.
+            
+            ## Usage Examples
+            
+            Provide 2-3 realistic examples showing basic usage, a common use case and advanced usage (if applicable).
+            
+            Use proper code formatting with language-specific syntax highlighting. Stay consistent with the component documentation.
+            """
+        )
+
         self.smell_prompt = ChatPromptTemplate.from_template(
             """
             You are a senior code reviewer and software architect. Perform a thorough code quality analysis.
             
             File: {file_path}
             
+            Static metrics (hints from a local analyzer; verify them against the code):
+            {hints}
+            
             Source Code:
             ```
             {code}
@@ -117,45 +219,58 @@ class DocuAIAgent:
             """
         )
 
-    def generate_docs(self, metadata: FileMetadata) -> str:
-        # Reconstruct code or read it again? 
-        # We have code snippets in metadata, but full context is better.
-        # For now, let's assume we pass the full file content or reconstruct it.
-        # Actually, let's read the file again here for simplicity or pass it in.
-        
-        with open(metadata.file_path, "r") as f:
-            full_code = f.read()
+        # Map-reduce prompts: per-file (or per-chunk) summaries rolled up into per-directory summaries
+        self.file_summary_prompt = ChatPromptTemplate.from_template(
+            """
+            You are summarizing one part of a larger codebase so the summary can later be combined with others.
             
-        structure_summary = f"Classes: {[c.name for c in metadata.classes]}, Functions: {[f.name for f in metadata.functions]}"
-        
-        chain = self.doc_prompt | self.llm | StrOutputParser()
-        return chain.invoke({
-            "file_path": metadata.file_path,
-            "structure": structure_summary,
-            "code": full_code
-        })
+            File: {file_path}
+            
+            Source Code:
+            ```
+            {code}
+            ```
+            
+            Write a dense summary (at most 200 words) focusing on:
+            {focus}
+            
+            Mention classes and functions by name. Do not include introductions or closing remarks.
+            """
+        )
 
-    def analyze_code(self, file_path: str) -> str:
-        with open(file_path, "r") as f:
-            full_code = f.read()
+        self.dir_summary_prompt = ChatPromptTemplate.from_template(
+            """
+            You are summarizing a directory of a larger codebase from summaries of its files and subdirectories.
             
-        chain = self.smell_prompt | self.llm | StrOutputParser()
-        return chain.invoke({
-            "file_path": file_path,
-            "code": full_code
-        })
+            Directory: {dir_path}
+            
+            Summaries:
+            {summaries}
+            
+            Write a dense summary (at most 300 words) of this directory focusing on:
+            {focus}
+            
+            Describe how the parts relate to each other. Do not include introductions or closing remarks.
+            """
+        )
 
-    def generate_repo_docs(self, metadata_list: list[FileMetadata]) -> str:
-        repo_content = ""
-        for meta in metadata_list:
-            try:
-                with open(meta.file_path, "r") as f:
-                    code = f.read()
-                repo_content += f"\n\n--- File: {meta.file_path} ---\n{code}"
-            except Exception as e:
-                repo_content += f"\n\n--- File: {meta.file_path} ---\n(Error reading file: {e})"
+        self.focused_prompt = ChatPromptTemplate.from_template(
+            """
+            You are an expert software engineer answering a focused request about a larger codebase.
+            
+            Request: {query}
+            
+            The excerpts below were retrieved from the repository as the most relevant to the request.
+            Each starts with its file path, line range and symbol name.
+            
+            {excerpts}
+            
+            Write a Markdown report that addresses the request, covering {task}
+            Refer to files and symbols by name. If the excerpts do not cover part of the request, say so instead of guessing.
+            """
+        )
 
-        prompt = ChatPromptTemplate.from_template(
+        self.repo_doc_prompt = ChatPromptTemplate.from_template(
             """
             You are a senior software architect and technical writer. Generate comprehensive project documentation.
             
@@ -213,21 +328,8 @@ class DocuAIAgent:
             Be thorough but concise. Focus on what developers need to know.
             """
         )
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"repo_content": repo_content})
 
-    def analyze_repo(self, file_paths: list[str]) -> str:
-        repo_content = ""
-        for path in file_paths:
-            try:
-                with open(path, "r") as f:
-                    code = f.read()
-                repo_content += f"\n\n--- File: {path} ---\n{code}"
-            except Exception as e:
-                repo_content += f"\n\n--- File: {path} ---\n(Error reading file: {e})"
-
-        prompt = ChatPromptTemplate.from_template(
+        self.repo_smell_prompt = ChatPromptTemplate.from_template(
             """
             You are a senior software architect and security expert. Perform a comprehensive project-wide code review.
             
@@ -311,6 +413,399 @@ class DocuAIAgent:
             Be specific, actionable, and constructive. Provide code examples where helpful.
             """
         )
+
+    @property
+    def llm(self) -> BaseChatModel:
+        if self._llm is None:
+            # Check for OpenAI API key (not needed when a chat model is passed in)
+            if not os.getenv("OPENAI_API_KEY"):
+                raise ValueError(
+                    "OpenAI API key not found. Please set it using one of these methods:\n"
+                    "1. Environment variable: export OPENAI_API_KEY='your-key-here'\n"
+                    "2. Create a .env file in your current directory with: OPENAI_API_KEY=your-key-here\n"
+                    "3. Set it in your shell profile (~/.bashrc, ~/.zshrc, etc.)"
+                )
+            if self.rate_limiter is not None:
+                # With a rate limiter in front, retries and backoff are the limiter's job
+                self._llm = ChatOpenAI(model=self.model, temperature=self.temperature, max_retries=0, stream_usage=True)
+            else:
+                # stream_usage makes streamed responses report token usage like regular calls
+                self._llm = ChatOpenAI(model=self.model, temperature=self.temperature, stream_usage=True)
+        return self._llm
+
+    @llm.setter
+    def llm(self, llm: BaseChatModel):
+        self._llm = llm
+
+    def _cached(self, prompt: ChatPromptTemplate, inputs: dict) -> tuple[Optional[str], Optional[str]]:
+        # Serve from the response cache when the exact same prompt was sent before
+        if self.cache is None:
+            return None, None
+        key = self.cache.make_key(prompt, inputs, self.model, self.temperature)
+        return key, self.cache.get(key)
+
+    def _run(self, prompt: ChatPromptTemplate, inputs: dict) -> str:
+        key, cached = self._cached(prompt, inputs)
+        if cached is not None:
+            return cached
+
+        chain = prompt | self.llm
+        with tracer.span("llm.call", file=inputs.get("file_path", "")) as attrs:
+            if self.rate_limiter is not None:
+                tokens = prompt_tokens(prompt, inputs, self.model)
+                message = self.rate_limiter.call(lambda: chain.invoke(inputs), tokens)
+            else:
+                message = chain.invoke(inputs)
+            tracer.record_usage(getattr(message, "usage_metadata", None), attrs)
+        result = StrOutputParser().invoke(message)
+
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    async def _arun(self, prompt: ChatPromptTemplate, inputs: dict) -> str:
+        key, cached = self._cached(prompt, inputs)
+        if cached is not None:
+            return cached
+
+        chain = prompt | self.llm
+        with tracer.span("llm.call", file=inputs.get("file_path", "")) as attrs:
+            if self.rate_limiter is not None:
+                tokens = prompt_tokens(prompt, inputs, self.model)
+                message = await self.rate_limiter.acall(lambda: chain.ainvoke(inputs), tokens)
+            else:
+                message = await chain.ainvoke(inputs)
+            tracer.record_usage(getattr(message, "usage_metadata", None), attrs)
+        result = StrOutputParser().invoke(message)
+
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    def _stream(self, prompt: ChatPromptTemplate, inputs: dict) -> Iterator[str]:
+        key, cached = self._cached(prompt, inputs)
+        if cached is not None:
+            yield cached
+            return
+
+        # Only hold on to the whole response when it has to go into the cache
+        parts = [] if self.cache is not None else None
+        chain = prompt | self.llm
+        attrs = {"file": inputs.get("file_path", "")}
+        start = time.perf_counter()
+        if self.rate_limiter is not None:
+            # Retried with backoff until the first chunk; a half-written stream cannot be
+            chunks = self.rate_limiter.stream(lambda: chain.stream(inputs), prompt_tokens(prompt, inputs, self.model))
+        else:
+            chunks = chain.stream(inputs)
+        for chunk in chunks:
+            tracer.record_usage(getattr(chunk, "usage_metadata", None), attrs)
+            text = StrOutputParser().invoke(chunk)
+            if parts is not None:
+                parts.append(text)
+            yield text
+        tracer.record("llm.stream", time.perf_counter() - start, start=start, **attrs)
+
+        if self.cache is not None:
+            self.cache.put(key, "".join(parts))
+
+    async def _astream(self, prompt: ChatPromptTemplate, inputs: dict) -> AsyncIterator[str]:
+        key, cached = self._cached(prompt, inputs)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = [] if self.cache is not None else None
+        chain = prompt | self.llm
+        attrs = {"file": inputs.get("file_path", "")}
+        start = time.perf_counter()
+        if self.rate_limiter is not None:
+            chunks = self.rate_limiter.astream(lambda: chain.astream(inputs), prompt_tokens(prompt, inputs, self.model))
+        else:
+            chunks = chain.astream(inputs)
+        async for chunk in chunks:
+            tracer.record_usage(getattr(chunk, "usage_metadata", None), attrs)
+            text = StrOutputParser().invoke(chunk)
+            if parts is not None:
+                parts.append(text)
+            yield text
+        tracer.record("llm.stream", time.perf_counter() - start, start=start, **attrs)
+
+        if self.cache is not None:
+            self.cache.put(key, "".join(parts))
+
+    def _doc_inputs(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None, record: bool = True) -> dict:
+        # The full file gives better context than the snippets; the parser's read is reused from the store
+        with tracer.span("prompt.build", file=metadata.file_path):
+            full_code = self.compact_source(metadata.file_path, record=record)
+
+            structure_summary = f"Classes: {[c.name for c in metadata.classes]}, Functions: {[f.name for f in metadata.functions]}"
+            context = index.context_for(metadata, full_code) if index is not None else ""
         
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"repo_content": repo_content})
+        return {
+            "file_path": metadata.file_path,
+            "structure": structure_summary,
+            "context": context or "(none)",
+            "code": full_code
+        }
+
+    def compact_source(self, file_path: str, mode: str = "generate", record: bool = True) -> str:
+        """
+        Returns the source of `file_path` compacted at the agent's level, and
+        records the token reduction in `compaction_stats` unless `record` is
+        off (for estimates). Reviews keep function bodies, since that is
+        where their findings are.
+        """
+        code = sources.text(file_path)
+        level = "literals" if mode == "analyze" and self.compaction == "signatures" else self.compaction
+        compacted = compact(code, file_path, level)
+        if record and compacted != code:
+            before, after = count_tokens(code, self.model), count_tokens(compacted, self.model)
+            self.compaction_stats[file_path] = (before, after)
+            tracer.count("prompt.tokens_compacted", before - after)
+        return compacted
+
+    def _smell_inputs(self, file_path: str, hints: Optional[str] = None, record: bool = True) -> dict:
+        with tracer.span("prompt.build", file=file_path):
+            full_code = self.compact_source(file_path, "analyze", record)
+
+        return {
+            "file_path": file_path,
+            "hints": hints or "(none)",
+            "code": full_code
+        }
+
+    def _doc_parts(self, metadata: AnyMetadata, inputs: dict) -> Optional[list[dict]]:
+        """
+        Returns the inputs of each part when a file is too large for one
+        documentation call, or None when it goes through the single-call path.
+        Raises ValueError when the context limit leaves too little room for
+        the code of a part.
+        """
+        code = inputs["code"]
+        # Tokens never outnumber characters, so short files skip the tokenizer
+        if len(code) <= DOC_CHUNK_TOKENS or (
+            count_tokens(code, self.model) <= DOC_CHUNK_TOKENS
+            and prompt_tokens(self.doc_prompt, inputs, self.model) <= self.prompt_budget
+        ):
+            return None
+
+        overhead = prompt_tokens(self.doc_part_prompt, {**inputs, "code": "", "names": ""}, self.model)
+        budget = min(DOC_CHUNK_TOKENS, self.prompt_budget - overhead)
+        if budget < MIN_PART_TOKENS:
+            raise ValueError(
+                f"A context limit of {self.context_limit} tokens leaves {max(0, budget)} for the code of each part "
+                f"of {metadata.file_path} (at least {MIN_PART_TOKENS} are needed); raise the context limit"
+            )
+        # Parts are cut at the parsed line numbers, so from the original source, and compacted one by one.
+        # Sizing them on the original keeps the split cheap; compaction only makes them smaller.
+        lines = sources.text(metadata.file_path).splitlines()
+        pieces = split_definitions(metadata, lines, budget, lambda text: count_tokens(text, self.model))
+        return [
+            {
+                **inputs,
+                "part": str(number),
+                "parts": str(len(pieces)),
+                "names": ", ".join(names),
+                "code": compact("\n".join(lines[start - 1:end]), metadata.file_path, self.compaction),
+            }
+            for number, (names, start, end) in enumerate(pieces, 1)
+        ]
+
+    def _overview_inputs(self, inputs: dict, sections: list[str]) -> dict:
+        # The overview only needs the gist of each part; trim them evenly if they don't fit
+        budget_chars = (self.prompt_budget - prompt_tokens(self.doc_overview_prompt, inputs, self.model)) * CHARS_PER_TOKEN
+        share = max(1, budget_chars // max(1, len(sections)))
+        trimmed = [section if len(section) <= share else section[:share] + "\n..." for section in sections]
+        return {"file_path": inputs["file_path"], "structure": inputs["structure"], "sections": "\n\n".join(trimmed)}
+
+    async def _adocument_parts(self, parts: list[dict]) -> list[str]:
+        with tracer.span("doc.parts", file=parts[0]["file_path"], parts=len(parts)):
+            sections = await asyncio.gather(*(self._arun(self.doc_part_prompt, part) for part in parts))
+        return [section.strip() for section in sections]
+
+    @staticmethod
+    def _assemble(file_path: str, overview: str, sections: list[str]) -> str:
+        return f"# {file_path}\n\n{overview.strip()}\n\n## Components\n\n" + "\n\n".join(sections) + "\n"
+
+    async def _agenerate_in_parts(self, inputs: dict, parts: list[dict]) -> str:
+        sections = await self._adocument_parts(parts)
+        overview = await self._arun(self.doc_overview_prompt, self._overview_inputs(inputs, sections))
+        return self._assemble(inputs["file_path"], overview, sections)
+
+    def _stream_in_parts(self, inputs: dict, parts: list[dict]) -> Iterator[str]:
+        # Parts are documented in parallel first; the overview is then streamed in front of them
+        sections = run_sync(self._adocument_parts(parts))
+        yield f"# {inputs['file_path']}\n\n"
+        yield from self._stream(self.doc_overview_prompt, self._overview_inputs(inputs, sections))
+        yield "\n\n## Components\n\n" + "\n\n".join(sections) + "\n"
+
+    async def _astream_in_parts(self, inputs: dict, parts: list[dict]) -> AsyncIterator[str]:
+        sections = await self._adocument_parts(parts)
+        yield f"# {inputs['file_path']}\n\n"
+        async for chunk in self._astream(self.doc_overview_prompt, self._overview_inputs(inputs, sections)):
+            yield chunk
+        yield "\n\n## Components\n\n" + "\n\n".join(sections) + "\n"
+
+    def generate_docs(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None) -> str:
+        inputs = self._doc_inputs(metadata, index)
+        parts = self._doc_parts(metadata, inputs)
+        if parts is None:
+            return self._run(self.doc_prompt, inputs)
+        return run_sync(self._agenerate_in_parts(inputs, parts))
+
+    async def agenerate_docs(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None) -> str:
+        inputs = self._doc_inputs(metadata, index)
+        parts = self._doc_parts(metadata, inputs)
+        if parts is None:
+            return await self._arun(self.doc_prompt, inputs)
+        return await self._agenerate_in_parts(inputs, parts)
+
+    def analyze_code(self, file_path: str, hints: Optional[str] = None) -> str:
+        return self._run(self.smell_prompt, self._smell_inputs(file_path, hints))
+
+    async def aanalyze_code(self, file_path: str, hints: Optional[str] = None) -> str:
+        return await self._arun(self.smell_prompt, self._smell_inputs(file_path, hints))
+
+    def doc_request(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None) -> Optional[tuple[ChatPromptTemplate, dict]]:
+        """
+        Returns the prompt and inputs of the one call that documents a file,
+        for sending through a batch endpoint, or None when the file is too
+        large and is documented in parts.
+        """
+        inputs = self._doc_inputs(metadata, index)
+        if self._doc_parts(metadata, inputs) is not None:
+            return None
+        return self.doc_prompt, inputs
+
+    def analysis_request(self, file_path: str, hints: Optional[str] = None) -> tuple[ChatPromptTemplate, dict]:
+        return self.smell_prompt, self._smell_inputs(file_path, hints)
+
+    def cache_key(self, prompt: ChatPromptTemplate, inputs: dict) -> str:
+        # Also computed without a cache, so batch results can be matched to their requests
+        return ResponseCache.make_key(prompt, inputs, self.model, self.temperature)
+
+    def stream_docs(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None) -> Iterator[str]:
+        inputs = self._doc_inputs(metadata, index)
+        parts = self._doc_parts(metadata, inputs)
+        if parts is None:
+            return self._stream(self.doc_prompt, inputs)
+        return self._stream_in_parts(inputs, parts)
+
+    def astream_docs(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None) -> AsyncIterator[str]:
+        inputs = self._doc_inputs(metadata, index)
+        parts = self._doc_parts(metadata, inputs)
+        if parts is None:
+            return self._astream(self.doc_prompt, inputs)
+        return self._astream_in_parts(inputs, parts)
+
+    def stream_analysis(self, file_path: str, hints: Optional[str] = None) -> Iterator[str]:
+        return self._stream(self.smell_prompt, self._smell_inputs(file_path, hints))
+
+    def astream_analysis(self, file_path: str, hints: Optional[str] = None) -> AsyncIterator[str]:
+        return self._astream(self.smell_prompt, self._smell_inputs(file_path, hints))
+
+    def _repo_content(self, file_paths: list[str], hints: Optional[dict[str, str]] = None, mode: str = "generate", record: bool = True) -> str:
+        with tracer.span("prompt.build", files=len(file_paths)):
+            return self._join_files(file_paths, hints or {}, mode, record)
+
+    def _join_files(self, file_paths: list[str], hints: dict[str, str], mode: str = "generate", record: bool = True) -> str:
+        repo_content = ""
+        for path in file_paths:
+            try:
+                code = self.compact_source(path, mode, record)
+                note = f"Static metrics: {hints[path]}\n" if path in hints else ""
+                repo_content += f"\n\n--- File: {path} ---\n{note}{code}"
+            except Exception as e:
+                repo_content += f"\n\n--- File: {path} ---\n(Error reading file: {e})"
+        return repo_content
+
+    def generate_repo_docs(self, metadata_list: list[AnyMetadata]) -> str:
+        repo_content = self._repo_content([meta.file_path for meta in metadata_list])
+        return self._run(self.repo_doc_prompt, {"repo_content": repo_content})
+
+    def analyze_repo(self, file_paths: list[str], hints: Optional[dict[str, str]] = None) -> str:
+        return self._run(self.repo_smell_prompt, {"repo_content": self._repo_content(file_paths, hints, "analyze")})
+
+    def stream_repo_docs(self, metadata_list: list[AnyMetadata]) -> Iterator[str]:
+        repo_content = self._repo_content([meta.file_path for meta in metadata_list])
+        return self._stream(self.repo_doc_prompt, {"repo_content": repo_content})
+
+    def stream_repo_analysis(self, file_paths: list[str], hints: Optional[dict[str, str]] = None) -> Iterator[str]:
+        return self._stream(self.repo_smell_prompt, {"repo_content": self._repo_content(file_paths, hints, "analyze")})
+
+    def _focused_inputs(self, query: str, chunks: list[Chunk], mode: str) -> dict:
+        with tracer.span("prompt.build", chunks=len(chunks)):
+            excerpts = "\n\n".join(f"--- {chunk.label} ---\n{chunk.text}" for chunk in chunks)
+        return {"query": query, "excerpts": excerpts, "task": FOCUSED_TASK[mode]}
+
+    def focused_report(self, query: str, chunks: list[Chunk], mode: str = "generate") -> str:
+        return self._run(self.focused_prompt, self._focused_inputs(query, chunks, mode))
+
+    def stream_focused_report(self, query: str, chunks: list[Chunk], mode: str = "generate") -> Iterator[str]:
+        return self._stream(self.focused_prompt, self._focused_inputs(query, chunks, mode))
+
+    def focus_budget(self, query: str) -> int:
+        """
+        Tokens available for retrieved excerpts in a focused prompt for `query`.
+        """
+        inputs = {"query": query, "task": FOCUSED_TASK["analyze"]}
+        return self.prompt_budget - prompt_tokens(self.focused_prompt, inputs, self.model)
+
+    @property
+    def prompt_budget(self) -> int:
+        """
+        Maximum prompt size in tokens, leaving room in the context window for the answer.
+        """
+        return self.context_limit - DEFAULT_OUTPUT_RESERVE
+
+    def estimate_doc_requests(self, metadata: AnyMetadata, index: Optional[SymbolIndex] = None) -> list[tuple[str, int]]:
+        """
+        Returns (label, prompt tokens) for each call generate_docs would make.
+        The overview of a file documented in parts is estimated from its parts'
+        size, since the real input is only known once they are written.
+        """
+        inputs = self._doc_inputs(metadata, index, record=False)
+        parts = self._doc_parts(metadata, inputs)
+        if parts is None:
+            return [(metadata.file_path, prompt_tokens(self.doc_prompt, inputs, self.model))]
+        requests = [
+            (f"{metadata.file_path} part {part['part']}/{part['parts']}", prompt_tokens(self.doc_part_prompt, part, self.model))
+            for part in parts
+        ]
+        overview = prompt_tokens(self.doc_overview_prompt, {"structure": inputs["structure"]}, self.model)
+        requests.append((f"{metadata.file_path} overview", overview + len(parts) * DEFAULT_OUTPUT_RESERVE // 2))
+        return requests
+
+    def estimate_file_tokens(self, file_path: str, mode: str = "generate") -> int:
+        """
+        Prompt tokens of every call that documents or reviews one file,
+        built the same way as the real requests.
+        """
+        if mode == "generate":
+            metadata = get_parser(file_path).parse_compact(file_path)
+            return sum(tokens for _, tokens in self.estimate_doc_requests(metadata))
+        return prompt_tokens(self.smell_prompt, self._smell_inputs(file_path, record=False), self.model)
+
+    def estimate_repo_tokens(self, file_paths: list[str], mode: str = "generate") -> int:
+        prompt = self.repo_doc_prompt if mode == "generate" else self.repo_smell_prompt
+        return prompt_tokens(prompt, {"repo_content": self._repo_content(file_paths, mode=mode, record=False)}, self.model)
+
+    async def asummarize_file(self, file_path: str, code: str, mode: str = "generate") -> str:
+        return await self._arun(self.file_summary_prompt, {
+            "file_path": file_path,
+            "code": code,
+            "focus": SUMMARY_FOCUS[mode]
+        })
+
+    async def asummarize_directory(self, dir_path: str, summaries: str, mode: str = "generate") -> str:
+        return await self._arun(self.dir_summary_prompt, {
+            "dir_path": dir_path,
+            "summaries": summaries,
+            "focus": SUMMARY_FOCUS[mode]
+        })
+
+    async def areduce_repo(self, summaries: str, mode: str = "generate") -> str:
+        # The repo-level prompts work the same on summaries as on raw files
+        prompt = self.repo_doc_prompt if mode == "generate" else self.repo_smell_prompt
+        return await self._arun(prompt, {"repo_content": summaries})
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import uuid
+import shutil
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+from docuai.manifest import hash_file
+from docuai.tracing import tracer
+
+if TYPE_CHECKING:
+    from docuai.agent import DocuAIAgent
+
+STATE_NAME = ".docuai-batch.json"
+JOBS_DIR = ".docuai-batch"
+DEFAULT_POLL_SECONDS = 60
+# The OpenAI Batch API accepts up to 50,000 requests and 200 MB per job file
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+CHAT_URL = "/v1/chat/completions"
+ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+class BatchEndpoint(ABC):
+    """
+    A service that runs a JSONL file of chat requests offline. Job files and
+    results use the OpenAI Batch API format: one {"custom_id", "method",
+    "url", "body"} object per request line, and one {"custom_id",
+    "response": {"status_code", "body"}, "error"} object per result line.
+    """
+
+    @abstractmethod
+    def submit(self, job_path: str) -> str:
+        """
+        Uploads the job file and returns the batch id.
+        """
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """
+        Returns "pending", "done" (results, possibly partial, are ready) or
+        "failed".
+        """
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[dict]:
+        pass
+
+class OpenAIBatchEndpoint(BatchEndpoint):
+    def __init__(self, client=None):
+        if client is None:
+            # Only batch runs need the client library directly
+            from openai import OpenAI
+            client = OpenAI()
+        self.client = client
+
+    def submit(self, job_path: str) -> str:
+        with open(job_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=uploaded.id, endpoint=CHAT_URL, completion_window="24h")
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        status = self.client.batches.retrieve(batch_id).status
+        if status == "failed":
+            return "failed"
+        # Expired and cancelled batches still return the requests that finished
+        return "done" if status in ("completed", "expired", "cancelled") else "pending"
+
+    def results(self, batch_id: str) -> Iterator[dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+
+class LocalBatchEndpoint(BatchEndpoint):
+    """
+    File-based stand-in for a batch service, for tests and offline runs.
+    Submitted jobs are copied into `directory` as `<id>.input.jsonl`; a batch
+    is done once `<id>.output.jsonl` exists. With a chat model `llm`, the
+    first poll answers every request with it and writes that file; without
+    one, something else has to.
+    """
+
+    def __init__(self, directory: str, llm=None):
+        self.directory = directory
+        self.llm = llm
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    def submit(self, job_path: str) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        shutil.copyfile(job_path, self._path(batch_id, "input"))
+        return batch_id
+
+    def _answer(self, request: dict) -> dict:
+        messages = [(m["role"], m["content"]) for m in request["body"]["messages"]]
+        try:
+            message = self.llm.invoke(messages)
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+        usage = getattr(message, "usage_metadata", None) or {}
+        body = {
+            "choices": [{"message": {"role": "assistant", "content": message.content}}],
+            "usage": {"prompt_tokens": usage.get("input_tokens", 0), "completion_tokens": usage.get("output_tokens", 0)},
+        }
+        return {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+
+    def status(self, batch_id: str) -> str:
+        output = self._path(batch_id, "output")
+        if not os.path.exists(output) and self.llm is not None:
+            with open(self._path(batch_id, "input")) as f:
+                answers = [self._answer(json.loads(line)) for line in f if line.strip()]
+            with open(output + ".partial", "w") as f:
+                f.writelines(json.dumps(answer) + "\n" for answer in answers)
+            os.replace(output + ".partial", output)
+        return "done" if os.path.exists(output) else "pending"
+
+    def results(self, batch_id: str) -> Iterator[dict]:
+        with open(self._path(batch_id, "output")) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def get_endpoint(spec: str, agent: "DocuAIAgent") -> BatchEndpoint:
+    """
+    Resolves --batch-endpoint: "openai", or "local:<dir>" for the file-based
+    stand-in answered by the agent's chat model.
+    """
+    if spec == "openai":
+        return OpenAIBatchEndpoint()
+    if spec.startswith("local:"):
+        return LocalBatchEndpoint(spec[len("local:"):], agent.llm)
+    raise ValueError(f"Unknown batch endpoint: {spec} (expected 'openai' or 'local:<dir>')")
+
+def _response_text(result: dict) -> Optional[str]:
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        return None
+    return response["body"]["choices"][0]["message"]["content"]
+
+class BatchRun:
+    """
+    Sends per-file requests through a batch endpoint instead of one
+    interactive call each, and writes the results to the usual outputs.
+
+    Requests answered by the response cache are written right away; the
+    rest are split into job files of at most `max_requests` lines and
+    `max_bytes`, and submitted. Submitted batches are recorded in a state
+    file in `out_dir` before polling starts, so an interrupted run picks
+    them up again instead of resubmitting. Results go into the response
+    cache, so a later interactive run reuses them too.
+    """
+
+    def __init__(
+        self,
+        agent: "DocuAIAgent",
+        endpoint: BatchEndpoint,
+        out_dir: str,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        max_requests: int = MAX_BATCH_REQUESTS,
+        max_bytes: int = MAX_BATCH_BYTES,
+    ):
+        self.agent = agent
+        self.endpoint = endpoint
+        self.out_dir = out_dir
+        self.poll_seconds = poll_seconds
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.state_path = os.path.join(out_dir, STATE_NAME)
+        self.batches = []
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.batches = json.load(f)["batches"]
+        self._submitted = {(r["key"], r["output"]) for b in self.batches for r in b["requests"].values()}
+        self._new = []
+        self.submitted = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._new)
+
+    def _save(self):
+        if self.batches:
+            with open(self.state_path, "w") as f:
+                json.dump({"batches": self.batches}, f, indent=2)
+        elif os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    @staticmethod
+    def _write(out_path: str, header: str, text: str):
+        with tracer.span("write", file=out_path), open(out_path, "w") as f:
+            f.write(header)
+            f.write(text)
+
+    def add(self, file_path: str, out_path: str, prompt, inputs: dict, header: str = "") -> bool:
+        """
+        Queues one request. Returns True if the response cache answered it
+        and its output has already been written.
+        """
+        key = self.agent.cache_key(prompt, inputs)
+        if self.agent.cache is not None:
+            cached = self.agent.cache.get(key)
+            if cached is not None:
+                self._write(out_path, header, cached)
+                return True
+        if (key, out_path) not in self._submitted:
+            messages = [{"role": ROLES.get(m.type, m.type), "content": m.content} for m in prompt.format_messages(**inputs)]
+            body = {"model": self.agent.model, "temperature": self.agent.temperature, "messages": messages}
+            # The hash is taken now: the file may change before the result comes back
+            request = {"file": file_path, "output": out_path, "header": header, "key": key, "hash": hash_file(file_path)}
+            self._new.append((request, body))
+        return False
+
+    def submit(self):
+        jobs_dir = os.path.join(self.out_dir, JOBS_DIR)
+        os.makedirs(jobs_dir, exist_ok=True)
+        job, size = [], 0
+        for i, (request, body) in enumerate(self._new):
+            custom_id = f"req-{i}"
+            line = json.dumps({"custom_id": custom_id, "method": "POST", "url": CHAT_URL, "body": body}) + "\n"
+            if job and (len(job) == self.max_requests or size + len(line) > self.max_bytes):
+                self._submit_job(jobs_dir, job)
+                job, size = [], 0
+            job.append((custom_id, request, line))
+            size += len(line)
+        if job:
+            self._submit_job(jobs_dir, job)
+        self._new = []
+
+    def _submit_job(self, jobs_dir: str, job: list):
+        job_path = os.path.join(jobs_dir, f"job-{uuid.uuid4().hex[:12]}.jsonl")
+        with open(job_path, "w") as f:
+            f.writelines(line for _, _, line in job)
+        with tracer.span("batch.submit", requests=len(job)):
+            batch_id = self.endpoint.submit(job_path)
+        self.batches.append({"id": batch_id, "job": job_path, "requests": {custom_id: request for custom_id, request, _ in job}})
+        self.submitted += len(job)
+        # Recorded before polling, so an interrupted run resumes this batch instead of resubmitting it
+        self._save()
+
+    def _ingest(self, batch: dict, on_written: Callable[[dict], None], on_failed: Callable[[str, str], None]):
+        seen = set()
+        for result in self.endpoint.results(batch["id"]):
+            request = batch["requests"].get(result.get("custom_id"))
+            if request is None:
+                continue
+            seen.add(result["custom_id"])
+            text = _response_text(result)
+            if text is None:
+                on_failed(request["file"], json.dumps(result.get("error") or result.get("response")))
+                continue
+            usage = (result["response"]["body"].get("usage") or {})
+            tracer.record_usage({"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0)})
+            if self.agent.cache is not None:
+                self.agent.cache.put(request["key"], text)
+            self._write(request["output"], request["header"], text)
+            on_written(request)
+        for custom_id, request in batch["requests"].items():
+            if custom_id not in seen:
+                on_failed(request["file"], "no result returned")
+
+    def run(self, on_written: Callable[[dict], None], on_failed: Callable[[str, str], None]) -> int:
+        """
+        Submits the queued requests and polls every outstanding batch,
+        ingesting results as batches finish. `on_written` gets the request
+        ({"file", "output", "hash", ...}) of every output written from a
+        result, and `on_failed` the file and reason of every request that
+        got none. With `poll_seconds` of 0, polls once and returns. Returns
+        the number of requests still outstanding.
+        """
+        self.submit()
+        while self.batches:
+            for batch in list(self.batches):
+                status = self.endpoint.status(batch["id"])
+                if status == "pending":
+                    continue
+                if status == "done":
+                    with tracer.span("batch.ingest", requests=len(batch["requests"])):
+                        self._ingest(batch, on_written, on_failed)
+                else:
+                    for request in batch["requests"].values():
+                        on_failed(request["file"], f"batch {batch['id']} failed")
+                self.batches.remove(batch)
+                self._save()
+                if os.path.exists(batch["job"]):
+                    os.remove(batch["job"])
+            if not self.batches or not self.poll_seconds:
+                break
+            time.sleep(self.poll_seconds)
+        jobs_dir = os.path.join(self.out_dir, JOBS_DIR)
+        if os.path.isdir(jobs_dir) and not os.listdir(jobs_dir):
+            os.rmdir(jobs_dir)
+        return sum(len(b["requests"]) for b in self.batches)
@@ -0,0 +1,256 @@
+import os
+import time
+import json
+import zlib
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+from docuai.compact import CompactMetadata
+from docuai.source import sources
+from docuai.tracing import tracer
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def default_cache_dir() -> str:
+    """
+    Returns the base directory for DocuAI's on-disk caches.
+    Honours $XDG_CACHE_HOME, falling back to ~/.cache/docuai.
+    """
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "docuai")
+
+class ResponseCache:
+    """
+    Content-addressed SQLite cache for LLM responses.
+
+    Entries are keyed on a hash of the rendered prompt (which embeds the
+    source and the template), the model name and the temperature. The total
+    size of stored responses is capped at `max_bytes`; the least recently
+    used entries are evicted first. A long-lived process can also keep the
+    `memory_entries` most recently used responses in memory.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES, memory_entries: int = 0):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, "responses.sqlite3")
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt, inputs: dict, model: str, temperature: float) -> str:
+        """
+        Builds the cache key for a prompt template rendered with `inputs`.
+        """
+        payload = json.dumps({
+            "prompt": prompt.format(**inputs),
+            "model": model,
+            "temperature": temperature,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if key in self._memory:
+            # Recency on disk is only refreshed on the way in; eviction there is coarse anyway
+            self._memory.move_to_end(key)
+            self.hits += 1
+            tracer.count("cache.hit")
+            return self._memory[key]
+
+        row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            tracer.count("cache.miss")
+            return None
+
+        self.hits += 1
+        tracer.count("cache.hit")
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        value = zlib.decompress(row[0]).decode("utf-8")
+        self._remember(key, value)
+        return value
+
+    def _remember(self, key: str, value: str):
+        if self.memory_entries:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key: str, value: str):
+        self._remember(key, value)
+        blob = zlib.compress(value.encode("utf-8"))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, blob, len(blob), time.time())
+        )
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Walk entries from least to most recently used until we are back under the cap
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def clear(self):
+        self._memory.clear()
+        self._conn.execute("DELETE FROM responses")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+class ParseCache:
+    """
+    Persistent cache of parsed CompactMetadata, stored as zlib-compressed
+    JSON. Entries hold line ranges rather than code, so they stay small.
+
+    A file hits when its real path, size, mtime and parser version match an
+    entry, or otherwise when any entry has the same content hash and parser
+    version (e.g. after a fresh clone). The database runs in WAL mode with a
+    busy timeout, so several DocuAI processes can share it safely. With
+    `memory_entries`, a long-lived process also keeps that many recent
+    entries decoded in memory.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, memory_entries: int = 0):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._memory = OrderedDict()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, "parses.sqlite3")
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parses ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " parser TEXT NOT NULL,"
+            " seconds REAL NOT NULL,"
+            " data BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parses_sha256 ON parses (sha256)")
+        self._conn.commit()
+
+    @staticmethod
+    def _parser_version(file_path: str) -> str:
+        # Imported here to keep the response cache free of parser dependencies
+        from docuai.parsers import get_parser
+        parser = get_parser(file_path)
+        return f"{type(parser).__name__}:{parser.version}"
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        # The parser reads the file through the same store, so this costs no extra read
+        return sources.read(path).sha256
+
+    def get(self, file_path: str) -> Optional[CompactMetadata]:
+        path = os.path.realpath(file_path)
+        parser = self._parser_version(file_path)
+        st = os.stat(path)
+        memory_key = (path, st.st_size, st.st_mtime_ns, parser)
+        if memory_key in self._memory:
+            self._memory.move_to_end(memory_key)
+            seconds, data = self._memory[memory_key]
+            return self._hit(file_path, seconds, data)
+
+        row = self._conn.execute(
+            "SELECT seconds, data FROM parses WHERE path = ? AND size = ? AND mtime_ns = ? AND parser = ?",
+            (path, st.st_size, st.st_mtime_ns, parser)
+        ).fetchone()
+
+        if row is None:
+            # Touched, moved or freshly cloned but possibly unchanged: fall back to the content hash
+            sha256 = self._sha256(path)
+            row = self._conn.execute(
+                "SELECT seconds, data FROM parses WHERE sha256 = ? AND parser = ? LIMIT 1", (sha256, parser)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                tracer.count("parse_cache.miss")
+                return None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parses (path, size, mtime_ns, sha256, parser, seconds, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, sha256, parser, row[0], row[1])
+            )
+            self._conn.commit()
+
+        data = json.loads(zlib.decompress(row[1]))
+        self._remember(memory_key, row[0], data)
+        return self._hit(file_path, row[0], data)
+
+    def _hit(self, file_path: str, seconds: float, data: dict) -> CompactMetadata:
+        self.hits += 1
+        tracer.count("parse_cache.hit")
+        self.seconds_saved += seconds
+        # A fresh object each time: the cached entry may have been recorded under a different path
+        metadata = CompactMetadata.from_dict(data)
+        metadata.file_path = file_path
+        return metadata
+
+    def _remember(self, memory_key: tuple, seconds: float, data: dict):
+        if self.memory_entries:
+            self._memory[memory_key] = (seconds, data)
+            self._memory.move_to_end(memory_key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def put(self, file_path: str, metadata: CompactMetadata, seconds: float):
+        path = os.path.realpath(file_path)
+        st = os.stat(path)
+        self._remember((path, st.st_size, st.st_mtime_ns, self._parser_version(file_path)), seconds, metadata.to_dict())
+        self._conn.execute(
+            "INSERT OR REPLACE INTO parses (path, size, mtime_ns, sha256, parser, seconds, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, self._sha256(path), self._parser_version(file_path),
+             seconds, zlib.compress(json.dumps(metadata.to_dict()).encode("utf-8")))
+        )
+        self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,108 @@
+from typing import Callable
+from docuai.compact import AnyMetadata
+
+# Files with more code tokens than this are documented in pieces, even when they would fit the context window
+DOC_CHUNK_TOKENS = 12000
+# Parts smaller than this hold too little code to document; the context limit is too small instead
+MIN_PART_TOKENS = 500
+
+def definition_segments(metadata: AnyMetadata, n_lines: int) -> list[tuple[str, int, int]]:
+    """
+    Splits a file into contiguous (label, start_line, end_line) segments along
+    its top-level definitions. Lines between definitions (decorators,
+    comments, module-level code) go with the definition that follows them,
+    so every line belongs to exactly one segment.
+    """
+    definitions = sorted(
+        [(f.name, f.start_line, f.end_line) for f in metadata.functions]
+        + [(c.name, c.start_line, c.end_line) for c in metadata.classes],
+        key=lambda d: d[1]
+    )
+    segments = []
+    start = 1
+    for name, first, last in definitions:
+        if first < start:
+            continue  # overlaps the previous definition
+        segments.append((name, start, last))
+        start = last + 1
+    if start <= n_lines:
+        if segments:
+            name, first, _ = segments[-1]
+            segments[-1] = (name, first, n_lines)
+        else:
+            segments.append(("<module>", 1, n_lines))
+    return segments
+
+def class_segments(metadata: AnyMetadata, name: str, start: int, end: int) -> list[tuple[str, int, int]]:
+    """
+    Splits one class segment into its header and one segment per method.
+    """
+    cls = next((c for c in metadata.classes if c.name == name), None)
+    if cls is None or not cls.methods:
+        return [(name, start, end)]
+    segments = []
+    first = start
+    for method in sorted(cls.methods, key=lambda m: m.start_line):
+        if method.start_line < first:
+            continue
+        if not segments and method.start_line > first:
+            segments.append((f"{name} (header)", first, method.start_line - 1))
+            first = method.start_line
+        # Decorators and comments before a method go with it
+        segments.append((f"{name}.{method.name}", first, method.end_line))
+        first = method.end_line + 1
+    if first <= end:
+        label, s, _ = segments[-1]
+        segments[-1] = (label, s, end)
+    return segments
+
+def line_segments(label: str, start: int, end: int, lines: list[str], budget: int, count: Callable[[str], int]) -> list[tuple[str, int, int]]:
+    """
+    Splits a segment that is still over budget on line boundaries.
+    """
+    segments = []
+    first = start
+    size = 0
+    for number in range(start, end + 1):
+        cost = count(lines[number - 1] + "\n")
+        if number > first and size + cost > budget:
+            segments.append((f"{label} (lines {first}-{number - 1})", first, number - 1))
+            first, size = number, 0
+        size += cost
+    segments.append((f"{label} (lines {first}-{end})" if segments else label, first, end))
+    return segments
+
+def split_definitions(metadata: AnyMetadata, lines: list[str], budget: int, count: Callable[[str], int]) -> list[tuple[list[str], int, int]]:
+    """
+    Packs a file into pieces of at most `budget` tokens (as measured by
+    `count`), cutting only between definitions where possible: large
+    classes are split by method and oversized functions by lines.
+    Consecutive segments are packed together in source order. Returns
+    (names, start_line, end_line) per piece.
+    """
+    def text(start, end):
+        return "\n".join(lines[start - 1:end]) + "\n"
+
+    segments = []
+    for label, start, end in definition_segments(metadata, len(lines)):
+        if count(text(start, end)) <= budget:
+            segments.append((label, start, end))
+            continue
+        for sub_label, sub_start, sub_end in class_segments(metadata, label, start, end):
+            if count(text(sub_start, sub_end)) <= budget:
+                segments.append((sub_label, sub_start, sub_end))
+            else:
+                segments.extend(line_segments(sub_label, sub_start, sub_end, lines, budget, count))
+
+    pieces = []
+    size = 0
+    for label, start, end in segments:
+        cost = count(text(start, end))
+        if pieces and size + cost <= budget:
+            names, first, _ = pieces[-1]
+            pieces[-1] = (names + [label], first, end)
+            size += cost
+        else:
+            pieces.append(([label], start, end))
+            size = cost
+    return pieces
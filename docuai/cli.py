@@ -1,33 +1,291 @@
 import typer
 import os
+import time
+import asyncio
+import itertools
+from typing import TYPE_CHECKING
+from collections import Counter
 from dotenv import load_dotenv
 from rich.console import Console
-from docuai.parsers.python_parser import PythonParser
-from docuai.parsers.js_parser import JSParser
-from docuai.agent import DocuAIAgent
-from docuai.git_utils import clone_repo, cleanup_repo, get_repo_files
+from rich.table import Table
+from docuai.parsers import get_parser
+from docuai.parsers.pool import DEFAULT_PARSE_TIMEOUT, default_workers, parse_files
+from docuai.cache import ParseCache, ResponseCache, default_cache_dir
+from docuai.git_utils import clone_repo, cleanup_repo, get_repo_files, changed_files
+from docuai.discovery import DEFAULT_MAX_FILE_BYTES, PathFilter
+from docuai.manifest import Manifest, hash_file
+from docuai.fanout import fan_out, run_sync
+from docuai.daemon import DEFAULT_IDLE_TIMEOUT, forward
+from docuai.batch import DEFAULT_POLL_SECONDS
+from docuai.prompt_compaction import DEFAULT_LEVEL as DEFAULT_COMPACTION, LEVELS as COMPACTION_LEVELS
+from docuai.tokens import DEFAULT_CONTEXT_LIMIT, DEFAULT_OUTPUT_RESERVE, RequestPlan
+from docuai.output import awrite_stream, write_stream
+from docuai.watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, open_watcher, walk_new_directory, watch_loop
+from docuai.ratelimit import RateLimiter
+from docuai.symbols import SymbolIndex
+from docuai.retrieval import DEFAULT_TOP_K, RetrievalIndex
+from docuai.dedup import DEFAULT_THRESHOLD, DuplicateClusters, find_duplicates
+from docuai.tokens import file_tokens
+from docuai.metrics import DEFAULT_TRIAGE_THRESHOLD, FileMetrics, measure_file, measure_repo, select_files
+from docuai.compact import AnyMetadata, CompactMetadata
+from docuai.tracing import tracer
+
+if TYPE_CHECKING:
+    from docuai.agent import DocuAIAgent
+
+# The LLM stack (langchain, openai) and the JS parsers take seconds to import, so
+# they are imported inside the functions that need them; `docuai --help` and
+# argument errors never load them. benchmarks/bench_startup.py guards this.
 
 load_dotenv()
 
 app = typer.Typer()
 console = Console()
 
-def get_parser(file_path: str):
-    if file_path.endswith(".py"):
-        return PythonParser()
-    elif file_path.endswith((".js", ".jsx", ".ts", ".tsx")):
-        return JSParser()
+def build_agent(
+    no_cache: bool = False,
+    cache_dir: str = None,
+    context_limit: int = DEFAULT_CONTEXT_LIMIT,
+    rpm: int = None,
+    tpm: int = None,
+    compaction: str = DEFAULT_COMPACTION,
+    dry_run: bool = False,
+) -> "DocuAIAgent":
+    from docuai.agent import DocuAIAgent
+    if compaction not in COMPACTION_LEVELS:
+        raise typer.BadParameter(f"expected one of: {', '.join(COMPACTION_LEVELS)}", param_hint="--compact")
+    if context_limit <= DEFAULT_OUTPUT_RESERVE:
+        raise typer.BadParameter(f"must be more than the {DEFAULT_OUTPUT_RESERVE} tokens reserved for the answer", param_hint="--context-limit")
+    cache = None if no_cache else ResponseCache(cache_dir)
+    rate_limiter = RateLimiter(rpm, tpm) if rpm or tpm else None
+    agent = DocuAIAgent(cache=cache, context_limit=context_limit, rate_limiter=rate_limiter, compaction=compaction)
+    if not dry_run:
+        # Builds the chat model now, so a missing API key fails before any work; dry runs never need it
+        agent.llm
+    return agent
+
+def clone_depth(depth: int = None, mirror: bool = False) -> int:
+    """
+    The history depth to clone a repository URL with: 1 unless `depth` is
+    given, and full history (None) for 0 or a mirror.
+    """
+    if mirror:
+        if depth is not None:
+            raise typer.BadParameter("a mirror always keeps full history", param_hint="--depth")
+        return None
+    return 1 if depth is None else depth or None
+
+def open_parse_cache(no_cache: bool = False, cache_dir: str = None) -> ParseCache:
+    return None if no_cache else ParseCache(cache_dir)
+
+def forward_to_daemon(command: str, params: dict, cache_dir: str = None):
+    """
+    Hands the command to a running `docuai serve` for the same cache
+    directory, if there is one, and exits with its status.
+    """
+    code = forward(command, params, cache_dir, console.width, console.is_terminal)
+    if code is not None:
+        raise typer.Exit(code)
+
+def report_cache(agent: "DocuAIAgent"):
+    if agent.cache is not None:
+        console.print(f"[bold cyan]Cache: {agent.cache.hits} hits, {agent.cache.misses} misses[/bold cyan]")
+
+def report_compaction(agent: "DocuAIAgent", top: int = 5):
+    stats = agent.compaction_stats
+    if not stats:
+        return
+    before = sum(b for b, _ in stats.values())
+    after = sum(a for _, a in stats.values())
+    console.print(
+        f"[bold cyan]Compaction ({agent.compaction}): ~{before:,} -> ~{after:,} source tokens "
+        f"({(before - after) / max(1, before):.0%} less) in {len(stats)} files[/bold cyan]"
+    )
+    for path, (b, a) in sorted(stats.items(), key=lambda item: item[1][0] - item[1][1], reverse=True)[:top]:
+        console.print(f"  {b - a:>8,} tokens ({(b - a) / max(1, b):>4.0%})  {path}")
+
+def report_rate_limits(agent: "DocuAIAgent"):
+    limiter = agent.rate_limiter
+    if limiter is not None and limiter.calls:
+        console.print(
+            f"[bold cyan]Rate limits: {limiter.calls} calls, {limiter.retries} retries, "
+            f"{limiter.throttled_seconds:.1f}s throttled, {limiter.working_seconds:.1f}s in calls[/bold cyan]"
+        )
+
+def report_parse_cache(parse_cache: ParseCache):
+    if parse_cache is not None and parse_cache.hits + parse_cache.misses:
+        console.print(
+            f"[bold cyan]Parse cache: {parse_cache.hits}/{parse_cache.hits + parse_cache.misses} hits "
+            f"({parse_cache.hit_rate:.0%}), ~{parse_cache.seconds_saved:.2f}s of parsing saved[/bold cyan]"
+        )
+
+def report_profile(profile: bool, trace_file: str = None):
+    if profile and tracer.spans:
+        table = Table(title="Profile")
+        table.add_column("Stage")
+        table.add_column("Count", justify="right")
+        table.add_column("Total s", justify="right")
+        table.add_column("Mean s", justify="right")
+        table.add_column("Max s", justify="right")
+        for name, count, total, mean, longest in tracer.summary():
+            table.add_row(name, str(count), f"{total:.3f}", f"{mean:.3f}", f"{longest:.3f}")
+        console.print(table)
+        for name, value in sorted(tracer.counters.items()):
+            console.print(f"  {name}: {value:,}")
+    if trace_file:
+        tracer.write(trace_file)
+        console.print(f"[bold cyan]Trace written to {trace_file}[/bold cyan]")
+
+def discover_files(root: str, max_file_kb: int = DEFAULT_MAX_FILE_BYTES // 1024, include_generated: bool = False) -> list[str]:
+    skipped = Counter()
+    with tracer.span("discover") as attrs:
+        files = sorted(get_repo_files(root, max_bytes=max_file_kb * 1024, skip_generated=not include_generated, skipped=skipped))
+        attrs["files"] = len(files)
+    if skipped:
+        reasons = ", ".join(f"{n} {reason}" for reason, n in [
+            (f"over {max_file_kb} KB", skipped["size"]), ("minified", skipped["minified"]), ("generated", skipped["generated"])
+        ] if n)
+        console.print(f"[dim]Skipped {sum(skipped.values())} files ({reasons}); see --max-file-kb and --include-generated[/dim]")
+    return files
+
+def dedup_files(agent: "DocuAIAgent", files: list[str], mode: str, threshold: float, per_file: bool) -> DuplicateClusters:
+    with tracer.span("dedup", files=len(files)):
+        clusters = find_duplicates(files, threshold)
+    if clusters.duplicates:
+        estimate = (lambda f: agent.estimate_file_tokens(f, mode)) if per_file else (lambda f: file_tokens(f, agent.model))
+        tokens = sum(estimate(f) for f in clusters.duplicates)
+        saved = f"{len(clusters.duplicates)} model calls and " if per_file else ""
+        console.print(
+            f"[bold cyan]Dedup: {len(clusters.duplicates)} duplicate files ({clusters.exact} exact, {clusters.near} near) "
+            f"in {len(clusters.clusters)} clusters; {saved}~{tokens:,} prompt tokens saved[/bold cyan]"
+        )
+    return clusters
+
+def triage_files(files: list[str], threshold: float, top: int = None) -> tuple[list[str], dict[str, FileMetrics]]:
+    with tracer.span("triage", files=len(files)):
+        metrics = measure_repo(files)
+        selected = select_files(metrics, threshold, top)
+    console.print(
+        f"[bold cyan]Triage: {len(selected)} of {len(files)} files selected for review, "
+        f"{len(files) - len(selected)} model calls skipped[/bold cyan]"
+    )
+    for path in selected[:5]:
+        console.print(f"  {metrics[path].score:>7.2f}  {path}")
+    # Keep discovery order so reports and manifests stay stable across runs
+    chosen = set(selected)
+    return [f for f in files if f in chosen], metrics
+
+def duplicates_section(clusters: DuplicateClusters, root: str) -> str:
+    if clusters is None or not clusters.duplicates:
+        return ""
+    lines = ["\n\n## Duplicate Files\n", "These files are identical or nearly identical to another file and were not sent to the model separately:\n"]
+    for dup, rep in sorted(clusters.duplicates.items()):
+        lines.append(f"- `{os.path.relpath(dup, root)}` → `{os.path.relpath(rep, root)}`")
+    return "\n".join(lines) + "\n"
+
+def write_duplicate_stubs(duplicates: list[str], clusters: DuplicateClusters, root: str, out_dir: str, manifest: Manifest = None):
+    from docuai.agent import PROMPT_VERSION
+    # Point each duplicate's output at its representative's instead of calling the model again
+    for file_path in duplicates:
+        out_path = per_file_output_path(file_path, root, out_dir)
+        rep = clusters.duplicates[file_path]
+        link = os.path.relpath(per_file_output_path(rep, root, out_dir), os.path.dirname(out_path))
+        with open(out_path, "w") as f:
+            f.write(
+                f"# {os.path.relpath(file_path, root)}\n\n"
+                f"This file is identical or nearly identical to `{os.path.relpath(rep, root)}`. See [its documentation]({link}).\n"
+            )
+        if manifest is not None:
+            manifest.record(os.path.relpath(file_path, root), hash_file(file_path), PROMPT_VERSION, output=out_path)
+
+def plan_run(
+    agent: "DocuAIAgent",
+    files: list[str],
+    root: str,
+    mode: str,
+    per_file: bool,
+    map_reduce: bool,
+    jobs: int,
+    parsed: dict[str, AnyMetadata] = None,
+    index: SymbolIndex = None,
+) -> RequestPlan:
+    from docuai.mapreduce import MapReducePipeline
+    if map_reduce and not per_file:
+        return MapReducePipeline(agent, root, mode, jobs).estimate(files)
+
+    plan = RequestPlan()
+    if per_file:
+        for f in files:
+            if mode == "generate":
+                # The same prompts generate_docs sends, cross-file context and parts included
+                metadata = parsed[f] if parsed is not None else get_parser(f).parse_compact(f)
+                requests = agent.estimate_doc_requests(metadata, index)
+            else:
+                requests = [(f, agent.estimate_file_tokens(f, mode))]
+            for label, tokens in requests:
+                plan.add(label, tokens, agent.prompt_budget)
     else:
-        raise ValueError(f"Unsupported file type: {file_path}")
+        plan.add(root, agent.estimate_repo_tokens(files, mode), agent.prompt_budget)
+    return plan
+
+def print_plan(plan: RequestPlan, agent: "DocuAIAgent"):
+    console.print(
+        f"[bold cyan]Dry run: {len(plan.requests)} request(s), ~{plan.total_tokens:,} prompt tokens "
+        f"(model {agent.model}, prompt budget {agent.prompt_budget:,} tokens)[/bold cyan]"
+    )
+    for label, tokens in sorted(plan.requests, key=lambda r: r[1], reverse=True)[:10]:
+        console.print(f"  {tokens:>10,}  {label}")
+    for label, tokens in plan.oversized:
+        console.print(f"[bold red]  {label} needs ~{tokens:,} tokens and will not fit the context window[/bold red]")
+
+def fits_single_prompt(agent: "DocuAIAgent", files: list[str], mode: str) -> bool:
+    needed = agent.estimate_repo_tokens(files, mode)
+    if needed <= agent.prompt_budget:
+        return True
+    console.print(
+        f"[bold yellow]Repository needs ~{needed:,} prompt tokens, more than the {agent.prompt_budget:,}-token budget. "
+        f"Switching to --map-reduce.[/bold yellow]"
+    )
+    return False
+
+def select_stale(files: list[str], root: str, manifest: Manifest, incremental: bool, base_ref: str = None) -> list[str]:
+    if not incremental:
+        return files
+
+    changed = None
+    if base_ref:
+        changed = changed_files(root, base_ref)
+        if changed is None:
+            console.print(f"[yellow]Cannot diff against {base_ref}; comparing content hashes instead.[/yellow]")
+    from docuai.agent import PROMPT_VERSION
+    stale = manifest.stale_files(files, root, PROMPT_VERSION, changed)
+    console.print(f"[bold cyan]Incremental: {len(files) - len(stale)} files up to date, {len(stale)} to regenerate[/bold cyan]")
+    return stale
+
+def write_report(out_path: str, text: str) -> bool:
+    with tracer.span("write", file=out_path):
+        # Leave an identical report untouched so its mtime only changes with its content
+        if os.path.exists(out_path):
+            with open(out_path, "r") as f:
+                if f.read() == text:
+                    return False
+        with open(out_path, "w") as f:
+            f.write(text)
+        return True
+
+def stream_to_file(out_path: str, chunks, header: str = ""):
+    with console.status(f"[bold green]Streaming to {out_path}...[/bold green]") as status:
+        write_stream(
+            out_path, chunks, header,
+            on_chunk=lambda n: status.update(f"[bold green]Streaming to {out_path}... {n:,} characters[/bold green]")
+        )
 
-def process_file_generate(file_path: str, output: str = None, agent: DocuAIAgent = None):
+def process_file_generate(file_path: str, output: str = None, agent: "DocuAIAgent" = None, stream: bool = False):
     try:
         parser = get_parser(file_path)
         console.print(f"[bold green]Parsing {file_path}...[/bold green]")
-        metadata = parser.parse(file_path)
-        
-        console.print(f"[bold green]Generating documentation for {os.path.basename(file_path)}...[/bold green]")
-        docs = agent.generate_docs(metadata)
+        with tracer.span("parse", file=file_path):
+            metadata = parser.parse_compact(file_path)
         
         # Auto-save to .md file
         if output:
@@ -41,17 +299,21 @@ def process_file_generate(file_path: str, output: str = None, agent: DocuAIAgent
             base_name = os.path.splitext(os.path.basename(file_path))[0]
             out_path = f"{base_name}_docs.md"
             
-        with open(out_path, "w") as f:
-            f.write(docs)
+        console.print(f"[bold green]Generating documentation for {os.path.basename(file_path)}...[/bold green]")
+        if stream:
+            stream_to_file(out_path, agent.stream_docs(metadata))
+        else:
+            docs = agent.generate_docs(metadata)
+            with open(out_path, "w") as f:
+                f.write(docs)
         console.print(f"[bold blue]✓ Documentation saved to {out_path}[/bold blue]")
             
     except Exception as e:
         console.print(f"[bold red]Error processing {file_path}: {e}[/bold red]")
 
-def process_file_analyze(file_path: str, output: str = None, agent: DocuAIAgent = None):
+def process_file_analyze(file_path: str, output: str = None, agent: "DocuAIAgent" = None, stream: bool = False, hints: str = None):
     try:
         console.print(f"[bold green]Analyzing {file_path}...[/bold green]")
-        analysis = agent.analyze_code(file_path)
         
         # Auto-save to .md file
         if output:
@@ -61,20 +323,255 @@ def process_file_analyze(file_path: str, output: str = None, agent: DocuAIAgent
             base_name = os.path.splitext(os.path.basename(file_path))[0]
             out_path = f"{base_name}_analysis.md"
             
-        with open(out_path, "w") as f:
-            f.write(f"# Code Analysis: {os.path.basename(file_path)}\n\n")
-            f.write(analysis)
+        header = f"# Code Analysis: {os.path.basename(file_path)}\n\n"
+        if stream:
+            stream_to_file(out_path, agent.stream_analysis(file_path, hints), header)
+        else:
+            analysis = agent.analyze_code(file_path, hints)
+            with open(out_path, "w") as f:
+                f.write(header)
+                f.write(analysis)
         console.print(f"[bold blue]✓ Analysis saved to {out_path}[/bold blue]")
             
     except Exception as e:
         console.print(f"[bold red]Error analyzing {file_path}: {e}[/bold red]")
 
+def per_file_output_path(file_path: str, root: str, out_dir: str) -> str:
+    # Mirror the repository layout inside the output directory
+    rel_path = os.path.relpath(file_path, root)
+    out_path = os.path.join(out_dir, rel_path + ".md")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    return out_path
+
+def parse_repo(files: list[str], parse_workers: int, parse_timeout: float, parse_cache: ParseCache = None) -> dict[str, AnyMetadata]:
+    console.print(f"[bold green]Parsing {len(files)} files with {parse_workers} workers...[/bold green]")
+    parsed = {}
+    for f, metadata, error in parse_files(files, parse_workers, parse_timeout, cache=parse_cache):
+        if error:
+            console.print(f"[red]Skipping {f}: {error}[/red]")
+        else:
+            parsed[f] = metadata
+    return parsed
+
+def build_index(parsed: dict[str, AnyMetadata], root: str) -> SymbolIndex:
+    with tracer.span("index.build", files=len(parsed)):
+        return SymbolIndex(parsed.values(), root)
+
+def run_focus(
+    agent: "DocuAIAgent",
+    query: str,
+    files: list[str],
+    root: str,
+    index_key: str,
+    mode: str,
+    out_path: str,
+    cache_dir: str = None,
+    top_k: int = DEFAULT_TOP_K,
+    parse_cache: ParseCache = None,
+    dry_run: bool = False,
+    stream: bool = False,
+):
+    index = RetrievalIndex(index_key, cache_dir)
+    try:
+        with tracer.span("index.update") as attrs:
+            stale = index.sync(files, root)
+            attrs["files"] = len(stale)
+            if stale:
+                console.print(f"[bold green]Indexing {len(stale)} new or changed files...[/bold green]")
+                parsed = parse_repo(stale, default_workers(), DEFAULT_PARSE_TIMEOUT, parse_cache)
+                # Files that cannot be parsed are still searchable as a whole
+                index.add([parsed.get(f) or CompactMetadata(f) for f in stale], root)
+        with tracer.span("retrieve"):
+            chunks = index.search(query, root, agent.focus_budget(query), top_k, agent.model)
+    finally:
+        index.close()
+
+    if not chunks:
+        console.print(f"[bold red]Nothing in the repository matches \"{query}\".[/bold red]")
+        return
+    tokens = sum(chunk.tokens for chunk in chunks)
+    console.print(f"[bold cyan]Focus: {len(chunks)} chunks from {len({c.path for c in chunks})} files, ~{tokens:,} tokens[/bold cyan]")
+    if dry_run:
+        for chunk in sorted(chunks, key=lambda c: c.score, reverse=True):
+            console.print(f"  {chunk.score:>7.2f}  {chunk.tokens:>7,}  {chunk.label}")
+        return
+
+    header = f"# {query}\n\n"
+    if stream:
+        stream_to_file(out_path, agent.stream_focused_report(query, chunks, mode), header)
+    else:
+        write_report(out_path, header + agent.focused_report(query, chunks, mode))
+    console.print(f"[bold blue]✓ Report saved to {out_path}[/bold blue]")
+
+def batch_per_file(
+    agent: "DocuAIAgent",
+    mode: str,
+    files: list[str],
+    root: str,
+    out_dir: str,
+    manifest: Manifest,
+    endpoint: str,
+    poll_seconds: float,
+    parsed: dict[str, AnyMetadata] = None,
+    index: SymbolIndex = None,
+    metrics: dict[str, FileMetrics] = None,
+) -> list[str]:
+    """
+    Sends the per-file requests through a batch endpoint and writes the
+    results. Returns the files too large for a single request, which still
+    need interactive calls.
+    """
+    from docuai.agent import PROMPT_VERSION
+    from docuai.batch import BatchRun, get_endpoint
+
+    run = BatchRun(agent, get_endpoint(endpoint, agent), out_dir, poll_seconds)
+    interactive = []
+    written = 0
+    for file_path in files:
+        out_path = per_file_output_path(file_path, root, out_dir)
+        if mode == "generate":
+            request = agent.doc_request(parsed[file_path], index)
+            if request is None:
+                interactive.append(file_path)
+                continue
+            header = ""
+        else:
+            request = agent.analysis_request(file_path, metrics[file_path].hints() if metrics and file_path in metrics else None)
+            header = f"# Code Analysis: {os.path.basename(file_path)}\n\n"
+        if run.add(file_path, out_path, *request, header=header):
+            written += 1
+            manifest.record(os.path.relpath(file_path, root), hash_file(file_path), PROMPT_VERSION, output=out_path)
+
+    def on_written(request: dict):
+        manifest.record(os.path.relpath(request["file"], root), request["hash"], PROMPT_VERSION, output=request["output"])
+        console.print(f"[bold blue]✓ {request['output']}[/bold blue]")
+
+    def on_failed(file_path: str, reason: str):
+        console.print(f"[red]Skipping {file_path}: {reason}[/red]")
+
+    if written:
+        console.print(f"[bold cyan]Batch: {written} files answered from the cache[/bold cyan]")
+    pending = run.queued
+    if pending:
+        console.print(f"[bold green]Batch: submitting {pending} requests...[/bold green]")
+    if run.batches or pending:
+        console.print(f"[bold green]Batch: waiting for results (polling every {poll_seconds:g}s)...[/bold green]" if poll_seconds
+                      else "[bold green]Batch: checking for results...[/bold green]")
+    outstanding = run.run(on_written, on_failed)
+    if outstanding:
+        console.print(f"[bold yellow]Batch: {outstanding} requests still running; run the same command again to collect them[/bold yellow]")
+    return interactive
+
+async def generate_per_file(
+    files: list[str],
+    root: str,
+    out_dir: str,
+    agent: "DocuAIAgent",
+    jobs: int,
+    manifest: Manifest = None,
+    parsed: dict[str, AnyMetadata] = None,
+    index: SymbolIndex = None,
+    stream: bool = False,
+):
+    from docuai.agent import PROMPT_VERSION
+    async def worker(file_path):
+        metadata = parsed[file_path]
+        out_path = per_file_output_path(file_path, root, out_dir)
+        if stream:
+            await awrite_stream(out_path, agent.astream_docs(metadata, index))
+        else:
+            docs = await agent.agenerate_docs(metadata, index)
+            with tracer.span("write", file=out_path), open(out_path, "w") as f:
+                f.write(docs)
+        return out_path
+
+    done = 0
+    async for file_path, out_path, error in fan_out(files, worker, jobs, priority=os.path.getsize):
+        done += 1
+        if error:
+            console.print(f"[red]Skipping {file_path}: {error}[/red]")
+            continue
+        if manifest is not None:
+            manifest.record(os.path.relpath(file_path, root), hash_file(file_path), PROMPT_VERSION, output=out_path)
+        console.print(f"[bold blue]✓ [{done}/{len(files)}] Documentation saved to {out_path}[/bold blue]")
+
+async def analyze_per_file(
+    files: list[str],
+    root: str,
+    out_dir: str,
+    agent: "DocuAIAgent",
+    jobs: int,
+    manifest: Manifest = None,
+    stream: bool = False,
+    metrics: dict[str, FileMetrics] = None,
+):
+    from docuai.agent import PROMPT_VERSION
+    async def worker(file_path):
+        out_path = per_file_output_path(file_path, root, out_dir)
+        header = f"# Code Analysis: {os.path.basename(file_path)}\n\n"
+        hints = metrics[file_path].hints() if metrics and file_path in metrics else None
+        if stream:
+            await awrite_stream(out_path, agent.astream_analysis(file_path, hints), header)
+        else:
+            analysis = await agent.aanalyze_code(file_path, hints)
+            with tracer.span("write", file=out_path), open(out_path, "w") as f:
+                f.write(header)
+                f.write(analysis)
+        return out_path
+
+    done = 0
+    async for file_path, out_path, error in fan_out(files, worker, jobs, priority=os.path.getsize):
+        done += 1
+        if error:
+            console.print(f"[red]Skipping {file_path}: {error}[/red]")
+            continue
+        if manifest is not None:
+            manifest.record(os.path.relpath(file_path, root), hash_file(file_path), PROMPT_VERSION, output=out_path)
+        console.print(f"[bold blue]✓ [{done}/{len(files)}] Analysis saved to {out_path}[/bold blue]")
+
 @app.command()
-def generate(input_path: str, output: str = None):
+def generate(
+    input_path: str,
+    output: str = None,
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always call the model and re-parse files, bypassing the on-disk caches."),
+    cache_dir: str = typer.Option(None, "--cache-dir", help="Directory for the response and parse caches (default: ~/.cache/docuai)."),
+    per_file: bool = typer.Option(False, "--per-file", help="Write one document per file instead of a single repository report."),
+    jobs: int = typer.Option(8, "--jobs", "-j", help="Maximum number of concurrent model calls in --per-file and --map-reduce mode."),
+    map_reduce: bool = typer.Option(False, "--map-reduce", help="Build the repository report from per-file and per-directory summaries."),
+    context_limit: int = typer.Option(DEFAULT_CONTEXT_LIMIT, "--context-limit", help="Model context window in tokens, used to size and pack requests."),
+    compact: str = typer.Option(DEFAULT_COMPACTION, "--compact", help="Source compaction before prompting: none, light (banners, blank lines), literals (also long strings and data tables) or signatures (also long private function bodies)."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report the planned requests and token counts without calling the model."),
+    incremental: bool = typer.Option(False, "--incremental", help="Only regenerate outputs whose sources changed since the last run."),
+    base_ref: str = typer.Option(None, "--base-ref", help="With --incremental, trust files unchanged since this git ref without hashing them."),
+    depth: int = typer.Option(None, "--depth", help="History depth when cloning a repository URL (default 1, 0 for full history). Not allowed with --mirror, which keeps full history."),
+    clone_filter: str = typer.Option(None, "--clone-filter", help="Partial-clone filter for repository URLs, e.g. blob:none."),
+    ref: str = typer.Option(None, "--ref", help="Branch or tag to document when cloning a repository URL."),
+    mirror: bool = typer.Option(False, "--mirror", help="Keep a local mirror of repository URLs and update it with git fetch."),
+    stream: bool = typer.Option(False, "--stream", help="Write model output to disk as it is generated."),
+    rpm: int = typer.Option(None, "--rpm", help="Requests-per-minute limit to pace model calls under."),
+    tpm: int = typer.Option(None, "--tpm", help="Tokens-per-minute limit to pace model calls under."),
+    profile: bool = typer.Option(False, "--profile", help="Print a per-stage timing, token and cache summary at the end of the run."),
+    trace_file: str = typer.Option(None, "--trace-file", help="Write timed spans to this file: JSON lines for *.jsonl, otherwise Chrome trace format."),
+    focus: str = typer.Option(None, "--focus", help="Only cover the code most relevant to this query, retrieved from a local search index."),
+    top_k: int = typer.Option(DEFAULT_TOP_K, "--top-k", help="Maximum number of code chunks retrieved for --focus."),
+    dedup: bool = typer.Option(False, "--dedup", help="Send one representative of each group of identical or near-identical files to the model."),
+    dedup_threshold: float = typer.Option(DEFAULT_THRESHOLD, "--dedup-threshold", help="Estimated similarity (0-1) at which --dedup treats two files as near-duplicates."),
+    max_file_kb: int = typer.Option(DEFAULT_MAX_FILE_BYTES // 1024, "--max-file-kb", help="Skip source files larger than this many kilobytes (0 for no limit)."),
+    include_generated: bool = typer.Option(False, "--include-generated", help="Keep files that look minified or generated (e.g. *.min.js, '@generated' headers)."),
+    batch: bool = typer.Option(False, "--batch", help="Send per-file requests through a batch endpoint: slower, but cheaper for large runs."),
+    batch_endpoint: str = typer.Option("openai", "--batch-endpoint", help="Batch endpoint for --batch: 'openai', or 'local:<dir>' for a file-based stand-in."),
+    batch_poll: float = typer.Option(DEFAULT_POLL_SECONDS, "--batch-poll", help="Seconds between batch status checks (0 to submit, check once and exit)."),
+    parse_workers: int = typer.Option(default_workers(), "--parse-workers", help="Number of processes used to parse source files."),
+    parse_timeout: float = typer.Option(DEFAULT_PARSE_TIMEOUT, "--parse-timeout", help="Seconds before giving up on parsing a single file."),
+):
     """
     Generate documentation for a code file, a GitHub repository, or a local directory.
     """
-    agent = DocuAIAgent()
+    forward_to_daemon("generate", dict(locals()), cache_dir)
+    tracer.reset(enabled=profile or bool(trace_file))
+    clone_depth(depth, mirror)
+    agent = build_agent(no_cache, cache_dir, context_limit, rpm, tpm, compact, dry_run)
+    parse_cache = open_parse_cache(no_cache, cache_dir)
     
     files = []
     temp_dir = None
@@ -82,15 +579,19 @@ def generate(input_path: str, output: str = None):
     try:
         if input_path.startswith("http://") or input_path.startswith("https://"):
             console.print(f"[bold yellow]Cloning repository from {input_path}...[/bold yellow]")
-            temp_dir = clone_repo(input_path)
+            mirror_dir = os.path.join(cache_dir or default_cache_dir(), "mirrors") if mirror else None
+            temp_dir = clone_repo(input_path, clone_depth(depth, mirror), clone_filter, ref, mirror_dir)
             console.print(f"[bold green]Repository cloned to {temp_dir}[/bold green]")
-            files = list(get_repo_files(temp_dir))
+            files = discover_files(temp_dir, max_file_kb, include_generated)
         elif os.path.isdir(input_path):
             console.print(f"[bold yellow]Processing directory {input_path}...[/bold yellow]")
-            files = list(get_repo_files(input_path))
+            files = discover_files(input_path, max_file_kb, include_generated)
         else:
             # Single file processing
-            process_file_generate(input_path, output, agent)
+            if dry_run:
+                print_plan(plan_run(agent, [input_path], input_path, "generate", True, False, jobs), agent)
+                return
+            process_file_generate(input_path, output, agent, stream)
             return
 
         # Repo/Dir processing
@@ -98,43 +599,151 @@ def generate(input_path: str, output: str = None):
             console.print("[bold red]No supported files found.[/bold red]")
             return
 
-        console.print(f"[bold green]Parsing {len(files)} files...[/bold green]")
-        metadata_list = []
-        for f in files:
-            try:
-                parser = get_parser(f)
-                metadata_list.append(parser.parse(f))
-            except Exception as e:
-                console.print(f"[red]Skipping {f}: {e}[/red]")
-        
-        console.print("[bold green]Generating repository documentation...[/bold green]")
-        docs = agent.generate_repo_docs(metadata_list)
+        dir_name = os.path.basename(os.path.abspath(input_path if not temp_dir else temp_dir))
+        root = temp_dir or input_path
+
+        if focus:
+            index_key = input_path if temp_dir else os.path.realpath(input_path)
+            out_path = output or f"{dir_name}_documentation.md"
+            run_focus(agent, focus, files, root, index_key, "generate", out_path, cache_dir, top_k, parse_cache, dry_run, stream)
+            return
+
+        if batch and not per_file:
+            console.print("[bold yellow]--batch writes per-file output. Switching to --per-file.[/bold yellow]")
+            per_file = True
+
+        clusters = dedup_files(agent, files, "generate", dedup_threshold, per_file) if dedup else None
+
+        if per_file:
+            out_dir = output or f"{dir_name}_docs"
+            manifest = Manifest.for_directory(out_dir)
+            todo = select_stale(files, root, manifest, incremental, base_ref)
+            stubs = [f for f in todo if clusters and f in clusters.duplicates]
+            todo = [f for f in todo if f not in stubs]
+            # Every file is parsed, not just the stale ones, since any of them may be imported
+            parsed = parse_repo(files, parse_workers, parse_timeout, parse_cache)
+            index = build_index(parsed, root)
+            if incremental:
+                # Files whose imports changed get new context, so their docs are stale too
+                dependents = index.dependents(todo) - set(todo)
+                if dependents:
+                    console.print(f"[bold cyan]Incremental: {len(dependents)} more files import changed files[/bold cyan]")
+                    todo = todo + [f for f in files if f in dependents]
+            todo = [f for f in todo if f in parsed]
+            if dry_run:
+                print_plan(plan_run(agent, todo, root, "generate", True, False, jobs, parsed, index), agent)
+                return
+            manifest.prune([os.path.relpath(f, root) for f in files])
+            if batch:
+                todo = batch_per_file(agent, "generate", todo, root, out_dir, manifest, batch_endpoint, batch_poll, parsed=parsed, index=index)
+            if todo:
+                console.print(f"[bold green]Documenting {len(todo)} files with {jobs} concurrent jobs...[/bold green]")
+                run_sync(generate_per_file(todo, root, out_dir, agent, jobs, manifest, parsed, index, stream))
+            write_duplicate_stubs(stubs, clusters, root, out_dir, manifest)
+            manifest.save()
+            return
+
+        if incremental and not map_reduce:
+            console.print("[bold yellow]--incremental needs per-file or map-reduce output. Switching to --map-reduce.[/bold yellow]")
+            map_reduce = True
+
+        if clusters is not None:
+            files = clusters.representatives(files)
+
+        if not map_reduce:
+            map_reduce = not fits_single_prompt(agent, files, "generate")
+
+        if dry_run:
+            print_plan(plan_run(agent, files, root, "generate", False, map_reduce, jobs), agent)
+            return
+
+        # Auto-generate filename based on directory name
+        out_path = output or f"{dir_name}_documentation.md"
+
+        if map_reduce:
+            console.print(f"[bold green]Summarizing {len(files)} files with {jobs} concurrent jobs...[/bold green]")
+            manifest = Manifest.for_report(out_path)
+            if not incremental:
+                manifest.entries = {}
+            from docuai.mapreduce import MapReducePipeline
+            pipeline = MapReducePipeline(agent, root, "generate", jobs, manifest=manifest)
+            docs = run_sync(pipeline.run(files))
+            manifest.save()
+            if incremental:
+                console.print(f"[bold cyan]Incremental: reused {pipeline.reused} stored summaries[/bold cyan]")
+        else:
+            parsed = parse_repo(files, parse_workers, parse_timeout, parse_cache)
+            # Results arrive in completion order; keep the prompt stable across runs
+            metadata_list = [parsed[f] for f in files if f in parsed]
+            
+            console.print("[bold green]Generating repository documentation...[/bold green]")
+            if stream:
+                stream_to_file(out_path, itertools.chain(agent.stream_repo_docs(metadata_list), [duplicates_section(clusters, root)]))
+                console.print(f"[bold blue]✓ Documentation saved to {out_path}[/bold blue]")
+                return
+            docs = agent.generate_repo_docs(metadata_list)
         
         # Auto-save repo docs
-        if output:
-            out_path = output
+        if write_report(out_path, docs + duplicates_section(clusters, root)):
+            console.print(f"[bold blue]✓ Documentation saved to {out_path}[/bold blue]")
         else:
-            # Auto-generate filename based on directory name
-            dir_name = os.path.basename(os.path.abspath(input_path if not temp_dir else temp_dir))
-            out_path = f"{dir_name}_documentation.md"
-            
-        with open(out_path, "w") as f:
-            f.write(docs)
-        console.print(f"[bold blue]✓ Documentation saved to {out_path}[/bold blue]")
+            console.print(f"[bold blue]✓ Documentation in {out_path} is up to date[/bold blue]")
             
     except Exception as e:
         console.print(f"[bold red]Error: {e}[/bold red]")
     finally:
+        report_cache(agent)
+        report_compaction(agent)
+        report_rate_limits(agent)
+        report_parse_cache(parse_cache)
+        report_profile(profile, trace_file)
         if temp_dir:
             cleanup_repo(temp_dir)
             console.print("[bold yellow]Repository cleaned up.[/bold yellow]")
 
 @app.command()
-def analyze(input_path: str, output: str = None):
+def analyze(
+    input_path: str,
+    output: str = None,
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always call the model and re-parse files, bypassing the on-disk caches."),
+    cache_dir: str = typer.Option(None, "--cache-dir", help="Directory for the response and parse caches (default: ~/.cache/docuai)."),
+    per_file: bool = typer.Option(False, "--per-file", help="Write one document per file instead of a single repository report."),
+    jobs: int = typer.Option(8, "--jobs", "-j", help="Maximum number of concurrent model calls in --per-file and --map-reduce mode."),
+    map_reduce: bool = typer.Option(False, "--map-reduce", help="Build the repository report from per-file and per-directory summaries."),
+    context_limit: int = typer.Option(DEFAULT_CONTEXT_LIMIT, "--context-limit", help="Model context window in tokens, used to size and pack requests."),
+    compact: str = typer.Option(DEFAULT_COMPACTION, "--compact", help="Source compaction before prompting: none, light (banners, blank lines), literals (also long strings and data tables) or signatures (also long private function bodies)."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report the planned requests and token counts without calling the model."),
+    incremental: bool = typer.Option(False, "--incremental", help="Only regenerate outputs whose sources changed since the last run."),
+    base_ref: str = typer.Option(None, "--base-ref", help="With --incremental, trust files unchanged since this git ref without hashing them."),
+    depth: int = typer.Option(None, "--depth", help="History depth when cloning a repository URL (default 1, 0 for full history). Not allowed with --mirror, which keeps full history."),
+    clone_filter: str = typer.Option(None, "--clone-filter", help="Partial-clone filter for repository URLs, e.g. blob:none."),
+    ref: str = typer.Option(None, "--ref", help="Branch or tag to document when cloning a repository URL."),
+    mirror: bool = typer.Option(False, "--mirror", help="Keep a local mirror of repository URLs and update it with git fetch."),
+    stream: bool = typer.Option(False, "--stream", help="Write model output to disk as it is generated."),
+    rpm: int = typer.Option(None, "--rpm", help="Requests-per-minute limit to pace model calls under."),
+    tpm: int = typer.Option(None, "--tpm", help="Tokens-per-minute limit to pace model calls under."),
+    profile: bool = typer.Option(False, "--profile", help="Print a per-stage timing, token and cache summary at the end of the run."),
+    trace_file: str = typer.Option(None, "--trace-file", help="Write timed spans to this file: JSON lines for *.jsonl, otherwise Chrome trace format."),
+    focus: str = typer.Option(None, "--focus", help="Only cover the code most relevant to this query, retrieved from a local search index."),
+    top_k: int = typer.Option(DEFAULT_TOP_K, "--top-k", help="Maximum number of code chunks retrieved for --focus."),
+    dedup: bool = typer.Option(False, "--dedup", help="Send one representative of each group of identical or near-identical files to the model."),
+    dedup_threshold: float = typer.Option(DEFAULT_THRESHOLD, "--dedup-threshold", help="Estimated similarity (0-1) at which --dedup treats two files as near-duplicates."),
+    max_file_kb: int = typer.Option(DEFAULT_MAX_FILE_BYTES // 1024, "--max-file-kb", help="Skip source files larger than this many kilobytes (0 for no limit)."),
+    include_generated: bool = typer.Option(False, "--include-generated", help="Keep files that look minified or generated (e.g. *.min.js, '@generated' headers)."),
+    batch: bool = typer.Option(False, "--batch", help="Send per-file requests through a batch endpoint: slower, but cheaper for large runs."),
+    batch_endpoint: str = typer.Option("openai", "--batch-endpoint", help="Batch endpoint for --batch: 'openai', or 'local:<dir>' for a file-based stand-in."),
+    batch_poll: float = typer.Option(DEFAULT_POLL_SECONDS, "--batch-poll", help="Seconds between batch status checks (0 to submit, check once and exit)."),
+    triage: bool = typer.Option(False, "--triage", help="Measure files locally and only send those with notable complexity or duplication to the model."),
+    triage_threshold: float = typer.Option(DEFAULT_TRIAGE_THRESHOLD, "--triage-threshold", help="Minimum triage score for a file to be reviewed by the model."),
+    triage_top: int = typer.Option(None, "--triage-top", help="Review the N highest-scoring files instead of using --triage-threshold."),
+):
     """
     Analyze code for smells and improvements.
     """
-    agent = DocuAIAgent()
+    forward_to_daemon("analyze", dict(locals()), cache_dir)
+    tracer.reset(enabled=profile or bool(trace_file))
+    clone_depth(depth, mirror)
+    agent = build_agent(no_cache, cache_dir, context_limit, rpm, tpm, compact, dry_run)
     
     files = []
     temp_dir = None
@@ -142,15 +751,20 @@ def analyze(input_path: str, output: str = None):
     try:
         if input_path.startswith("http://") or input_path.startswith("https://"):
             console.print(f"[bold yellow]Cloning repository from {input_path}...[/bold yellow]")
-            temp_dir = clone_repo(input_path)
+            mirror_dir = os.path.join(cache_dir or default_cache_dir(), "mirrors") if mirror else None
+            temp_dir = clone_repo(input_path, clone_depth(depth, mirror), clone_filter, ref, mirror_dir)
             console.print(f"[bold green]Repository cloned to {temp_dir}[/bold green]")
-            files = list(get_repo_files(temp_dir))
+            files = discover_files(temp_dir, max_file_kb, include_generated)
         elif os.path.isdir(input_path):
             console.print(f"[bold yellow]Processing directory {input_path}...[/bold yellow]")
-            files = list(get_repo_files(input_path))
+            files = discover_files(input_path, max_file_kb, include_generated)
         else:
             # Single file processing
-            process_file_analyze(input_path, output, agent)
+            if dry_run:
+                print_plan(plan_run(agent, [input_path], input_path, "analyze", True, False, jobs), agent)
+                return
+            hints = measure_file(input_path).hints() if triage or triage_top else None
+            process_file_analyze(input_path, output, agent, stream, hints)
             return
 
         # Repo/Dir processing
@@ -158,28 +772,224 @@ def analyze(input_path: str, output: str = None):
             console.print("[bold red]No supported files found.[/bold red]")
             return
 
-        console.print(f"[bold green]Analyzing {len(files)} files...[/bold green]")
-        analysis = agent.analyze_repo(files)
+        dir_name = os.path.basename(os.path.abspath(input_path if not temp_dir else temp_dir))
+        root = temp_dir or input_path
+
+        if focus:
+            index_key = input_path if temp_dir else os.path.realpath(input_path)
+            out_path = output or f"{dir_name}_analysis.md"
+            run_focus(agent, focus, files, root, index_key, "analyze", out_path, cache_dir, top_k, None, dry_run, stream)
+            return
+
+        if batch and not per_file:
+            console.print("[bold yellow]--batch writes per-file output. Switching to --per-file.[/bold yellow]")
+            per_file = True
+
+        clusters = dedup_files(agent, files, "analyze", dedup_threshold, per_file) if dedup else None
+        metrics = None
+        # Triage only picks what to review now; files below the threshold keep their earlier results
+        discovered = files
+        if triage or triage_top:
+            files, metrics = triage_files(files, triage_threshold, triage_top)
+            if not files:
+                console.print("[bold green]No files need a review.[/bold green]")
+                return
+
+        if per_file:
+            out_dir = output or f"{dir_name}_analysis"
+            manifest = Manifest.for_directory(out_dir)
+            todo = select_stale(files, root, manifest, incremental, base_ref)
+            stubs = [f for f in todo if clusters and f in clusters.duplicates]
+            todo = [f for f in todo if f not in stubs]
+            if dry_run:
+                print_plan(plan_run(agent, todo, root, "analyze", True, False, jobs), agent)
+                return
+            manifest.prune([os.path.relpath(f, root) for f in discovered])
+            if batch:
+                batch_per_file(agent, "analyze", todo, root, out_dir, manifest, batch_endpoint, batch_poll, metrics=metrics)
+            else:
+                console.print(f"[bold green]Analyzing {len(todo)} files with {jobs} concurrent jobs...[/bold green]")
+                run_sync(analyze_per_file(todo, root, out_dir, agent, jobs, manifest, stream, metrics))
+            write_duplicate_stubs(stubs, clusters, root, out_dir, manifest)
+            manifest.save()
+            return
+
+        if incremental and not map_reduce:
+            console.print("[bold yellow]--incremental needs per-file or map-reduce output. Switching to --map-reduce.[/bold yellow]")
+            map_reduce = True
+
+        if clusters is not None:
+            files = clusters.representatives(files)
+
+        if not map_reduce:
+            map_reduce = not fits_single_prompt(agent, files, "analyze")
+
+        if dry_run:
+            print_plan(plan_run(agent, files, root, "analyze", False, map_reduce, jobs), agent)
+            return
+
+        # Auto-generate filename based on directory name
+        out_path = output or f"{dir_name}_analysis.md"
+
+        if map_reduce:
+            console.print(f"[bold green]Summarizing {len(files)} files with {jobs} concurrent jobs...[/bold green]")
+            manifest = Manifest.for_report(out_path)
+            if not incremental:
+                manifest.entries = {}
+            from docuai.mapreduce import MapReducePipeline
+            pipeline = MapReducePipeline(agent, root, "analyze", jobs, manifest=manifest)
+            analysis = run_sync(pipeline.run(files))
+            manifest.save()
+            if incremental:
+                console.print(f"[bold cyan]Incremental: reused {pipeline.reused} stored summaries[/bold cyan]")
+        else:
+            console.print(f"[bold green]Analyzing {len(files)} files...[/bold green]")
+            if stream:
+                hints = {f: m.hints() for f, m in metrics.items()} if metrics else None
+                chunks = itertools.chain(agent.stream_repo_analysis(files, hints), [duplicates_section(clusters, root)])
+                stream_to_file(out_path, chunks, "# Code Analysis Report\n\n")
+                console.print(f"[bold blue]✓ Analysis saved to {out_path}[/bold blue]")
+                return
+            analysis = agent.analyze_repo(files, {f: m.hints() for f, m in metrics.items()} if metrics else None)
         
         # Auto-save repo analysis
-        if output:
-            out_path = output
+        if write_report(out_path, f"# Code Analysis Report\n\n{analysis}" + duplicates_section(clusters, root)):
+            console.print(f"[bold blue]✓ Analysis saved to {out_path}[/bold blue]")
         else:
-            # Auto-generate filename based on directory name
-            dir_name = os.path.basename(os.path.abspath(input_path if not temp_dir else temp_dir))
-            out_path = f"{dir_name}_analysis.md"
-            
-        with open(out_path, "w") as f:
-            f.write(f"# Code Analysis Report\n\n")
-            f.write(analysis)
-        console.print(f"[bold blue]✓ Analysis saved to {out_path}[/bold blue]")
+            console.print(f"[bold blue]✓ Analysis in {out_path} is up to date[/bold blue]")
             
     except Exception as e:
         console.print(f"[bold red]Error: {e}[/bold red]")
     finally:
+        report_cache(agent)
+        report_compaction(agent)
+        report_rate_limits(agent)
+        report_profile(profile, trace_file)
         if temp_dir:
             cleanup_repo(temp_dir)
             console.print("[bold yellow]Repository cleaned up.[/bold yellow]")
 
+@app.command()
+def watch(
+    input_path: str,
+    output: str = None,
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always call the model and re-parse files, bypassing the on-disk caches."),
+    cache_dir: str = typer.Option(None, "--cache-dir", help="Directory for the response and parse caches (default: ~/.cache/docuai)."),
+    jobs: int = typer.Option(4, "--jobs", "-j", help="Maximum number of files regenerated at once."),
+    context_limit: int = typer.Option(DEFAULT_CONTEXT_LIMIT, "--context-limit", help="Model context window in tokens, used to size and pack requests."),
+    compact: str = typer.Option(DEFAULT_COMPACTION, "--compact", help="Source compaction before prompting: none, light (banners, blank lines), literals (also long strings and data tables) or signatures (also long private function bodies)."),
+    rpm: int = typer.Option(None, "--rpm", help="Requests-per-minute limit to pace model calls under."),
+    tpm: int = typer.Option(None, "--tpm", help="Tokens-per-minute limit to pace model calls under."),
+    debounce: float = typer.Option(DEFAULT_DEBOUNCE, "--debounce", help="Seconds without further changes before a burst of saves is acted on."),
+    poll: bool = typer.Option(False, "--poll", help="Poll for changes instead of using inotify (e.g. on network filesystems)."),
+    poll_interval: float = typer.Option(DEFAULT_POLL_INTERVAL, "--poll-interval", help="Seconds between checks with --poll or where inotify is unavailable."),
+    skip_initial: bool = typer.Option(False, "--skip-initial", help="Only react to new changes, without first updating stale docs."),
+    max_file_kb: int = typer.Option(DEFAULT_MAX_FILE_BYTES // 1024, "--max-file-kb", help="Skip source files larger than this many kilobytes (0 for no limit)."),
+    include_generated: bool = typer.Option(False, "--include-generated", help="Keep files that look minified or generated (e.g. *.min.js, '@generated' headers)."),
+    parse_workers: int = typer.Option(default_workers(), "--parse-workers", help="Number of processes used to parse source files."),
+    parse_timeout: float = typer.Option(DEFAULT_PARSE_TIMEOUT, "--parse-timeout", help="Seconds before giving up on parsing a single file."),
+):
+    """
+    Keep per-file documentation of a directory up to date as files change.
+    """
+    # Only watch mode keeps a pool around between parses
+    from concurrent.futures import ProcessPoolExecutor
+    from docuai.agent import PROMPT_VERSION
+
+    if not os.path.isdir(input_path):
+        raise typer.BadParameter("watch needs a directory", param_hint="INPUT_PATH")
+    agent = build_agent(no_cache, cache_dir, context_limit, rpm, tpm, compact)
+    parse_cache = open_parse_cache(no_cache, cache_dir)
+    root = input_path
+    out_dir = output or f"{os.path.basename(os.path.abspath(root))}_docs"
+    path_filter = PathFilter(root, max_file_kb * 1024, not include_generated)
+
+    # Watch before the initial pass, so edits made during it are not missed
+    directories, _ = walk_new_directory(root, path_filter.accepts_dir)
+    files = discover_files(root, max_file_kb, include_generated)
+    watcher = open_watcher(directories, files, poll, poll_interval)
+    manifest = Manifest.for_directory(out_dir)
+    parsed = parse_repo(files, parse_workers, parse_timeout, parse_cache)
+    index = build_index(parsed, root)
+    # Edited files are re-parsed in a worker process, so the parse timeout applies and the event loop keeps running
+    parse_pool = ProcessPoolExecutor(max_workers=max(1, min(jobs, parse_workers)))
+
+    def parse_one(file_path: str):
+        return next(parse_files([file_path], 1, parse_timeout, executor=parse_pool, cache=parse_cache))
+
+    def accepts(path: str) -> bool:
+        # Deleted files no longer pass the filter, but their docs still have to go
+        return path in parsed or path_filter.accepts(path)
+
+    async def regenerate(file_path: str, forced: bool, changed_at: float) -> list[str]:
+        rel_path = os.path.relpath(file_path, root)
+        if not os.path.exists(file_path):
+            if file_path not in parsed:
+                return []
+            # Its importers' prompts quoted its signatures, which are now gone
+            importers = index.dependents([file_path]) - {file_path}
+            del parsed[file_path]
+            index.remove(file_path)
+            manifest.prune(set(manifest.entries) - {rel_path})
+            manifest.save()
+            console.print(f"[bold yellow]✗ {rel_path} deleted; its documentation was removed[/bold yellow]")
+            return sorted(p for p in importers if p in parsed)
+        content_hash = hash_file(file_path)
+        if not forced and manifest.is_current(rel_path, content_hash, PROMPT_VERSION):
+            # Saved without changes
+            return []
+        _, metadata, error = await asyncio.to_thread(parse_one, file_path)
+        if error:
+            raise error
+        interface = index.definitions.get(file_path)
+        parsed[file_path] = metadata
+        index.update(metadata)
+        out_path = per_file_output_path(file_path, root, out_dir)
+        docs = await agent.agenerate_docs(metadata, index)
+        write_stream(out_path, [docs])
+        manifest.record(rel_path, content_hash, PROMPT_VERSION, output=out_path)
+        manifest.save()
+        console.print(f"[bold blue]✓ {out_path} updated {time.monotonic() - changed_at:.1f}s after the change[/bold blue]")
+        # Importers see this file's signatures in their prompts; only an interface change makes them stale
+        return sorted(index.dependents([file_path])) if index.definitions[file_path] != interface else []
+
+    async def main():
+        if not skip_initial:
+            todo = [f for f in select_stale(files, root, manifest, True) if f in parsed]
+            if todo:
+                console.print(f"[bold green]Updating {len(todo)} stale files first...[/bold green]")
+                await generate_per_file(todo, root, out_dir, agent, jobs, manifest, parsed, index)
+                manifest.save()
+        console.print(f"[bold green]Watching {root} ({type(watcher).__name__}); Ctrl-C to stop[/bold green]")
+        await watch_loop(
+            watcher, accepts, path_filter.accepts_dir, regenerate, debounce, jobs,
+            on_cancel=lambda path: console.print(f"[dim]{os.path.relpath(path, root)} changed again; restarting[/dim]"),
+            on_error=lambda path, e: console.print(f"[red]Skipping {path}: {e}[/red]"),
+        )
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        parse_pool.shutdown(cancel_futures=True)
+        manifest.save()
+        report_cache(agent)
+        report_compaction(agent)
+
+@app.command()
+def serve(
+    cache_dir: str = typer.Option(None, "--cache-dir", help="Cache directory to serve; commands run with the same --cache-dir are forwarded here."),
+    socket: str = typer.Option(None, "--socket", help="Unix socket to listen on (default: daemon.sock in the cache directory)."),
+    idle_timeout: float = typer.Option(DEFAULT_IDLE_TIMEOUT, "--idle-timeout", help="Exit after this many seconds without a request (0 to run until interrupted)."),
+):
+    """
+    Keep the agent, HTTP connections and caches warm for generate/analyze.
+    """
+    from docuai.daemon import serve as run_daemon
+    run_daemon(cache_dir, socket, idle_timeout,
+               announce=lambda path: console.print(f"[bold green]Serving on {path} (Ctrl-C to stop)[/bold green]"))
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,174 @@
+from array import array
+from typing import TYPE_CHECKING, Optional, Union
+from docuai.source import sources
+
+if TYPE_CHECKING:
+    from docuai.models import ClassMetadata, FileMetadata, FunctionMetadata
+
+class FunctionView:
+    """
+    Read-only view of one function row of a CompactMetadata, with the same
+    attributes as FunctionMetadata. `code` is sliced from the source on access.
+    """
+
+    __slots__ = ("_meta", "_row")
+
+    def __init__(self, meta: "CompactMetadata", row: int):
+        self._meta = meta
+        self._row = row
+
+    name = property(lambda self: self._meta.function_names[self._row])
+    args = property(lambda self: list(self._meta.function_args[self._row]))
+    returns = property(lambda self: self._meta.function_returns[self._row])
+    docstring = property(lambda self: self._meta.function_docstrings[self._row])
+    start_line = property(lambda self: self._meta.function_starts[self._row])
+    end_line = property(lambda self: self._meta.function_ends[self._row])
+
+    @property
+    def code(self) -> str:
+        return self._meta.snippet(self.start_line, self.end_line)
+
+    def to_model(self) -> "FunctionMetadata":
+        # The pydantic models are only loaded when a conversion is asked for
+        from docuai.models import FunctionMetadata
+        return FunctionMetadata(
+            name=self.name, args=self.args, returns=self.returns, docstring=self.docstring,
+            code=self.code, start_line=self.start_line, end_line=self.end_line
+        )
+
+class ClassView:
+    """
+    Read-only view of one class row of a CompactMetadata, with the same
+    attributes as ClassMetadata.
+    """
+
+    __slots__ = ("_meta", "_row")
+
+    def __init__(self, meta: "CompactMetadata", row: int):
+        self._meta = meta
+        self._row = row
+
+    name = property(lambda self: self._meta.class_names[self._row])
+    docstring = property(lambda self: self._meta.class_docstrings[self._row])
+    start_line = property(lambda self: self._meta.class_starts[self._row])
+    end_line = property(lambda self: self._meta.class_ends[self._row])
+
+    @property
+    def methods(self) -> list[FunctionView]:
+        owners = self._meta.function_owners
+        return [FunctionView(self._meta, i) for i in range(len(owners)) if owners[i] == self._row]
+
+    def to_model(self) -> "ClassMetadata":
+        from docuai.models import ClassMetadata
+        return ClassMetadata(
+            name=self.name, docstring=self.docstring, methods=[m.to_model() for m in self.methods],
+            start_line=self.start_line, end_line=self.end_line
+        )
+
+class CompactMetadata:
+    """
+    Column-oriented FileMetadata: one row per function or method, held in
+    arrays of line numbers and lists of names, with no copy of any code.
+    Snippets are sliced on demand from the shared source store, so a file's
+    text is held in memory once no matter how many functions it has.
+
+    Exposes `file_path`, `imports`, `functions` and `classes` like
+    FileMetadata; `to_model()` converts to the pydantic models.
+    """
+
+    __slots__ = (
+        "file_path", "imports",
+        "function_names", "function_args", "function_returns", "function_docstrings",
+        "function_starts", "function_ends", "function_owners",
+        "class_names", "class_docstrings", "class_starts", "class_ends",
+    )
+
+    def __init__(self, file_path: str, imports: Optional[list[str]] = None):
+        self.file_path = file_path
+        self.imports = imports or []
+        self.function_names = []
+        self.function_args = []
+        self.function_returns = []
+        self.function_docstrings = []
+        self.function_starts = array("I")
+        self.function_ends = array("I")
+        # Index of the owning class, or -1 for a top-level function
+        self.function_owners = array("i")
+        self.class_names = []
+        self.class_docstrings = []
+        self.class_starts = array("I")
+        self.class_ends = array("I")
+
+    def add_function(self, name: str, args: list[str], returns: Optional[str], docstring: Optional[str],
+                     start_line: int, end_line: int, owner: int = -1):
+        self.function_names.append(name)
+        self.function_args.append(tuple(args))
+        self.function_returns.append(returns)
+        self.function_docstrings.append(docstring)
+        self.function_starts.append(start_line)
+        self.function_ends.append(end_line)
+        self.function_owners.append(owner)
+
+    def add_class(self, name: str, docstring: Optional[str], start_line: int, end_line: int) -> int:
+        self.class_names.append(name)
+        self.class_docstrings.append(docstring)
+        self.class_starts.append(start_line)
+        self.class_ends.append(end_line)
+        return len(self.class_names) - 1
+
+    @property
+    def functions(self) -> list[FunctionView]:
+        owners = self.function_owners
+        return [FunctionView(self, i) for i in range(len(owners)) if owners[i] == -1]
+
+    @property
+    def classes(self) -> list[ClassView]:
+        return [ClassView(self, i) for i in range(len(self.class_names))]
+
+    def snippet(self, start_line: int, end_line: int) -> str:
+        return sources.read(self.file_path).lines(start_line, end_line)
+
+    def to_model(self) -> "FileMetadata":
+        from docuai.models import FileMetadata
+        return FileMetadata(
+            file_path=self.file_path,
+            classes=[c.to_model() for c in self.classes],
+            functions=[f.to_model() for f in self.functions],
+            imports=list(self.imports),
+        )
+
+    @classmethod
+    def from_model(cls, metadata: "FileMetadata") -> "CompactMetadata":
+        compact = cls(metadata.file_path, list(metadata.imports))
+        for f in metadata.functions:
+            compact.add_function(f.name, f.args, f.returns, f.docstring, f.start_line, f.end_line)
+        for c in metadata.classes:
+            owner = compact.add_class(c.name, c.docstring, c.start_line, c.end_line)
+            for m in c.methods:
+                compact.add_function(m.name, m.args, m.returns, m.docstring, m.start_line, m.end_line, owner)
+        return compact
+
+    def to_dict(self) -> dict:
+        # Arrays become plain lists; the field names double as the format
+        return {name: list(getattr(self, name)) if isinstance(getattr(self, name), array) else getattr(self, name)
+                for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompactMetadata":
+        compact = cls(data["file_path"], data["imports"])
+        for name in cls.__slots__[2:]:
+            value = data[name]
+            current = getattr(compact, name)
+            setattr(compact, name, array(current.typecode, value) if isinstance(current, array) else value)
+        compact.function_args = [tuple(args) for args in compact.function_args]
+        return compact
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state: dict):
+        restored = self.from_dict(state)
+        for name in self.__slots__:
+            setattr(self, name, getattr(restored, name))
+
+AnyMetadata = Union["FileMetadata", CompactMetadata]
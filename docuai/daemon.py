@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import inspect
+import signal
+import socket
+import asyncio
+import threading
+import socketserver
+from typing import Optional
+from docuai.cache import default_cache_dir
+
+# Set to any value to make generate/analyze run in-process even when a daemon is up
+NO_DAEMON_ENV = "DOCUAI_NO_DAEMON"
+DEFAULT_IDLE_TIMEOUT = 3600
+# In-memory entries kept by the daemon's response and parse caches
+MEMORY_ENTRIES = 4096
+COMMANDS = ("generate", "analyze")
+
+# True inside `docuai serve`, so forwarded commands run there instead of being forwarded again
+_serving = False
+
+def socket_path(cache_dir: Optional[str] = None) -> str:
+    return os.path.join(cache_dir or default_cache_dir(), "daemon.sock")
+
+def _send(stream, message: dict):
+    stream.write((json.dumps(message) + "\n").encode("utf-8"))
+    stream.flush()
+
+def forward(command: str, params: dict, cache_dir: Optional[str] = None, width: int = 80, color: bool = False) -> Optional[int]:
+    """
+    Runs `command` with `params` in the daemon serving `cache_dir`, copying
+    its output to stdout, and returns the exit code. Returns None, without
+    doing anything, when no daemon is listening.
+    """
+    if _serving or os.getenv(NO_DAEMON_ENV):
+        return None
+    path = socket_path(cache_dir)
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        # A socket left behind by a daemon that did not shut down cleanly
+        sock.close()
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        _send(stream, {"command": command, "params": params, "cwd": os.getcwd(), "width": width, "color": color})
+        for line in stream:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "exit" in message:
+                return message["exit"]
+    # The daemon went away mid-command
+    return 1
+
+class _Output:
+    """
+    File-like object that sends everything written to it to the client.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        _send(self.stream, {"out": text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        import typer
+        from rich.console import Console
+        from docuai import cli
+
+        request = json.loads(self.rfile.readline())
+        command = request.get("command")
+        output = _Output(self.wfile)
+        client_console = Console(file=output, width=request.get("width"), force_terminal=request.get("color"),
+                                 no_color=not request.get("color"))
+        code = 0
+        if command not in COMMANDS:
+            client_console.print(f"[bold red]Error: the daemon does not run {command!r}[/bold red]")
+            code = 2
+        else:
+            self.server.state.reset_stats()
+            cwd = os.getcwd()
+            console = cli.console
+            # Requests are served one at a time, so the process-wide console and cwd can be borrowed
+            cli.console = client_console
+            try:
+                os.chdir(request["cwd"])
+                getattr(cli, command)(**request["params"])
+            except typer.Exit as e:
+                code = e.exit_code
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BrokenPipeError:
+                # The client went away; nothing left to tell it
+                return
+            except Exception as e:
+                client_console.print(f"[bold red]Error: {e}[/bold red]")
+                code = 1
+            finally:
+                cli.console = console
+                os.chdir(cwd)
+        try:
+            _send(self.wfile, {"exit": code})
+        except BrokenPipeError:
+            pass
+
+class _WarmState:
+    """
+    The agents and parse caches built so far, reused by every request with
+    the same options.
+    """
+
+    def __init__(self, build_agent, open_parse_cache):
+        self._build_agent = build_agent
+        self._open_parse_cache = open_parse_cache
+        self.agents = {}
+        self.parse_caches = {}
+
+    def build_agent(self, *args, **kwargs):
+        # Keyed on every argument, defaults included, however the call spelled them
+        bound = inspect.signature(self._build_agent).bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.items())
+        if key not in self.agents:
+            agent = self._build_agent(*args, **kwargs)
+            if agent.cache is not None:
+                agent.cache.memory_entries = MEMORY_ENTRIES
+            self.agents[key] = agent
+        return self.agents[key]
+
+    def open_parse_cache(self, no_cache: bool = False, cache_dir: Optional[str] = None):
+        if no_cache:
+            return None
+        if cache_dir not in self.parse_caches:
+            parse_cache = self._open_parse_cache(no_cache, cache_dir)
+            parse_cache.memory_entries = MEMORY_ENTRIES
+            self.parse_caches[cache_dir] = parse_cache
+        return self.parse_caches[cache_dir]
+
+    def reset_stats(self):
+        # Each command reports its own cache hits and rate-limit waits
+        for agent in self.agents.values():
+            agent.compaction_stats.clear()
+            if agent.cache is not None:
+                agent.cache.reset_stats()
+            if agent.rate_limiter is not None:
+                agent.rate_limiter.reset_stats()
+        for parse_cache in self.parse_caches.values():
+            parse_cache.reset_stats()
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+class _Server(socketserver.UnixStreamServer):
+    idle = False
+
+    def handle_timeout(self):
+        self.idle = True
+
+def serve(cache_dir: Optional[str] = None, path: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+          announce=print):
+    """
+    Serves forwarded generate/analyze commands on a Unix socket until
+    interrupted or idle for `idle_timeout` seconds (0 for never). The agent,
+    its HTTP clients, the parsers and the caches are built once and kept
+    warm; commands run one at a time on a single persistent event loop.
+    """
+    global _serving
+    from docuai import cli, fanout
+    from docuai.parsers import get_parser
+
+    path = path or socket_path(cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            probe.close()
+            raise RuntimeError(f"A daemon is already listening on {path}")
+        except OSError:
+            # Stale socket from a daemon that was killed
+            probe.close()
+            os.unlink(path)
+
+    state = _WarmState(cli.build_agent, cli.open_parse_cache)
+    cli.build_agent = state.build_agent
+    cli.open_parse_cache = state.open_parse_cache
+    # Pay the import and client setup costs now rather than on the first request
+    state.build_agent(cache_dir=cache_dir)
+    state.open_parse_cache(False, cache_dir)
+    for sample in ("x.py", "x.js"):
+        get_parser(sample)
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="docuai-loop", daemon=True).start()
+    fanout.use_loop(loop)
+    _serving = True
+
+    umask = os.umask(0o177)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(umask)
+    server.state = state
+    server.timeout = idle_timeout or None
+    # Shut down cleanly, removing the socket, when killed
+    signal.signal(signal.SIGTERM, _interrupt)
+    announce(path)
+    try:
+        with server:
+            while not server.idle:
+                server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _serving = False
+        fanout.use_loop(None)
+        loop.call_soon_threadsafe(loop.stop)
+        cli.build_agent = state._build_agent
+        cli.open_parse_cache = state._open_parse_cache
+        if os.path.exists(path):
+            os.unlink(path)
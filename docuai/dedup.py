@@ -0,0 +1,157 @@
+import os
+import re
+import hashlib
+from collections import defaultdict
+from typing import Optional
+from docuai.source import sources
+
+# One-permutation MinHash: 64 bins, banded 8 x 8 for LSH. Pairs with a
+# Jaccard similarity around 0.77 or more collide in some band with high
+# probability; candidates are then checked against the threshold.
+SIGNATURE_SIZE = 64
+BANDS = 8
+ROWS = SIGNATURE_SIZE // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.85
+# Below this many tokens the similarity estimate is too noisy; such files only match exactly
+MIN_TOKENS = 30
+
+# String literals are matched first and kept, so "http://..." or a "#" inside a string is not a comment
+_STRING = "(?P<string>" + "|".join([
+    r'"""[\s\S]*?"""',
+    r"'''[\s\S]*?'''",
+    r'"(?:\\.|[^"\\\n])*"',
+    r"'(?:\\.|[^'\\\n])*'",
+    r"`(?:\\.|[^`\\])*`",
+]) + ")"
+_PY_COMMENT = re.compile(_STRING + r"|#[^\n]*")
+# `//` is floor division in Python, so only these languages get C-style comments
+_JS_COMMENT = re.compile(_STRING + r"|//[^\n]*|/\*[\s\S]*?\*/")
+_COMMENTS = {".py": _PY_COMMENT, ".js": _JS_COMMENT, ".jsx": _JS_COMMENT, ".ts": _JS_COMMENT, ".tsx": _JS_COMMENT}
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|\S")
+_EMPTY = (1 << 64) - 1
+
+def normalize(text: str, file_path: str = "") -> list[str]:
+    """
+    Tokens of a source file with comments and layout removed, so copies
+    that differ only in formatting or comments normalize the same. The
+    comment syntax comes from the extension of `file_path`; files of
+    other languages keep their comments.
+    """
+    comment = _COMMENTS.get(os.path.splitext(file_path)[1].lower())
+    if comment is not None:
+        text = comment.sub(lambda m: m.group("string") or " ", text)
+    return _TOKEN.findall(text)
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash(tokens: list[str]) -> list[int]:
+    """
+    One-permutation MinHash of the token shingles: each shingle is hashed
+    once and kept as the minimum of one of SIGNATURE_SIZE bins, which costs
+    O(shingles) instead of O(shingles x permutations). Empty bins borrow
+    from the next non-empty one so signatures stay comparable.
+    """
+    signature = [_EMPTY] * SIGNATURE_SIZE
+    for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1)):
+        h = _hash64("\x00".join(tokens[i:i + SHINGLE_SIZE]))
+        b = h % SIGNATURE_SIZE
+        v = h // SIGNATURE_SIZE
+        if v < signature[b]:
+            signature[b] = v
+    filled = [i for i, v in enumerate(signature) if v != _EMPTY]
+    if filled and len(filled) < SIGNATURE_SIZE:
+        for i in range(SIGNATURE_SIZE):
+            if signature[i] == _EMPTY:
+                # Nearest filled bin to the right (circularly), offset by the distance
+                j = next((f for f in filled if f > i), filled[0])
+                signature[i] = signature[j] + (j - i) % SIGNATURE_SIZE
+    return signature
+
+def similarity(a: list[int], b: list[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / SIGNATURE_SIZE
+
+class DuplicateClusters:
+    """
+    Groups of identical or near-identical files. `duplicates` maps every
+    non-representative file to the representative documented in its place;
+    `exact` counts the duplicates that match their representative exactly
+    (up to comments and layout).
+    """
+
+    def __init__(self, clusters: list[list[str]], exact: int = 0):
+        self.clusters = clusters
+        self.duplicates = {dup: cluster[0] for cluster in clusters for dup in cluster[1:]}
+        self.exact = exact
+
+    @property
+    def near(self) -> int:
+        return len(self.duplicates) - self.exact
+
+    def representatives(self, files: list[str]) -> list[str]:
+        return [f for f in files if f not in self.duplicates]
+
+def find_duplicates(files: list[str], threshold: Optional[float] = DEFAULT_THRESHOLD) -> DuplicateClusters:
+    """
+    Clusters `files` by normalized content hash, then by MinHash/LSH
+    similarity at `threshold` (None disables the near-duplicate pass). The
+    representative of a cluster is its shallowest, first-sorted path, which
+    tends to be the original rather than a vendored copy.
+    """
+    parent = {f: f for f in files}
+
+    def find(f):
+        while parent[f] != f:
+            parent[f] = parent[parent[f]]
+            f = parent[f]
+        return f
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    tokens = {}
+    digests = {}
+    by_digest = defaultdict(list)
+    for path in files:
+        try:
+            tokens[path] = normalize(sources.text(path), path)
+        except OSError:
+            continue
+        digests[path] = hashlib.sha256("\x00".join(tokens[path]).encode("utf-8")).hexdigest()
+        by_digest[digests[path]].append(path)
+    for group in by_digest.values():
+        for other in group[1:]:
+            union(group[0], other)
+
+    if threshold is not None:
+        signatures = {}
+        buckets = defaultdict(list)
+        # Exact copies share a signature, so one per group is enough
+        for group in by_digest.values():
+            path = group[0]
+            if len(tokens[path]) < MIN_TOKENS:
+                continue
+            signature = signatures[path] = minhash(tokens[path])
+            for band in range(BANDS):
+                buckets[(band, tuple(signature[band * ROWS:(band + 1) * ROWS]))].append(path)
+        for candidates in buckets.values():
+            for i, a in enumerate(candidates):
+                for b in candidates[i + 1:]:
+                    if find(a) != find(b) and similarity(signatures[a], signatures[b]) >= threshold:
+                        union(a, b)
+
+    groups = defaultdict(list)
+    for path in files:
+        groups[find(path)].append(path)
+    clusters = []
+    for members in groups.values():
+        if len(members) > 1:
+            members.sort(key=lambda p: (p.count(os.sep), p))
+            clusters.append(members)
+    clusters.sort(key=lambda c: c[0])
+
+    exact = sum(1 for c in clusters for dup in c[1:] if dup in digests and digests.get(dup) == digests.get(c[0]))
+    return DuplicateClusters(clusters, exact)
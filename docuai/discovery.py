@@ -0,0 +1,291 @@
+import os
+import re
+import subprocess
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional
+from docuai.git_utils import IGNORE_DIRS, SUPPORTED_EXTENSIONS, is_supported
+
+# Files above this size are skipped; they are almost never hand-written source
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+# Only the start of a file is read to look for minified or generated code
+HEAD_BYTES = 8192
+# Generated-code markers are only looked for in the file header
+HEADER_BYTES = 512
+MINIFIED_LINE_LENGTH = 1000
+GENERATED_NAMES = (".min.js", ".bundle.js", "-bundle.js", ".chunk.js", ".d.ts", "_pb2.py", "_pb2_grpc.py")
+GENERATED_MARKERS = (b"@generated", b"do not edit", b"auto-generated", b"autogenerated", b"code generated by")
+DEFAULT_SCAN_WORKERS = 8
+# Listed files are checked in batches, so thread hand-offs stay cheap
+CHECK_BATCH = 256
+
+def _translate(pattern: str) -> str:
+    """
+    Translates the body of a gitignore pattern into a regular expression.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+class IgnoreRules:
+    """
+    The compiled patterns of one .gitignore file, matched against paths
+    relative to the directory that contains it. `match` returns True
+    (ignored), False (re-included by a `!` pattern) or None (no opinion).
+    """
+
+    def __init__(self, base: str, lines: list[str]):
+        self.base = base
+        self.rules = []
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            negate = line.startswith("!")
+            if negate or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # A slash anywhere but the end anchors the pattern to this directory
+            anchored = "/" in line
+            body = _translate(line.lstrip("/"))
+            regex = re.compile(("" if anchored else "(?:.*/)?") + body + r"\Z", re.S)
+            self.rules.append((regex, negate, dir_only))
+
+    @classmethod
+    def load(cls, directory: str, base: str) -> Optional["IgnoreRules"]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", errors="replace") as f:
+                rules = cls(base, f.readlines())
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negate
+        return result
+
+def is_ignored(rules: list[IgnoreRules], rel_path: str, is_dir: bool) -> bool:
+    # Deeper .gitignore files take precedence, and later patterns over earlier ones
+    ignored = False
+    for r in rules:
+        result = r.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+def skip_reason(path: str, max_bytes: Optional[int], skip_generated: bool) -> Optional[str]:
+    """
+    Returns why a candidate file should not be sent to the model ("size",
+    "minified" or "generated"), or None to keep it.
+    """
+    if skip_generated and path.endswith(GENERATED_NAMES):
+        return "generated"
+    if not skip_generated:
+        if max_bytes and os.stat(path).st_size > max_bytes:
+            return "size"
+        return None
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # One open serves both checks
+        if max_bytes and os.fstat(fd).st_size > max_bytes:
+            return "size"
+        head = os.read(fd, HEAD_BYTES)
+    finally:
+        os.close(fd)
+    top = head[:HEADER_BYTES].lower()
+    if any(marker in top for marker in GENERATED_MARKERS):
+        return "generated"
+    # Minified code averages very long lines; counting newlines avoids splitting the head
+    if len(head) > MINIFIED_LINE_LENGTH and len(head) / (head.count(b"\n") + 1) > MINIFIED_LINE_LENGTH:
+        return "minified"
+    return None
+
+def _check(paths: list[str], max_bytes: Optional[int], skip_generated: bool) -> list[tuple[str, Optional[str]]]:
+    results = []
+    for path in paths:
+        try:
+            results.append((path, skip_reason(path, max_bytes, skip_generated)))
+        except OSError:
+            # Listed but unreadable, e.g. a tracked file deleted from the working tree
+            continue
+    return results
+
+def git_files(root: str) -> Optional[list[str]]:
+    """
+    Tracked and untracked, non-ignored files under `root`, relative to it,
+    as listed by `git ls-files`. Returns None outside a git checkout.
+    """
+    try:
+        out = subprocess.check_output(
+            ["git", "-C", root, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            stderr=subprocess.DEVNULL
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return [name.decode("utf-8", "surrogateescape") for name in out.split(b"\0") if name]
+
+def _scan(directory: str, rel_dir: str, rules: list[IgnoreRules], max_bytes: Optional[int], skip_generated: bool):
+    local = IgnoreRules.load(directory, rel_dir)
+    if local is not None:
+        rules = rules + [local]
+    files = []
+    subdirs = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return files, subdirs
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in IGNORE_DIRS and not (rules and is_ignored(rules, rel_path, True)):
+                    subdirs.append((entry.path, rel_path, rules))
+            # Ignored directories were never entered, so the extension is all that is left to check
+            elif entry.name.endswith(SUPPORTED_EXTENSIONS) and entry.is_file() and not (rules and is_ignored(rules, rel_path, False)):
+                files.append(entry.path)
+        except OSError:
+            continue
+    return _check(files, max_bytes, skip_generated), subdirs
+
+def _batches(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def discover(
+    root: str,
+    max_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES,
+    skip_generated: bool = True,
+    use_git: bool = True,
+    skipped: Optional[Counter] = None,
+    workers: int = DEFAULT_SCAN_WORKERS,
+) -> Iterator[str]:
+    """
+    Lazily yields the supported source files under `root`. Inside a git
+    checkout the list comes from `git ls-files` (so .gitignore, the global
+    excludes and .git/info/exclude all apply); elsewhere from a scandir walk
+    that reads .gitignore files itself, one directory per task. Files over
+    `max_bytes` (0 or None for no limit) and, with `skip_generated`,
+    minified or generated files are dropped and tallied by reason in
+    `skipped`. Directory scans and file checks run on `workers` threads,
+    and results are yielded as they complete.
+    """
+    listed = git_files(root) if use_git else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # An empty listing usually means `root` is itself ignored by an enclosing checkout
+        if listed:
+            paths = (os.path.join(root, rel_path) for rel_path in listed if is_supported(rel_path))
+            pending = {pool.submit(lambda batch: (_check(batch, max_bytes, skip_generated), []), batch)
+                       for batch in _batches(paths, CHECK_BATCH)}
+        else:
+            pending = {pool.submit(_scan, root, "", [], max_bytes, skip_generated)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results, subdirs = future.result()
+                    for directory, rel_dir, rules in subdirs:
+                        pending.add(pool.submit(_scan, directory, rel_dir, rules, max_bytes, skip_generated))
+                    for path, reason in results:
+                        if reason is None:
+                            yield path
+                        elif skipped is not None:
+                            skipped[reason] += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+class PathFilter:
+    """
+    The checks `discover` applies, for single paths that appear after the
+    initial listing (e.g. files created while watching): a supported
+    extension outside ignored directories, no matching .gitignore pattern
+    on the way down from `root`, and the size and generated-code checks.
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES, skip_generated: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.skip_generated = skip_generated
+        self._rules = {}
+
+    def _rules_for(self, rel_dir: str) -> Optional[list[IgnoreRules]]:
+        """
+        The rules in effect inside `rel_dir`, or None if the directory itself is ignored.
+        """
+        if rel_dir in self._rules:
+            return self._rules[rel_dir]
+        parent, name = os.path.split(rel_dir)
+        rules = self._rules_for(parent) if rel_dir else []
+        if rel_dir and rules is not None and (name in IGNORE_DIRS or (rules and is_ignored(rules, rel_dir, True))):
+            rules = None
+        if rules is not None:
+            local = IgnoreRules.load(os.path.join(self.root, rel_dir), rel_dir)
+            rules = rules + [local] if local is not None else rules
+        self._rules[rel_dir] = rules
+        return rules
+
+    def accepts_dir(self, path: str) -> bool:
+        rel_dir = os.path.relpath(path, self.root).replace(os.sep, "/")
+        return not rel_dir.startswith("..") and self._rules_for("" if rel_dir == "." else rel_dir) is not None
+
+    def accepts(self, path: str) -> bool:
+        rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+        if rel_path.startswith("..") or not is_supported(rel_path):
+            return False
+        rules = self._rules_for(os.path.dirname(rel_path))
+        if rules is None or (rules and is_ignored(rules, rel_path, False)):
+            return False
+        try:
+            return skip_reason(path, self.max_bytes, self.skip_generated) is None
+        except OSError:
+            return False
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# A long-lived event loop (running on another thread) that run_sync submits to, if set
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def use_loop(loop: Optional[asyncio.AbstractEventLoop]):
+    """
+    Makes run_sync execute coroutines on `loop`, which must be running on
+    another thread. `docuai serve` uses this so that async HTTP clients, which
+    are bound to the loop they were created on, stay pooled across requests.
+    """
+    global _loop
+    _loop = loop
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs `coro` to completion from synchronous code, like asyncio.run.
+    """
+    if _loop is None:
+        return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+async def fan_out(
+    items: Iterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    jobs: int = 8,
+    priority: Optional[Callable[[Any], float]] = None,
+) -> AsyncIterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Runs `worker` over `items` with at most `jobs` calls in flight.
+    Yields (item, result, error) tuples in completion order, so callers can
+    write results as soon as each one finishes.
+
+    With `priority`, items start in descending priority order. Starting the
+    largest jobs first keeps one big straggler from extending the run.
+    """
+    if priority is not None:
+        items = sorted(items, key=priority, reverse=True)
+    semaphore = asyncio.Semaphore(max(1, jobs))
+
+    async def run_one(item):
+        async with semaphore:
+            try:
+                return item, await worker(item), None
+            except Exception as e:
+                return item, None, e
+
+    tasks = [asyncio.ensure_future(run_one(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # If the consumer stops early, don't leave calls running in the background
+        for task in tasks:
+            task.cancel()
@@ -1,21 +1,156 @@
 import os
 import shutil
+import hashlib
 import tempfile
 import subprocess
-from typing import Generator
+from typing import Generator, Iterable, Iterator, Optional
+from docuai.tracing import tracer
 
-def clone_repo(repo_url: str) -> str:
+SUPPORTED_EXTENSIONS = (".py", ".js", ".ts", ".tsx", ".jsx")
+IGNORE_DIRS = {".git", ".venv", "venv", "node_modules", "__pycache__", "dist", "build", ".idea", ".vscode"}
+
+def is_supported(rel_path: str) -> bool:
+    """
+    True if a repository-relative path has a supported extension and no ignored directory.
+    """
+    parts = rel_path.replace(os.sep, "/").split("/")
+    return rel_path.endswith(SUPPORTED_EXTENSIONS) and not any(part in IGNORE_DIRS for part in parts[:-1])
+
+def clone_repo(
+    repo_url: str,
+    depth: Optional[int] = None,
+    blob_filter: Optional[str] = None,
+    ref: Optional[str] = None,
+    mirror_dir: Optional[str] = None,
+) -> str:
     """
     Clones a git repository to a temporary directory.
     Returns the path to the temporary directory.
+
+    `depth` makes a shallow clone, `blob_filter` a partial clone (e.g.
+    "blob:none") and `ref` selects a branch or tag. With `mirror_dir`, a
+    persistent bare mirror is kept there and updated with `git fetch`; only
+    the supported source files of `ref` are then written out from the object
+    store, without checking out a working tree. A mirror keeps full history,
+    so it cannot be combined with `depth`.
     """
+    if depth and mirror_dir:
+        raise ValueError("A mirror keeps full history; depth cannot be used with mirror_dir")
     temp_dir = tempfile.mkdtemp()
+    cloned = False
     try:
-        subprocess.check_call(["git", "clone", repo_url, temp_dir])
+        if mirror_dir:
+            with tracer.span("git.fetch", url=repo_url):
+                mirror = sync_mirror(repo_url, mirror_dir, blob_filter)
+            with tracer.span("git.export", ref=ref or "HEAD") as attrs:
+                attrs["files"] = export_tree(mirror, ref or "HEAD", temp_dir)
+        else:
+            cmd = ["git", "-c", "advice.detachedHead=false", "clone", "--quiet"]
+            if depth:
+                cmd += ["--depth", str(depth)]
+            if blob_filter:
+                cmd += ["--filter", blob_filter]
+            if ref:
+                cmd += ["--branch", ref]
+            with tracer.span("git.clone", url=repo_url):
+                subprocess.check_call(cmd + [repo_url, temp_dir])
+        cloned = True
         return temp_dir
     except subprocess.CalledProcessError as e:
-        shutil.rmtree(temp_dir)
         raise RuntimeError(f"Failed to clone repository: {e}")
+    finally:
+        # Whatever went wrong, the caller never gets the directory to clean up
+        if not cloned:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+def sync_mirror(repo_url: str, mirror_dir: str, blob_filter: Optional[str] = None) -> str:
+    """
+    Creates or updates a bare mirror of `repo_url` inside `mirror_dir`.
+    Returns the path to the mirror's git directory.
+    """
+    name = hashlib.sha256(repo_url.encode("utf-8")).hexdigest()[:16] + ".git"
+    mirror = os.path.join(mirror_dir, name)
+    if os.path.isdir(mirror):
+        subprocess.check_call(["git", "--git-dir", mirror, "fetch", "--quiet", "--prune", "origin"])
+        return mirror
+
+    os.makedirs(mirror_dir, exist_ok=True)
+    cmd = ["git", "clone", "--quiet", "--mirror"]
+    if blob_filter:
+        cmd += ["--filter", blob_filter]
+    # Clone next to the final location and rename, so an interrupted clone never looks like a mirror
+    partial = tempfile.mkdtemp(dir=mirror_dir, prefix=".partial-")
+    try:
+        subprocess.check_call(cmd + [repo_url, partial])
+        try:
+            os.replace(partial, mirror)
+        except OSError:
+            # A concurrent run created the mirror first; its clone is just as fresh, so use it
+            if not os.path.isdir(mirror):
+                raise
+    finally:
+        if os.path.isdir(partial):
+            shutil.rmtree(partial)
+    return mirror
+
+def list_tree(git_dir: str, ref: str = "HEAD") -> list[tuple[str, str]]:
+    """
+    Returns (path, blob id) for every file in `ref`, read with `git ls-tree`.
+    """
+    out = subprocess.check_output(["git", "--git-dir", git_dir, "ls-tree", "-r", "-z", ref])
+    entries = []
+    for record in out.split(b"\0"):
+        if not record:
+            continue
+        info, path = record.split(b"\t", 1)
+        _, kind, oid = info.split()
+        if kind == b"blob":
+            entries.append((path.decode("utf-8", "surrogateescape"), oid.decode()))
+    return entries
+
+def read_blobs(git_dir: str, oids: Iterable[str]) -> Iterator[tuple[str, bytes]]:
+    """
+    Streams (blob id, content) pairs through a single `git cat-file --batch` process.
+    """
+    proc = subprocess.Popen(
+        ["git", "--git-dir", git_dir, "cat-file", "--batch"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    try:
+        for oid in oids:
+            proc.stdin.write(oid.encode() + b"\n")
+            proc.stdin.flush()
+            header = proc.stdout.readline().split()
+            if len(header) < 3:
+                # "<oid> missing"
+                continue
+            size = int(header[2])
+            data = proc.stdout.read(size)
+            proc.stdout.read(1)  # trailing newline
+            yield oid, data
+    finally:
+        proc.stdin.close()
+        proc.wait()
+
+def export_tree(git_dir: str, ref: str, dest: str) -> int:
+    """
+    Writes the supported source files of `ref` into `dest` straight from the
+    object store. Returns the number of files written.
+    """
+    wanted = {}
+    for path, oid in list_tree(git_dir, ref):
+        if is_supported(path):
+            wanted.setdefault(oid, []).append(path)
+
+    count = 0
+    for oid, data in read_blobs(git_dir, list(wanted)):
+        for path in wanted[oid]:
+            out_path = os.path.join(dest, path)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, "wb") as f:
+                f.write(data)
+            count += 1
+    return count
 
 def cleanup_repo(path: str):
     """
@@ -23,17 +158,37 @@ def cleanup_repo(path: str):
     """
     shutil.rmtree(path)
 
-def get_repo_files(path: str) -> Generator[str, None, None]:
+def get_repo_files(path: str, **options) -> Generator[str, None, None]:
+    """
+    Yields all supported file paths in the repository, skipping ignored,
+    oversized and generated files. See `docuai.discovery.discover` for the
+    options.
+    """
+    # Imported here because discovery depends on is_supported above
+    from docuai.discovery import discover
+    yield from discover(path, **options)
+
+def changed_files(path: str, base_ref: str) -> Optional[set[str]]:
     """
-    Yields all supported file paths in the repository.
-    Recursively traverses all subdirectories.
+    Returns the real paths of files that differ from `base_ref` in the git
+    checkout containing `path`, including uncommitted and untracked files.
+    Returns None if `path` is not inside a git checkout or the ref is unknown.
     """
-    ignore_dirs = {".git", ".venv", "venv", "node_modules", "__pycache__", "dist", "build", ".idea", ".vscode"}
-    
-    for root, dirs, files in os.walk(path):
-        # Modify dirs in-place to skip ignored directories
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-        
-        for file in files:
-            if file.endswith((".py", ".js", ".ts", ".tsx", ".jsx")):
-                yield os.path.join(root, file)
+    try:
+        top = subprocess.check_output(
+            ["git", "-C", path, "rev-parse", "--show-toplevel"],
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+        diff = subprocess.check_output(
+            ["git", "-C", top, "diff", "--name-only", base_ref, "--"],
+            stderr=subprocess.DEVNULL, text=True
+        )
+        untracked = subprocess.check_output(
+            ["git", "-C", top, "ls-files", "--others", "--exclude-standard"],
+            stderr=subprocess.DEVNULL, text=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+    names = diff.splitlines() + untracked.splitlines()
+    return {os.path.realpath(os.path.join(top, name)) for name in names if name}
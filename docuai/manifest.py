@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+from typing import Iterable, Optional
+from docuai.source import sources
+
+MANIFEST_NAME = ".docuai-manifest.json"
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_file(path: str) -> str:
+    # Read through the shared store, so the parser and prompt builders reuse this read
+    return sources.read(path).sha256
+
+class Manifest:
+    """
+    Record of what a previous run produced, stored as JSON next to the output.
+
+    Each entry maps a key (a source path relative to the repository root, or
+    a map-reduce step such as "dir:src/api") to the content hash it was built
+    from, the prompt version used, and either the output file it was written
+    to or the stored summary text.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path))
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError):
+                # A corrupt manifest only costs a full rebuild
+                self.entries = {}
+
+    @classmethod
+    def for_directory(cls, out_dir: str) -> "Manifest":
+        return cls(os.path.join(out_dir, MANIFEST_NAME))
+
+    @classmethod
+    def for_report(cls, out_path: str) -> "Manifest":
+        return cls(os.path.splitext(out_path)[0] + ".manifest.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def is_current(self, key: str, content_hash: Optional[str], prompt_version: str) -> bool:
+        """
+        True if `key` was last built from the same content with the same
+        prompts, and its output (if any) is still on disk. A `content_hash`
+        of None skips the content comparison.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry.get("prompt_version") != prompt_version:
+            return False
+        if content_hash is not None and entry.get("hash") != content_hash:
+            return False
+        output = entry.get("output")
+        return output is None or os.path.exists(os.path.join(self.base_dir, output))
+
+    def record(self, key: str, content_hash: str, prompt_version: str, output: Optional[str] = None, summary: Optional[str] = None):
+        entry = {"hash": content_hash, "prompt_version": prompt_version}
+        if output is not None:
+            entry["output"] = os.path.relpath(os.path.abspath(output), self.base_dir)
+        if summary is not None:
+            entry["summary"] = summary
+        self.entries[key] = entry
+
+    def prune(self, keep: Iterable[str], prefix: str = "") -> list[str]:
+        """
+        Drops entries starting with `prefix` that are not in `keep`, deleting
+        their output files. Returns the removed keys.
+        """
+        keep = set(keep)
+        removed = [key for key in self.entries if key.startswith(prefix) and key not in keep]
+        for key in removed:
+            output = self.entries.pop(key).get("output")
+            if output:
+                out_path = os.path.join(self.base_dir, output)
+                if os.path.exists(out_path):
+                    os.remove(out_path)
+        return removed
+
+    def stale_files(self, files: list[str], root: str, prompt_version: str, changed: Optional[set[str]] = None) -> list[str]:
+        """
+        Returns the files whose recorded output is missing or out of date.
+
+        `changed` is an optional set of real paths known to have changed
+        (e.g. from `git diff`); files outside it that already have a current
+        entry are trusted without being hashed.
+        """
+        stale = []
+        for path in files:
+            key = os.path.relpath(path, root)
+            if changed is not None and os.path.realpath(path) not in changed and self.is_current(key, None, prompt_version):
+                continue
+            if not self.is_current(key, hash_file(path), prompt_version):
+                stale.append(path)
+        return stale
+
+    def save(self):
+        os.makedirs(self.base_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "entries": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
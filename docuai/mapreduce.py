@@ -0,0 +1,215 @@
+import os
+from collections import defaultdict
+from typing import Optional
+from docuai.agent import DocuAIAgent, PROMPT_VERSION, SUMMARY_FOCUS
+from docuai.fanout import fan_out
+from docuai.manifest import Manifest, hash_text
+from docuai.tokens import RequestPlan, count_tokens, pack, prompt_tokens
+from docuai.tracing import tracer
+
+DEFAULT_CHUNK_TOKENS = 8000
+# Rough size of one summary, used to estimate the reduce stage before it runs
+SUMMARY_TOKENS = 300
+
+def split_chunks(text: str, max_chars: int) -> list[str]:
+    """
+    Splits text into pieces of at most `max_chars`, breaking on line boundaries.
+    A single line longer than the limit becomes its own piece.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        if current and size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks or [""]
+
+class MapReducePipeline:
+    """
+    Documents a repository hierarchically instead of in one giant prompt.
+
+    1. Map: files are packed per directory into requests of at most
+       `chunk_tokens` tokens (large files are split into chunks) and every
+       request is summarized, in parallel.
+    2. Reduce: each directory is summarized from its files' and subdirectories'
+       summaries, deepest directories first.
+    3. The repository root is reduced with the regular repo-level prompt.
+
+    Every step goes through the agent's response cache, so unchanged files and
+    directories are not summarized again on the next run. With a `manifest`,
+    summaries are also stored next to the output and reused by content hash,
+    so only changed files and the directories above them are re-summarized.
+    """
+
+    def __init__(
+        self,
+        agent: DocuAIAgent,
+        root: str,
+        mode: str = "generate",
+        jobs: int = 8,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        manifest: Optional[Manifest] = None,
+    ):
+        self.agent = agent
+        self.root = root
+        self.mode = mode
+        self.jobs = jobs
+        self.chunk_tokens = min(chunk_tokens, agent.prompt_budget)
+        self.manifest = manifest
+        self.reused = 0
+
+    async def _summarize(self, key: str, content: str, call) -> str:
+        # Reuse the summary recorded in the manifest when its input is unchanged
+        content_hash = hash_text(content)
+        if self.manifest is not None and self.manifest.is_current(key, content_hash, PROMPT_VERSION):
+            self.reused += 1
+            return self.manifest.get(key)["summary"]
+
+        summary = await call()
+        if self.manifest is not None:
+            self.manifest.record(key, content_hash, PROMPT_VERSION, summary=summary)
+        return summary
+
+    async def run(self, files: list[str]) -> str:
+        with tracer.span("map", files=len(files)):
+            summaries = await self.map_files(files)
+        with tracer.span("reduce"):
+            return await self.reduce(summaries)
+
+    def plan_map(self, files: list[str], record: bool = True) -> list[tuple[str, str, str]]:
+        """
+        Returns the map requests as (directory, label, content) tuples.
+        Unreadable files are skipped. `record` is passed on to
+        `compact_source`.
+        """
+        work = []
+        small_files = defaultdict(dict)
+        for path in files:
+            rel_path = os.path.relpath(path, self.root)
+            directory = os.path.dirname(rel_path)
+            try:
+                code = self.agent.compact_source(path, self.mode, record)
+            except Exception:
+                continue
+
+            tokens = count_tokens(code, self.agent.model)
+            if tokens <= self.chunk_tokens:
+                small_files[directory][rel_path] = (code, tokens)
+                continue
+
+            max_chars = max(1, len(code) * self.chunk_tokens // tokens)
+            chunks = split_chunks(code, max_chars)
+            for index, chunk in enumerate(chunks):
+                work.append((directory, f"{rel_path} (part {index + 1}/{len(chunks)})", chunk))
+
+        # Pack small files of the same directory together to save round trips
+        for directory, entries in small_files.items():
+            costs = {rel_path: tokens for rel_path, (_, tokens) in entries.items()}
+            for b in pack(costs, self.chunk_tokens):
+                if len(b.items) == 1:
+                    work.append((directory, b.items[0], entries[b.items[0]][0]))
+                else:
+                    names = sorted(b.items)
+                    content = "\n\n".join(f"--- File: {name} ---\n{entries[name][0]}" for name in names)
+                    work.append((directory, ", ".join(names), content))
+        return work
+
+    def estimate(self, files: list[str]) -> RequestPlan:
+        """
+        Plans the run without calling the model. The reduce stage is
+        estimated from a typical summary size.
+        """
+        plan = RequestPlan()
+        children = defaultdict(set)
+        for directory, label, content in self.plan_map(files, record=False):
+            inputs = {"file_path": label, "code": content, "focus": SUMMARY_FOCUS[self.mode]}
+            plan.add(label, prompt_tokens(self.agent.file_summary_prompt, inputs, self.agent.model), self.agent.prompt_budget)
+            children[directory].add(label)
+            while directory:
+                parent = os.path.dirname(directory)
+                children[parent].add(directory + os.sep)
+                directory = parent
+
+        root_prompt = self.agent.repo_doc_prompt if self.mode == "generate" else self.agent.repo_smell_prompt
+        for directory, entries in sorted(children.items()):
+            prompt = self.agent.dir_summary_prompt if directory else root_prompt
+            overhead = prompt_tokens(prompt, model=self.agent.model)
+            plan.add(f"{directory or '.'}/", overhead + len(entries) * SUMMARY_TOKENS, self.agent.prompt_budget)
+        return plan
+
+    async def map_files(self, files: list[str]) -> list[tuple[str, str, str]]:
+        """
+        Returns (directory, label, summary) for every map request that succeeded.
+        """
+        async def summarize(item):
+            _, label, content = item
+            return await self._summarize(
+                f"map:{label}", content,
+                lambda: self.agent.asummarize_file(label, content, self.mode)
+            )
+
+        work = self.plan_map(files)
+        summaries = []
+        async for (directory, label, _), summary, error in fan_out(work, summarize, self.jobs, priority=lambda item: len(item[2])):
+            if error is None:
+                summaries.append((directory, label, summary))
+
+        if self.manifest is not None:
+            self.manifest.prune([f"map:{label}" for _, label, _ in work], prefix="map:")
+        return summaries
+
+    async def reduce(self, summaries: list[tuple[str, str, str]]) -> str:
+        # Collect every directory on the way up from each file to the root
+        children = defaultdict(list)
+        file_summaries = {}
+        for directory, label, summary in summaries:
+            file_summaries[label] = summary
+            children[directory].append(("file", label))
+            while directory:
+                parent = os.path.dirname(directory)
+                if ("dir", directory) not in children[parent]:
+                    children[parent].append(("dir", directory))
+                directory = parent
+
+        dir_summaries = {}
+        levels = defaultdict(list)
+        for directory in children:
+            if directory:
+                levels[directory.count(os.sep)].append(directory)
+
+        # Directories at the same depth are independent, so each level runs in parallel
+        for depth in sorted(levels, reverse=True):
+            async def summarize(directory):
+                content = self._directory_content(directory, children, file_summaries, dir_summaries)
+                return await self._summarize(
+                    f"dir:{directory}", content,
+                    lambda: self.agent.asummarize_directory(directory, content, self.mode)
+                )
+
+            async for directory, summary, error in fan_out(levels[depth], summarize, self.jobs):
+                if error is None:
+                    dir_summaries[directory] = summary
+
+        if self.manifest is not None:
+            self.manifest.prune([f"dir:{directory}" for directory in children if directory], prefix="dir:")
+
+        root_content = self._directory_content("", children, file_summaries, dir_summaries)
+        return await self._summarize(
+            "report", root_content,
+            lambda: self.agent.areduce_repo(root_content, self.mode)
+        )
+
+    def _directory_content(self, directory: str, children: dict, file_summaries: dict, dir_summaries: dict) -> str:
+        sections = []
+        for kind, name in sorted(children[directory]):
+            if kind == "dir" and name in dir_summaries:
+                sections.append(f"--- Directory: {name}/ ---\n{dir_summaries[name]}")
+            elif kind == "file":
+                sections.append(f"--- File: {name} ---\n{file_summaries[name]}")
+        return "\n\n".join(sections)
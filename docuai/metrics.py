@@ -0,0 +1,302 @@
+import ast
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+from docuai.source import sources
+
+# Limits above which a function is worth a reviewer's attention
+MAX_COMPLEXITY = 10
+MAX_NESTING = 4
+MAX_FUNCTION_LINES = 60
+MAX_PARAMS = 5
+# Consecutive normalized lines that count as a duplicated block
+DUPLICATE_WINDOW = 6
+# Duplicated lines that weigh as much as one function exceeding a limit twice over
+DUPLICATE_LINES_PER_POINT = 30
+DEFAULT_TRIAGE_THRESHOLD = 1.0
+
+PY_BRANCHES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.ExceptHandler, ast.With, ast.AsyncWith, ast.IfExp, ast.comprehension, ast.Assert)
+PY_NESTING = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith)
+PY_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+JS_BRANCHES = {
+    "IfStatement", "ForStatement", "ForInStatement", "ForOfStatement", "WhileStatement", "DoWhileStatement",
+    "CatchClause", "ConditionalExpression", "SwitchCase",
+}
+JS_NESTING = {
+    "IfStatement", "ForStatement", "ForInStatement", "ForOfStatement", "WhileStatement", "DoWhileStatement",
+    "TryStatement", "SwitchStatement",
+}
+JS_FUNCTIONS = {"FunctionDeclaration", "FunctionExpression", "ArrowFunctionExpression"}
+
+# The same measurements on tree-sitter node types, for TypeScript
+TS_BRANCHES = {
+    "if_statement", "for_statement", "for_in_statement", "while_statement", "do_statement",
+    "catch_clause", "ternary_expression", "switch_case",
+}
+TS_NESTING = {
+    "if_statement", "for_statement", "for_in_statement", "while_statement", "do_statement",
+    "try_statement", "switch_statement",
+}
+TS_FUNCTIONS = {
+    "function_declaration", "generator_function_declaration", "function_expression", "function",
+    "generator_function", "arrow_function", "method_definition",
+}
+
+@dataclass
+class FunctionMetrics:
+    name: str
+    line: int
+    complexity: int
+    nesting: int
+    lines: int
+    params: int
+
+    @property
+    def score(self) -> float:
+        # Each limit contributes how far it is exceeded, relative to the limit
+        return (
+            max(0, self.complexity - MAX_COMPLEXITY) / MAX_COMPLEXITY
+            + max(0, self.nesting - MAX_NESTING) / MAX_NESTING
+            + max(0, self.lines - MAX_FUNCTION_LINES) / MAX_FUNCTION_LINES
+            + max(0, self.params - MAX_PARAMS) / MAX_PARAMS
+        )
+
+@dataclass
+class FileMetrics:
+    path: str
+    lines: int = 0
+    functions: list[FunctionMetrics] = field(default_factory=list)
+    duplicated_lines: int = 0
+    # The file could not be parsed, so only its size is known
+    unparsed: bool = False
+
+    @property
+    def score(self) -> float:
+        duplication = self.duplicated_lines / DUPLICATE_LINES_PER_POINT
+        if self.unparsed:
+            # Scored as if the whole file were one function, so only long files are sent unseen
+            return max(0, self.lines - MAX_FUNCTION_LINES) / MAX_FUNCTION_LINES + duplication
+        return sum(f.score for f in self.functions) + duplication
+
+    def hints(self) -> str:
+        """
+        A short description of the measurements, given to the model as a
+        starting point for its review.
+        """
+        if self.unparsed:
+            return "Static metrics unavailable (the file could not be parsed)."
+        parts = [f"{self.lines} lines, {len(self.functions)} functions"]
+        flagged = sorted((f for f in self.functions if f.score > 0), key=lambda f: f.score, reverse=True)
+        for f in flagged[:8]:
+            parts.append(
+                f"{f.name} (line {f.line}): complexity {f.complexity}, nesting {f.nesting}, "
+                f"{f.lines} lines, {f.params} parameters"
+            )
+        if self.duplicated_lines:
+            parts.append(f"{self.duplicated_lines} lines in blocks of {DUPLICATE_WINDOW}+ lines that are duplicated in the repository")
+        return "; ".join(parts)
+
+def _python_functions(tree: ast.AST) -> list[FunctionMetrics]:
+    results = []
+
+    def measure(func, name: str):
+        complexity = 1
+        deepest = 0
+        stack = [(child, 0) for child in ast.iter_child_nodes(func)]
+        while stack:
+            node, depth = stack.pop()
+            if isinstance(node, PY_FUNCTIONS):
+                continue  # nested functions are measured on their own
+            if isinstance(node, PY_BRANCHES):
+                complexity += 1
+            elif isinstance(node, ast.BoolOp):
+                complexity += len(node.values) - 1
+            if isinstance(node, PY_NESTING):
+                depth += 1
+                deepest = max(deepest, depth)
+            stack.extend((child, depth) for child in ast.iter_child_nodes(node))
+        args = func.args
+        params = len(args.posonlyargs) + len(args.args) + len(args.kwonlyargs) + bool(args.vararg) + bool(args.kwarg)
+        if args.args and args.args[0].arg in ("self", "cls"):
+            params -= 1
+        end = getattr(func, "end_lineno", func.lineno)
+        results.append(FunctionMetrics(name, func.lineno, complexity, deepest, end - func.lineno + 1, params))
+
+    def visit(node, prefix: str = ""):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                measure(child, prefix + child.name)
+                visit(child, prefix + child.name + ".")
+            elif isinstance(child, ast.ClassDef):
+                visit(child, prefix + child.name + ".")
+            else:
+                visit(child, prefix)
+
+    visit(tree)
+    return results
+
+def _js_children(node):
+    for value in node.__dict__.values():
+        if isinstance(value, list):
+            yield from (item for item in value if hasattr(item, "type"))
+        elif hasattr(value, "type"):
+            yield value
+
+def _js_functions(tree) -> list[FunctionMetrics]:
+    results = []
+
+    def measure(func, name: str):
+        complexity = 1
+        deepest = 0
+        stack = [(child, 0) for child in _js_children(func)]
+        while stack:
+            node, depth = stack.pop()
+            if node.type in JS_FUNCTIONS:
+                continue
+            if node.type in JS_BRANCHES and not (node.type == "SwitchCase" and node.test is None):
+                complexity += 1
+            elif node.type == "LogicalExpression" and node.operator in ("&&", "||", "??"):
+                complexity += 1
+            if node.type in JS_NESTING:
+                depth += 1
+                deepest = max(deepest, depth)
+            stack.extend((child, depth) for child in _js_children(node))
+        start, end = func.loc.start.line, func.loc.end.line
+        results.append(FunctionMetrics(name, start, complexity, deepest, end - start + 1, len(func.params)))
+
+    # Explicit stack: deeply nested callbacks would exhaust Python's recursion limit
+    stack = [(tree, "")]
+    while stack:
+        node, name = stack.pop()
+        if node.type in JS_FUNCTIONS:
+            measure(node, name or getattr(getattr(node, "id", None), "name", None) or "<anonymous>")
+        for child in _js_children(node):
+            child_name = ""
+            if node.type in ("MethodDefinition", "Property") and getattr(node.key, "name", None):
+                child_name = node.key.name
+            elif node.type == "VariableDeclarator" and getattr(node.id, "name", None):
+                child_name = node.id.name
+            stack.append((child, child_name))
+    return results
+
+def _ts_functions(tree) -> list[FunctionMetrics]:
+    results = []
+
+    def measure(func, name: str):
+        complexity = 1
+        deepest = 0
+        stack = [(child, 0) for child in func.named_children]
+        while stack:
+            node, depth = stack.pop()
+            if node.type in TS_FUNCTIONS:
+                continue
+            if node.type in TS_BRANCHES:
+                complexity += 1
+            elif node.type == "binary_expression" and node.child_by_field_name("operator").type in ("&&", "||", "??"):
+                complexity += 1
+            if node.type in TS_NESTING:
+                depth += 1
+                deepest = max(deepest, depth)
+            stack.extend((child, depth) for child in node.named_children)
+        parameters = func.child_by_field_name("parameters")
+        params = len([p for p in parameters.named_children if p.type != "comment"]) if parameters is not None else 1
+        start, end = func.start_point[0] + 1, func.end_point[0] + 1
+        results.append(FunctionMetrics(name, start, complexity, deepest, end - start + 1, params))
+
+    stack = [(tree.root_node, "")]
+    while stack:
+        node, name = stack.pop()
+        if node.type in TS_FUNCTIONS:
+            own = node.child_by_field_name("name")
+            measure(node, name or (own.text.decode("utf-8", "replace") if own is not None else "<anonymous>"))
+        for child in node.named_children:
+            child_name = ""
+            if node.type in ("variable_declarator", "pair", "public_field_definition"):
+                key = node.child_by_field_name("name") or node.child_by_field_name("key")
+                if key is not None and child is not key:
+                    child_name = key.text.decode("utf-8", "replace")
+            stack.append((child, child_name))
+    return results
+
+def measure_file(path: str, source: Optional[str] = None) -> FileMetrics:
+    """
+    Computes per-function metrics for a Python, JavaScript or TypeScript
+    file. TypeScript is measured with tree-sitter; without it installed,
+    or when parsing fails, the file is marked `unparsed` and scored on
+    its size alone.
+    """
+    if source is None:
+        source = sources.text(path)
+    metrics = FileMetrics(path, lines=source.count("\n") + 1)
+    try:
+        if path.endswith(".py"):
+            metrics.functions = _python_functions(ast.parse(source))
+        elif path.endswith((".js", ".jsx")):
+            # Imported here: esprima is slow to load and only needed for JavaScript
+            import esprima
+            options = {"jsx": True, "tolerant": True, "loc": True}
+            try:
+                tree = esprima.parseModule(source, options)
+            except Exception:
+                tree = esprima.parseScript(source, options)
+            metrics.functions = _js_functions(tree)
+        elif path.endswith((".ts", ".tsx")):
+            # Imported here: tree-sitter is optional and only needed for TypeScript
+            from docuai.parsers import ts_parser
+            if ts_parser.available():
+                metrics.functions = _ts_functions(ts_parser.parse_tree(path, source))
+            else:
+                metrics.unparsed = True
+        else:
+            metrics.unparsed = True
+    except Exception:
+        metrics.unparsed = True
+    return metrics
+
+def _windows(source: str) -> list[str]:
+    lines = [line.strip() for line in source.splitlines()]
+    lines = [line for line in lines if len(line) > 2 and not line.startswith(("#", "//", "import ", "from "))]
+    return [
+        hashlib.sha1("\n".join(lines[i:i + DUPLICATE_WINDOW]).encode("utf-8")).hexdigest()
+        for i in range(len(lines) - DUPLICATE_WINDOW + 1)
+    ]
+
+def measure_repo(files: list[str]) -> dict[str, FileMetrics]:
+    """
+    Measures every file and counts the lines in blocks that appear more
+    than once, within a file or across files.
+    """
+    results = {}
+    windows = {}
+    seen = defaultdict(int)
+    for path in files:
+        try:
+            source = sources.text(path)
+        except OSError:
+            continue
+        results[path] = measure_file(path, source)
+        windows[path] = _windows(source)
+        for digest in windows[path]:
+            seen[digest] += 1
+    for path, digests in windows.items():
+        # Overlapping windows share lines; count each duplicated line once
+        covered = set()
+        for i, digest in enumerate(digests):
+            if seen[digest] > 1:
+                covered.update(range(i, i + DUPLICATE_WINDOW))
+        results[path].duplicated_lines = len(covered)
+    return results
+
+def select_files(metrics: dict[str, FileMetrics], threshold: float = DEFAULT_TRIAGE_THRESHOLD, top: Optional[int] = None) -> list[str]:
+    """
+    Returns the files worth a model review, highest score first: those
+    scoring at least `threshold`, or with `top`, the `top` highest.
+    """
+    ranked = sorted(metrics.values(), key=lambda m: m.score, reverse=True)
+    if top is not None:
+        ranked = [m for m in ranked[:top] if m.score > 0]
+    else:
+        ranked = [m for m in ranked if m.score >= threshold]
+    return [m.path for m in ranked]
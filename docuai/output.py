@@ -0,0 +1,43 @@
+import os
+from typing import AsyncIterable, Callable, Iterable, Optional
+
+def _partial_path(out_path: str) -> str:
+    return out_path + ".partial"
+
+def write_stream(out_path: str, chunks: Iterable[str], header: str = "", on_chunk: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Writes streamed text to `out_path` as it arrives.
+
+    Chunks go to `<out_path>.partial`, which is renamed over `out_path` only
+    once the stream completes, so readers never see a half-written file. If
+    the stream fails, the partial file is left behind for inspection.
+    `on_chunk` is called with the number of characters written so far.
+    Returns the total number of characters written.
+    """
+    partial = _partial_path(out_path)
+    written = 0
+    with open(partial, "w") as f:
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+            written += len(chunk)
+            if on_chunk is not None:
+                on_chunk(written)
+    os.replace(partial, out_path)
+    return written
+
+async def awrite_stream(out_path: str, chunks: AsyncIterable[str], header: str = "") -> int:
+    """
+    Async counterpart of `write_stream`.
+    """
+    partial = _partial_path(out_path)
+    written = 0
+    with open(partial, "w") as f:
+        f.write(header)
+        async for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+            written += len(chunk)
+    os.replace(partial, out_path)
+    return written
@@ -0,0 +1,32 @@
+import os
+from docuai.parsers.base import BaseParser
+
+# "auto" (tree-sitter when installed, else esprima), "esprima" or "tree-sitter"
+JS_PARSER_ENV = "DOCUAI_JS_PARSER"
+
+# Backends are imported on first use: esprima alone takes most of a second to load
+_BACKENDS = {
+    "PythonParser": "docuai.parsers.python_parser",
+    "JSParser": "docuai.parsers.js_parser",
+    "TreeSitterParser": "docuai.parsers.ts_parser",
+}
+
+def __getattr__(name: str):
+    if name in _BACKENDS:
+        import importlib
+        return getattr(importlib.import_module(_BACKENDS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_parser(file_path: str) -> BaseParser:
+    if file_path.endswith(".py"):
+        from docuai.parsers.python_parser import PythonParser
+        return PythonParser()
+    elif file_path.endswith((".js", ".jsx", ".ts", ".tsx")):
+        from docuai.parsers import ts_parser
+        backend = os.getenv(JS_PARSER_ENV, "auto")
+        if backend == "tree-sitter" or (backend == "auto" and ts_parser.available()):
+            return ts_parser.TreeSitterParser()
+        from docuai.parsers.js_parser import JSParser
+        return JSParser()
+    else:
+        raise ValueError(f"Unsupported file type: {file_path}")
@@ -1,7 +1,21 @@
 from abc import ABC, abstractmethod
-from docuai.models import FileMetadata
+from typing import TYPE_CHECKING
+from docuai.compact import CompactMetadata
+
+if TYPE_CHECKING:
+    from docuai.models import FileMetadata
 
 class BaseParser(ABC):
+    # Bump when the parser's output changes, so cached results are re-parsed
+    version = "2"
+
     @abstractmethod
-    def parse(self, file_path: str) -> FileMetadata:
+    def parse(self, file_path: str) -> "FileMetadata":
         pass
+
+    def parse_compact(self, file_path: str) -> CompactMetadata:
+        """
+        Parses a file into CompactMetadata. Parsers that can should override
+        this and build the compact form directly instead of the models.
+        """
+        return CompactMetadata.from_model(self.parse(file_path))
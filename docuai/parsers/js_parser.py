@@ -1,91 +1,118 @@
 import esprima
+from esprima.nodes import Node
 from docuai.parsers.base import BaseParser
-from docuai.models import FileMetadata, FunctionMetadata, ClassMetadata
+from docuai.compact import CompactMetadata
+from docuai.models import FileMetadata
+from docuai.source import sources
+
+# Expressions that cannot hold a declaration, so their subtrees are skipped. Everything
+# else is walked: IIFE and callback bodies, call arguments, loops and class members can.
+LEAVES = {"Literal", "Identifier", "ThisExpression", "Super", "MemberExpression", "BinaryExpression", "TemplateElement"}
+# Node attributes that are not child nodes
+POSITIONS = {"type", "range", "loc"}
+FUNCTION_VALUES = ("ArrowFunctionExpression", "FunctionExpression")
+
+def _children(node) -> list:
+    children = []
+    for field, value in node.__dict__.items():
+        if field in POSITIONS:
+            continue
+        if isinstance(value, list):
+            children.extend(item for item in value if isinstance(item, Node) and item.type not in LEAVES)
+        elif isinstance(value, Node) and value.type not in LEAVES:
+            children.append(value)
+    return children
+
+def extract_params(params) -> list[str]:
+    """Extract parameter names from function parameters."""
+    param_names = []
+    for param in params:
+        if param.type == 'Identifier':
+            param_names.append(param.name)
+        elif param.type == 'AssignmentPattern':
+            # Default parameters
+            if param.left.type == 'Identifier':
+                param_names.append(param.left.name)
+        elif param.type == 'RestElement':
+            # Rest parameters
+            if param.argument.type == 'Identifier':
+                param_names.append(f"...{param.argument.name}")
+    return param_names
 
 class JSParser(BaseParser):
+    # Declarations nested in expressions (IIFEs, callbacks) are found again
+    version = "4"
+
     def parse(self, file_path: str) -> FileMetadata:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            source = f.read()
-        
-        # Try parsing with different options for better TypeScript/JSX support
+        return self.parse_compact(file_path).to_model()
+
+    def parse_compact(self, file_path: str) -> CompactMetadata:
+        source = sources.text(file_path)
+        metadata = CompactMetadata(file_path)
+
+        options = {'jsx': True, 'tolerant': True, 'range': True, 'loc': True}
         try:
             # Try parseModule first (for ES6 modules)
-            tree = esprima.parseModule(source, {'jsx': True, 'tolerant': True, 'range': True})
+            tree = esprima.parseModule(source, options)
         except Exception:
             try:
                 # Fallback to parseScript (for regular scripts)
-                tree = esprima.parseScript(source, {'jsx': True, 'tolerant': True, 'range': True})
-            except Exception as e:
-                # If parsing fails completely, return empty metadata
+                tree = esprima.parseScript(source, options)
+            except Exception:
+                # If parsing fails completely (e.g. TypeScript), return empty metadata
                 # This allows the AI to still analyze the raw code
-                return FileMetadata(
-                    file_path=file_path,
-                    language="javascript",
-                    classes=[],
-                    functions=[]
-                )
-        
-        functions = []
-        classes = []
-        
-        def extract_params(params):
-            """Extract parameter names from function parameters."""
-            param_names = []
-            for param in params:
-                if param.type == 'Identifier':
-                    param_names.append(param.name)
-                elif param.type == 'AssignmentPattern':
-                    # Default parameters
-                    if param.left.type == 'Identifier':
-                        param_names.append(param.left.name)
-                elif param.type == 'RestElement':
-                    # Rest parameters
-                    if param.argument.type == 'Identifier':
-                        param_names.append(f"...{param.argument.name}")
-            return param_names
-        
-        def traverse(node):
-            if node.type == 'FunctionDeclaration':
-                functions.append(FunctionMetadata(
-                    name=node.id.name if node.id else '<anonymous>',
-                    args=extract_params(node.params),
-                    return_type=None,
-                    docstring=None,
-                    code_snippet=source[node.range[0]:node.range[1]] if hasattr(node, 'range') else ""
-                ))
-            elif node.type == 'ClassDeclaration':
-                class_name = node.id.name if node.id else '<anonymous>'
-                class_methods = []
-                for item in node.body.body:
-                    if item.type == 'MethodDefinition':
-                        class_methods.append(FunctionMetadata(
-                            name=item.key.name if hasattr(item.key, 'name') else str(item.key.value),
-                            args=extract_params(item.value.params),
-                            return_type=None,
-                            docstring=None,
-                            code_snippet=""
-                        ))
-                classes.append(ClassMetadata(
-                    name=class_name,
-                    methods=class_methods,
-                    docstring=None,
-                    code_snippet=source[node.range[0]:node.range[1]] if hasattr(node, 'range') else ""
-                ))
-            
-            # Traverse child nodes
-            for key, value in node.__dict__.items():
-                if isinstance(value, list):
-                    for item in value:
-                        if hasattr(item, 'type'):
-                            traverse(item)
-                elif hasattr(value, 'type'):
-                    traverse(value)
-        
-        traverse(tree)
-        
-        return FileMetadata(
-            file_path=file_path,
-            language="javascript",
-            classes=classes,
-            functions=functions
-        )
+                return metadata
+
+        # Explicit stack, so deeply nested bundles cannot exhaust the recursion limit.
+        # Children are pushed in reverse to visit them in source order.
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            kind = node.type
+            if kind == "FunctionDeclaration":
+                self._add_function(metadata, node, node.id.name if node.id else "default")
+            elif kind == "ClassDeclaration":
+                self._add_class(metadata, source, node, node.id.name if node.id else "default")
+            elif kind == "VariableDeclaration":
+                # const handler = () => {...}, const Widget = class {...}
+                for declarator in node.declarations:
+                    init = declarator.init
+                    if init is None or declarator.id.type != "Identifier":
+                        continue
+                    if init.type in FUNCTION_VALUES:
+                        self._add_function(metadata, init, declarator.id.name, declarator)
+                    elif init.type == "ClassExpression":
+                        self._add_class(metadata, source, init, declarator.id.name, declarator)
+            elif kind == "ExportDefaultDeclaration":
+                # export default () => {...}; `export default function/class` arrive as declarations
+                declaration = node.declaration
+                if declaration.type in FUNCTION_VALUES:
+                    self._add_function(metadata, declaration, "default", node)
+                elif declaration.type == "ClassExpression":
+                    self._add_class(metadata, source, declaration, "default", node)
+            elif kind == "ImportDeclaration" or (kind in ("ExportNamedDeclaration", "ExportAllDeclaration") and node.source):
+                metadata.imports.append(source[node.range[0]:node.range[1]])
+                continue
+            stack.extend(reversed(_children(node)))
+
+        return metadata
+
+    @staticmethod
+    def _add_function(metadata: CompactMetadata, node, name: str, outer=None, owner: int = -1):
+        span = outer or node
+        metadata.add_function(name, extract_params(node.params), None, None, span.loc.start.line, span.loc.end.line, owner)
+
+    def _add_class(self, metadata: CompactMetadata, source: str, node, name: str, outer=None):
+        span = outer or node
+        owner = metadata.add_class(name, None, span.loc.start.line, span.loc.end.line)
+        for item in node.body.body:
+            if item.type == 'MethodDefinition':
+                # esprima nodes answer None for any attribute they lack, so hasattr() cannot tell key kinds apart
+                if item.key.type == 'Identifier':
+                    method_name = item.key.name
+                elif item.key.type == 'Literal':
+                    method_name = str(item.key.value)
+                else:
+                    # Computed keys such as [Symbol.iterator]
+                    method_name = f"[{source[item.key.range[0]:item.key.range[1]]}]"
+                self._add_function(metadata, item.value, method_name, item, owner)
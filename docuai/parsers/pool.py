@@ -0,0 +1,96 @@
+import os
+import time
+import signal
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Iterator, Optional, Tuple
+from docuai.cache import ParseCache
+from docuai.compact import CompactMetadata
+from docuai.parsers import get_parser
+from docuai.tracing import tracer
+
+DEFAULT_PARSE_TIMEOUT = 30.0
+
+class ParseTimeout(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise ParseTimeout("parsing timed out")
+
+def parse_file(file_path: str, timeout: Optional[float] = DEFAULT_PARSE_TIMEOUT) -> CompactMetadata:
+    """
+    Parses one file, giving up with ParseTimeout after `timeout` seconds.
+    The timeout relies on SIGALRM, so it only applies on Unix and in the
+    main thread of a process (which is where pool workers run).
+    """
+    use_alarm = bool(timeout) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return get_parser(file_path).parse_compact(file_path)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+def timed_parse_file(file_path: str, timeout: Optional[float] = DEFAULT_PARSE_TIMEOUT) -> Tuple[CompactMetadata, float]:
+    start = time.perf_counter()
+    metadata = parse_file(file_path, timeout)
+    return metadata, time.perf_counter() - start
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+def parse_files(
+    files: list[str],
+    workers: Optional[int] = None,
+    timeout: Optional[float] = DEFAULT_PARSE_TIMEOUT,
+    executor: Optional[Executor] = None,
+    cache: Optional[ParseCache] = None,
+) -> Iterator[Tuple[str, Optional[CompactMetadata], Optional[Exception]]]:
+    """
+    Parses files across a process pool, yielding (path, metadata, error) in
+    completion order. With one worker (or one file) parsing happens in-process.
+    Pass `executor` to reuse an existing pool. Files found in `cache` are
+    yielded first without being parsed; fresh results are added to it.
+    """
+    pending = []
+    for path in files:
+        metadata = cache.get(path) if cache is not None else None
+        if metadata is not None:
+            yield path, metadata, None
+        else:
+            pending.append(path)
+
+    workers = workers or default_workers()
+    if executor is None and (workers == 1 or len(pending) <= 1):
+        for path in pending:
+            try:
+                metadata, seconds = timed_parse_file(path, timeout)
+            except Exception as e:
+                yield path, None, e
+                continue
+            tracer.record("parse", seconds, file=path)
+            if cache is not None:
+                cache.put(path, metadata, seconds)
+            yield path, metadata, None
+        return
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(timed_parse_file, path, timeout): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                metadata, seconds = future.result()
+            except Exception as e:
+                yield path, None, e
+                continue
+            tracer.record("parse", seconds, file=path)
+            if cache is not None:
+                cache.put(path, metadata, seconds)
+            yield path, metadata, None
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
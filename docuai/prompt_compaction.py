@@ -0,0 +1,349 @@
+import os
+import re
+import ast
+import textwrap
+from typing import Union
+
+# Each level includes the ones before it:
+#   light       license banners and redundant blank lines and trailing whitespace are dropped
+#   literals    long strings are cut and large literal tables keep only their first items
+#   signatures  longer bodies of private functions are elided down to signature and docstring
+LEVELS = ("none", "light", "literals", "signatures")
+DEFAULT_LEVEL = "light"
+MAX_LITERAL_CHARS = 200
+MAX_DATA_ITEMS = 8
+# Shorter function bodies cost little and are kept even at the signatures level
+MIN_ELIDED_LINES = 6
+# Assignments that export a CommonJS module's values
+COMMONJS_EXPORT = re.compile(r"^(module\.)?exports\b")
+
+LICENSE_MARKERS = re.compile(r"licen[cs]e|copyright|spdx-license-identifier|all rights reserved", re.I)
+CODING_LINE = re.compile(r"^[ \t\f]*#.*?coding[:=]")
+BLANK_RUNS = re.compile(r"\n{3,}")
+JS_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx")
+JS_DECLARATIONS = {"FunctionDeclaration", "ClassDeclaration", "VariableDeclaration"}
+
+# (start, end, replacement) with offsets into the text the tree was parsed from
+Edit = tuple[int, int, str]
+
+def check_level(level: str) -> str:
+    if level not in LEVELS:
+        raise ValueError(f"Unknown compaction level {level!r} (expected one of: {', '.join(LEVELS)})")
+    return level
+
+def _cut_string(value: Union[str, bytes]) -> str:
+    return repr(value[:MAX_LITERAL_CHARS]) + f" ... ({len(value) - MAX_LITERAL_CHARS} more chars)"
+
+def _cut_quoted(literal: str) -> str:
+    # Cut in the source text itself, so the literal keeps its own quotes and escapes
+    body = literal[1:-1]
+    cut = body[:MAX_LITERAL_CHARS]
+    if (len(cut) - len(cut.rstrip("\\"))) % 2:
+        # A trailing lone backslash would escape the closing quote
+        cut = cut[:-1]
+    return f"{literal[0]}{cut}{literal[-1]} ... ({len(body) - len(cut)} more chars)"
+
+def _cut_items(opener: str, items: list[str], total: int, closer: str) -> str:
+    return f"{opener}{', '.join(items)}, ... ({total - len(items)} more items){closer}"
+
+def _apply(text: Union[str, bytes], edits: list[Edit]) -> Union[str, bytes]:
+    # Outermost edits win: anything starting inside an earlier edit is dropped
+    out = []
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda e: (e[0], -e[1])):
+        if start < pos:
+            continue
+        out.append(text[pos:start])
+        out.append(replacement.encode("utf-8") if isinstance(text, bytes) else replacement)
+        pos = end
+    out.append(text[pos:])
+    return text[:0].join(out)
+
+def _py_public(name: str) -> bool:
+    return not name.startswith("_") or (name.startswith("__") and name.endswith("__"))
+
+def _js_public(name: str) -> bool:
+    return not name.startswith(("_", "#"))
+
+def _py_is_data(node: ast.AST) -> bool:
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.operand, ast.Constant)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return all(_py_is_data(e) for e in node.elts)
+    if isinstance(node, ast.Dict):
+        return all(k is not None and _py_is_data(k) and _py_is_data(v) for k, v in zip(node.keys, node.values))
+    return False
+
+def _python_edits(data: bytes, level: int) -> list[Edit]:
+    tree = ast.parse(data)
+    # ast columns are UTF-8 byte offsets, so edits are made on the encoded source
+    starts = [0]
+    for line in data.split(b"\n"):
+        starts.append(starts[-1] + len(line) + 1)
+
+    def offset(lineno: int, col: int) -> int:
+        return starts[lineno - 1] + col
+
+    def segment(node: ast.AST) -> str:
+        return data[offset(node.lineno, node.col_offset):offset(node.end_lineno, node.end_col_offset)].decode("utf-8", "replace")
+
+    docstrings = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and node.body:
+            first = node.body[0]
+            if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+                docstrings.add(id(first.value))
+
+    edits = []
+    # `public` marks the module's own API: public functions and the methods of public classes,
+    # and anything nested in them. Their bodies are what the documentation is about.
+    stack = [(tree, True)]
+    while stack:
+        node, public = stack.pop()
+        if isinstance(node, ast.JoinedStr):
+            # The pieces of an f-string are not separate literals in the source
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            public = public and _py_public(node.name)
+        if level >= 3 and not public and isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body[1:] if node.body and id(getattr(node.body[0], "value", None)) in docstrings else node.body
+            if body and node.end_lineno - body[0].lineno + 1 >= MIN_ELIDED_LINES:
+                edits.append((offset(body[0].lineno, body[0].col_offset), offset(node.end_lineno, node.end_col_offset), "..."))
+                stack.extend((child, public) for child in ast.iter_child_nodes(node.args))
+                stack.extend((child, public) for child in node.decorator_list)
+                continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, (str, bytes)) and id(node) not in docstrings:
+            if len(node.value) > MAX_LITERAL_CHARS:
+                edits.append((offset(node.lineno, node.col_offset), offset(node.end_lineno, node.end_col_offset), _cut_string(node.value)))
+            continue
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Dict)) and _py_is_data(node):
+            items = [f"{segment(k)}: {segment(v)}" for k, v in zip(node.keys, node.values)] if isinstance(node, ast.Dict) \
+                else [segment(e) for e in node.elts]
+            if len(items) > MAX_DATA_ITEMS:
+                source = segment(node)
+                # A tuple can be written without parentheses
+                opener, closer = (source[0], source[-1]) if source[0] in "([{" else ("", "")
+                edits.append((
+                    offset(node.lineno, node.col_offset), offset(node.end_lineno, node.end_col_offset),
+                    _cut_items(opener, items[:MAX_DATA_ITEMS], len(items), closer)
+                ))
+                continue
+        stack.extend((child, public) for child in ast.iter_child_nodes(node))
+    return edits
+
+def _esprima_children(node, Node) -> list:
+    children = []
+    for name, value in vars(node).items():
+        if isinstance(value, Node):
+            children.append(value)
+        elif isinstance(value, list):
+            children.extend(v for v in value if isinstance(v, Node))
+    return children
+
+def _esprima_is_data(node) -> bool:
+    if node is None:
+        return False
+    if node.type == "Literal":
+        return True
+    if node.type == "UnaryExpression":
+        return node.argument.type == "Literal"
+    if node.type == "TemplateLiteral":
+        return not node.expressions
+    if node.type == "ArrayExpression":
+        return all(_esprima_is_data(e) for e in node.elements)
+    if node.type == "ObjectExpression":
+        return all(p.type == "Property" and not p.computed and _esprima_is_data(p.value) for p in node.properties)
+    return False
+
+def _esprima_edits(text: str, level: int) -> list[Edit]:
+    import esprima
+    from esprima.nodes import Node
+
+    options = {"jsx": True, "tolerant": True, "range": True}
+    try:
+        tree = esprima.parseModule(text, options)
+    except Exception:
+        tree = esprima.parseScript(text, options)
+
+    def segment(node) -> str:
+        return text[node.range[0]:node.range[1]]
+
+    def exports(statement) -> bool:
+        return statement.type.startswith("Export") or (
+            statement.type == "ExpressionStatement" and statement.expression.type == "AssignmentExpression"
+            and COMMONJS_EXPORT.match(segment(statement.expression.left)) is not None
+        )
+
+    # Bodies stay under an export, or under any top-level declaration of a script without exports
+    scripted = not any(exports(statement) for statement in tree.body)
+    edits = []
+    stack = [(statement, exports(statement) or (scripted and statement.type in JS_DECLARATIONS)) for statement in tree.body]
+    while stack:
+        node, public = stack.pop()
+        kind = node.type
+        if kind in ("MethodDefinition", "Property") and not node.computed and node.key.type == "Identifier":
+            public = public and _js_public(node.key.name)
+        if level >= 3 and not public and kind in ("FunctionDeclaration", "FunctionExpression", "ArrowFunctionExpression") \
+                and node.body.type == "BlockStatement" and segment(node.body).count("\n") + 1 >= MIN_ELIDED_LINES:
+            edits.append((node.body.range[0], node.body.range[1], "{ ... }"))
+            stack.extend((param, public) for param in node.params)
+            continue
+        if kind == "Literal" and isinstance(node.value, str):
+            if len(segment(node)) - 2 > MAX_LITERAL_CHARS:
+                edits.append((node.range[0], node.range[1], _cut_quoted(segment(node))))
+            continue
+        if kind in ("ArrayExpression", "ObjectExpression") and _esprima_is_data(node):
+            members = node.elements if kind == "ArrayExpression" else node.properties
+            if len(members) > MAX_DATA_ITEMS:
+                opener, closer = ("[", "]") if kind == "ArrayExpression" else ("{", "}")
+                items = [segment(m) for m in members[:MAX_DATA_ITEMS]]
+                edits.append((node.range[0], node.range[1], _cut_items(opener, items, len(members), closer)))
+                continue
+        stack.extend((child, public) for child in _esprima_children(node, Node))
+    return edits
+
+TS_FUNCTIONS = {
+    "function_declaration", "generator_function_declaration", "function_expression", "function",
+    "generator_function", "arrow_function", "method_definition",
+}
+TS_DECLARATIONS = {
+    "function_declaration", "generator_function_declaration", "class_declaration", "abstract_class_declaration",
+    "lexical_declaration", "variable_declaration",
+}
+TS_MEMBERS = {"method_definition", "public_field_definition", "pair"}
+TS_SCALARS = {"string", "number", "true", "false", "null", "undefined"}
+
+def _ts_is_data(node) -> bool:
+    kind = node.type
+    if kind in TS_SCALARS:
+        return True
+    if kind == "template_string":
+        return not any(c.type == "template_substitution" for c in node.named_children)
+    if kind == "unary_expression":
+        return node.named_children[-1].type == "number"
+    if kind == "array":
+        return all(_ts_is_data(c) for c in node.named_children if c.type != "comment")
+    if kind == "object":
+        return all(c.type == "pair" and _ts_is_data(c.child_by_field_name("value"))
+                   for c in node.named_children if c.type != "comment")
+    return False
+
+def _tree_sitter_edits(data: bytes, file_path: str, level: int) -> list[Edit]:
+    from docuai.parsers import ts_parser
+
+    tree = ts_parser.tree_sitter.Parser(ts_parser._language(file_path)).parse(data)
+
+    def exports(statement) -> bool:
+        if statement.type == "export_statement":
+            return True
+        expression = statement.named_children[0] if statement.type == "expression_statement" and statement.named_children else None
+        return expression is not None and expression.type == "assignment_expression" \
+            and COMMONJS_EXPORT.match(ts_parser._text(expression.child_by_field_name("left"))) is not None
+
+    # Bodies stay under an export, or under any top-level declaration of a script without exports
+    statements = tree.root_node.named_children
+    scripted = not any(exports(statement) for statement in statements)
+    edits = []
+    stack = [(statement, exports(statement) or (scripted and statement.type in TS_DECLARATIONS)) for statement in statements]
+    while stack:
+        node, public = stack.pop()
+        kind = node.type
+        if kind in TS_MEMBERS:
+            key = node.child_by_field_name("name") or node.child_by_field_name("key")
+            private = any(c.type == "accessibility_modifier" and ts_parser._text(c) == "private" for c in node.children)
+            public = public and not private and (key is None or _js_public(ts_parser._text(key)))
+        if level >= 3 and not public and kind in TS_FUNCTIONS:
+            body = node.child_by_field_name("body")
+            if body is not None and body.type == "statement_block" and body.end_point[0] - body.start_point[0] + 1 >= MIN_ELIDED_LINES:
+                edits.append((body.start_byte, body.end_byte, "{ ... }"))
+                continue
+        if kind in ("string", "template_string") and _ts_is_data(node):
+            literal = ts_parser._text(node)
+            if len(literal) - 2 > MAX_LITERAL_CHARS:
+                edits.append((node.start_byte, node.end_byte, _cut_quoted(literal)))
+            continue
+        if kind in ("array", "object") and _ts_is_data(node):
+            members = [c for c in node.named_children if c.type != "comment"]
+            if len(members) > MAX_DATA_ITEMS:
+                opener, closer = ("[", "]") if kind == "array" else ("{", "}")
+                items = [ts_parser._text(m) for m in members[:MAX_DATA_ITEMS]]
+                edits.append((node.start_byte, node.end_byte, _cut_items(opener, items, len(members), closer)))
+                continue
+        stack.extend((child, public) for child in node.children)
+    return edits
+
+def _structural(text: str, file_path: str, level: int) -> str:
+    if file_path.endswith(".py"):
+        data = text.encode("utf-8")
+        return _apply(data, _python_edits(data, level)).decode("utf-8")
+    if file_path.endswith(JS_EXTENSIONS):
+        from docuai.parsers import JS_PARSER_ENV, ts_parser
+        backend = os.getenv(JS_PARSER_ENV, "auto")
+        if backend == "tree-sitter" or (backend == "auto" and ts_parser.available()):
+            data = text.encode("utf-8")
+            return _apply(data, _tree_sitter_edits(data, file_path, level)).decode("utf-8")
+        return _apply(text, _esprima_edits(text, level))
+    return text
+
+def strip_banner(text: str, file_path: str) -> str:
+    """
+    Removes a leading comment block that holds a license or copyright
+    notice, keeping any shebang and encoding lines above it.
+    """
+    lines = text.split("\n")
+    i = 0
+    while i < len(lines) and (lines[i].startswith("#!") or CODING_LINE.match(lines[i])):
+        i += 1
+    start = i
+    while i < len(lines) and not lines[i].strip():
+        i += 1
+    if file_path.endswith(".py"):
+        while i < len(lines) and (lines[i].lstrip().startswith("#") or not lines[i].strip()):
+            i += 1
+    elif i < len(lines) and lines[i].lstrip().startswith("/*"):
+        while i < len(lines) and "*/" not in lines[i]:
+            i += 1
+        i += 1
+    else:
+        while i < len(lines) and lines[i].lstrip().startswith("//"):
+            i += 1
+    if i > start and LICENSE_MARKERS.search("\n".join(lines[start:i])):
+        return "\n".join(lines[:start] + lines[i:])
+    return text
+
+def squeeze(text: str) -> str:
+    """
+    Drops trailing whitespace and leading blank lines, and collapses runs
+    of blank lines into one.
+    """
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return BLANK_RUNS.sub("\n\n", text).lstrip("\n")
+
+def compact(text: str, file_path: str, level: str = DEFAULT_LEVEL) -> str:
+    """
+    Returns `text`, the source of (part of) `file_path`, shrunk for a prompt
+    at compaction `level`. The structural levels work on the Python, esprima
+    or tree-sitter syntax tree; when the text does not parse (e.g. a part of
+    a file cut out of a class), only the light level is applied. The
+    signatures level keeps the bodies of the file's public or exported
+    definitions and elides only those of private helpers and callbacks.
+    """
+    rank = LEVELS.index(check_level(level))
+    if rank == 0:
+        return text
+    if rank >= 2:
+        # A snippet cut out of a class or block only parses once dedented
+        dedented = textwrap.dedent(text)
+        try:
+            if dedented == text:
+                text = _structural(text, file_path, rank)
+            else:
+                first = next(line for line in text.split("\n") if line.strip())
+                indent = first[:len(first) - len(next(line for line in dedented.split("\n") if line.strip()))]
+                text = textwrap.indent(_structural(dedented, file_path, rank), indent)
+        except Exception:
+            # Syntax errors, and esprima's own error types (it gives up on TypeScript)
+            pass
+    return squeeze(strip_banner(text, file_path))
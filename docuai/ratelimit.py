@@ -0,0 +1,180 @@
+import sys
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, TypeVar
+from docuai.tracing import tracer
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Marks a stream that ended before its first item
+_END = object()
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` units per minute.
+
+    `reserve` always succeeds and returns how long the caller must wait
+    before using what it reserved, so waiters are served in arrival order.
+    Requests larger than the bucket are clamped to its capacity.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+def retry_delay(error: Exception) -> Optional[float]:
+    """
+    Returns the server-requested delay for a retryable error (0.0 if the
+    server did not say), or None if the error should not be retried.
+    """
+    status = getattr(error, "status_code", None)
+    # An openai error can only exist once the client library is loaded; importing it here would cost startup time
+    openai = sys.modules.get("openai")
+    if status is None and openai is not None and isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return 0.0
+    if status not in RETRYABLE_STATUS:
+        return None
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return 0.0
+
+class RateLimiter:
+    """
+    Paces model calls under requests-per-minute and tokens-per-minute limits
+    and retries rate-limited or failed calls.
+
+    On a retryable error every caller pauses (the limit is shared), for the
+    server's Retry-After if given, otherwise with jittered exponential backoff.
+    `throttled_seconds` and `working_seconds` record time spent waiting versus
+    time spent in calls.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.paused_until = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self.working_seconds = 0.0
+
+    def reset_stats(self):
+        self.calls = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self.working_seconds = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        self.throttled_seconds += wait
+        return wait
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        delay = retry_delay(error)
+        if delay is None or attempt >= self.max_retries:
+            raise error
+        if not delay:
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        self.retries += 1
+        tracer.count("llm.retries")
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._reserve(tokens))
+            start = time.monotonic()
+            try:
+                self.calls += 1
+                return fn()
+            except Exception as e:
+                self._backoff(e, attempt)
+            finally:
+                self.working_seconds += time.monotonic() - start
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._reserve(tokens))
+            start = time.monotonic()
+            try:
+                self.calls += 1
+                return await fn()
+            except Exception as e:
+                self._backoff(e, attempt)
+            finally:
+                self.working_seconds += time.monotonic() - start
+
+    def stream(self, fn: Callable[[], Iterable[T]], tokens: int = 0) -> Iterator[T]:
+        """
+        Opens the stream returned by `fn` like a `call`, retrying until its
+        first item arrives. Once output has started the stream cannot be
+        replayed, so later errors propagate.
+        """
+        def first():
+            iterator = iter(fn())
+            return iterator, next(iterator, _END)
+
+        iterator, item = self.call(first, tokens)
+        if item is _END:
+            return
+        yield item
+        yield from iterator
+
+    async def astream(self, fn: Callable[[], AsyncIterable[T]], tokens: int = 0) -> AsyncIterator[T]:
+        async def first():
+            iterator = fn().__aiter__()
+            try:
+                return iterator, await iterator.__anext__()
+            except StopAsyncIteration:
+                return iterator, _END
+
+        iterator, item = await self.acall(first, tokens)
+        if item is _END:
+            return
+        yield item
+        async for item in iterator:
+            yield item
@@ -0,0 +1,213 @@
+import os
+import re
+import math
+import sqlite3
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from docuai.cache import default_cache_dir
+from docuai.compact import AnyMetadata
+from docuai.source import sources
+from docuai.tokens import count_tokens
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_TOP_K = 40
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "with", "def", "self", "return", "import", "function", "const", "let",
+    "var", "none", "true", "false", "null", "if", "else", "class", "new",
+}
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\b|[0-9])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-cased terms for indexing: identifiers are split on case and
+    underscores ("parseRepoFiles" -> parse, repo, files) and kept whole too.
+    """
+    terms = []
+    for word in _WORD.findall(text.replace("_", " ")):
+        parts = _CAMEL.findall(word)
+        if len(parts) > 1:
+            terms.append(word.lower())
+        terms.extend(p.lower() for p in parts)
+    return [t for t in terms if len(t) > 1 and t not in STOPWORDS]
+
+@dataclass
+class Chunk:
+    path: str
+    name: str
+    start_line: int
+    end_line: int
+    score: float = 0.0
+    text: str = ""
+    tokens: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.path}:{self.start_line}-{self.end_line} {self.name}"
+
+def file_chunks(metadata: AnyMetadata, lines: list[str]) -> list[tuple[str, int, int]]:
+    """
+    Returns (name, start_line, end_line) for the function- and class-level
+    chunks of a file. A class becomes one chunk for its header and docstring
+    plus one per method; files without definitions are a single chunk.
+    """
+    chunks = [(f.name, f.start_line, f.end_line) for f in metadata.functions]
+    for cls in metadata.classes:
+        first_method = min((m.start_line for m in cls.methods), default=cls.end_line + 1)
+        chunks.append((cls.name, cls.start_line, max(cls.start_line, first_method - 1)))
+        chunks.extend((f"{cls.name}.{m.name}", m.start_line, m.end_line) for m in cls.methods)
+    if not chunks and lines:
+        chunks.append(("<module>", 1, len(lines)))
+    return chunks
+
+class RetrievalIndex:
+    """
+    Persistent BM25 index over the function- and class-level chunks of one
+    repository, kept in SQLite as an inverted index (term -> chunk, term
+    frequency), so a query only reads the postings of its own terms.
+
+    Files are tracked by size, mtime and content hash; `sync` reports the
+    ones that need re-indexing and drops deleted ones, so updates cost only
+    what changed.
+    """
+
+    def __init__(self, key: str, cache_dir: Optional[str] = None):
+        directory = os.path.join(cache_dir or default_cache_dir(), "retrieval")
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        self.db_path = os.path.join(directory, f"{name}.sqlite3")
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id INTEGER PRIMARY KEY, path TEXT NOT NULL, name TEXT NOT NULL,"
+            " start_line INTEGER NOT NULL, end_line INTEGER NOT NULL, length INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, chunk INTEGER NOT NULL, tf INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS postings_term ON postings (term);"
+            "CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk);"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        return sources.read(path).sha256
+
+    def sync(self, files: list[str], root: str) -> list[str]:
+        """
+        Removes files that no longer exist and returns the ones whose
+        content is new or changed since they were indexed.
+        """
+        known = {row[0]: row[1:] for row in self._conn.execute("SELECT path, size, mtime_ns, sha256 FROM files")}
+        current = {os.path.relpath(f, root): f for f in files}
+        for rel_path in set(known) - set(current):
+            self._remove(rel_path)
+
+        stale = []
+        for rel_path, path in current.items():
+            st = os.stat(path)
+            entry = known.get(rel_path)
+            if entry and entry[:2] == (st.st_size, st.st_mtime_ns):
+                continue
+            sha256 = self._sha256(path)
+            if entry and entry[2] == sha256:
+                # Touched or freshly cloned but unchanged
+                self._conn.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (st.st_size, st.st_mtime_ns, rel_path)
+                )
+                continue
+            stale.append(path)
+        self._conn.commit()
+        return stale
+
+    def _remove(self, rel_path: str):
+        self._conn.execute("DELETE FROM postings WHERE chunk IN (SELECT id FROM chunks WHERE path = ?)", (rel_path,))
+        self._conn.execute("DELETE FROM chunks WHERE path = ?", (rel_path,))
+        self._conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+
+    def add(self, metadata_list: Iterable[AnyMetadata], root: str):
+        """
+        (Re-)indexes the chunks of freshly parsed files.
+        """
+        for metadata in metadata_list:
+            rel_path = os.path.relpath(metadata.file_path, root)
+            lines = sources.text(metadata.file_path).splitlines()
+            self._remove(rel_path)
+            for name, start, end in file_chunks(metadata, lines):
+                terms = Counter(tokenize(name + "\n" + "\n".join(lines[start - 1:end])))
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (path, name, start_line, end_line, length) VALUES (?, ?, ?, ?, ?)",
+                    (rel_path, name, start, end, sum(terms.values()))
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()]
+                )
+            st = os.stat(metadata.file_path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                (rel_path, st.st_size, st.st_mtime_ns, self._sha256(metadata.file_path))
+            )
+        self._conn.commit()
+
+    def score(self, query: str) -> dict[int, float]:
+        """
+        Returns BM25 scores of every chunk that shares a term with `query`.
+        """
+        n_chunks, total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+        if not n_chunks:
+            return {}
+        avg_length = total_length / n_chunks or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._conn.execute(
+                "SELECT p.chunk, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk WHERE p.term = ?", (term,)
+            ).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk, tf, length in postings:
+                norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                scores[chunk] = scores.get(chunk, 0.0) + idf * norm
+        return scores
+
+    def search(self, query: str, root: str, budget: int, top_k: int = DEFAULT_TOP_K, model: str = "gpt-4o") -> list[Chunk]:
+        """
+        Returns up to `top_k` of the best-matching chunks, with their source
+        text, whose combined size fits in `budget` tokens. A chunk that would
+        overflow the budget is skipped in favour of smaller ones below it.
+        """
+        scores = self.score(query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        used = 0
+        file_lines = {}
+        for chunk_id, score in ranked:
+            if len(results) >= top_k:
+                break
+            path, name, start, end = self._conn.execute(
+                "SELECT path, name, start_line, end_line FROM chunks WHERE id = ?", (chunk_id,)
+            ).fetchone()
+            if path not in file_lines:
+                file_lines[path] = sources.text(os.path.join(root, path)).splitlines()
+            chunk = Chunk(path, name, start, end, score, "\n".join(file_lines[path][start - 1:end]))
+            chunk.tokens = count_tokens(f"--- {chunk.label} ---\n{chunk.text}", model)
+            if used + chunk.tokens > budget:
+                continue
+            used += chunk.tokens
+            results.append(chunk)
+        # Present excerpts in source order so neighbouring chunks read naturally
+        return sorted(results, key=lambda c: (c.path, c.start_line))
+
+    def close(self):
+        self._conn.close()
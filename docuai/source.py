@@ -0,0 +1,106 @@
+import os
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+# Source text kept in memory across a run; least recently used files are dropped first
+DEFAULT_MAX_CHARS = 256 * 1024 * 1024
+
+class SourceFile:
+    """
+    One read of a source file: its decoded text, content hash and a lazily
+    built table of line start offsets, so snippets can be sliced by line
+    range without keeping copies of them.
+    """
+
+    __slots__ = ("path", "text", "sha256", "size", "mtime_ns", "_offsets")
+
+    def __init__(self, path: str, text: str, sha256: str, size: int, mtime_ns: int):
+        self.path = path
+        self.text = text
+        self.sha256 = sha256
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._offsets = None
+
+    @classmethod
+    def read(cls, path: str) -> "SourceFile":
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        # Undecodable bytes become U+FFFD rather than failing the whole file
+        return cls(path, data.decode("utf-8", "replace"), hashlib.sha256(data).hexdigest(), st.st_size, st.st_mtime_ns)
+
+    @property
+    def offsets(self) -> array:
+        if self._offsets is None:
+            offsets = array("Q", [0])
+            find = self.text.find
+            position = find("\n")
+            while position != -1:
+                offsets.append(position + 1)
+                position = find("\n", position + 1)
+            self._offsets = offsets
+        return self._offsets
+
+    @property
+    def line_count(self) -> int:
+        offsets = self.offsets
+        # A trailing newline does not start another line
+        return len(offsets) - 1 if offsets[-1] == len(self.text) else len(offsets)
+
+    def lines(self, start: int, end: int) -> str:
+        """
+        Returns lines `start` to `end` (1-based, inclusive) without the final newline.
+        """
+        offsets = self.offsets
+        first = offsets[max(0, start - 1)] if start - 1 < len(offsets) else len(self.text)
+        last = offsets[end] - 1 if end < len(offsets) else len(self.text)
+        return self.text[first:max(first, last)]
+
+class SourceStore:
+    """
+    Read-once cache of source files shared by the parsers, prompt builders,
+    hashing and analysis passes of a run. An entry is reused while the
+    file's size and mtime are unchanged.
+    """
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS):
+        self.max_chars = max_chars
+        self.reads = 0
+        self._files = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def read(self, path: str) -> SourceFile:
+        key = os.path.realpath(path)
+        st = os.stat(key)
+        with self._lock:
+            source = self._files.get(key)
+            if source is not None and (source.size, source.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                self._files.move_to_end(key)
+                return source
+
+        source = SourceFile.read(path)
+        with self._lock:
+            self.reads += 1
+            old = self._files.pop(key, None)
+            if old is not None:
+                self._chars -= len(old.text)
+            self._files[key] = source
+            self._chars += len(source.text)
+            while self._chars > self.max_chars and len(self._files) > 1:
+                _, evicted = self._files.popitem(last=False)
+                self._chars -= len(evicted.text)
+        return source
+
+    def text(self, path: str) -> str:
+        return self.read(path).text
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._chars = 0
+
+sources = SourceStore()
@@ -0,0 +1,249 @@
+import os
+import re
+import ast
+from collections import defaultdict
+from typing import TYPE_CHECKING, Iterable, Optional
+from docuai.compact import AnyMetadata
+
+if TYPE_CHECKING:
+    from docuai.models import ClassMetadata, FunctionMetadata
+
+JS_EXTENSIONS = (".js", ".ts", ".tsx", ".jsx")
+# Cross-file context is a hint, not the subject of the prompt; keep it bounded
+DEFAULT_CONTEXT_CHARS = 6000
+
+JS_IMPORT = re.compile(r"""^\s*import\s+(?P<clause>.+?)\s+from\s+['"](?P<source>[^'"]+)['"]""", re.S)
+
+def module_name(rel_path: str) -> str:
+    """
+    Returns the import name of a repository-relative path: "pkg/mod.py" is
+    "pkg.mod", "pkg/__init__.py" is "pkg" and "src/app.js" is "src/app".
+    """
+    base, ext = os.path.splitext(rel_path.replace(os.sep, "/"))
+    if ext != ".py":
+        return base
+    parts = base.split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+def function_signature(func: "FunctionMetadata", js: bool = False) -> str:
+    keyword = "function" if js else "def"
+    signature = f"{keyword} {func.name}({', '.join(func.args)})"
+    if func.returns:
+        signature += f" -> {func.returns}"
+    if func.docstring:
+        signature += f"  # {func.docstring.strip().splitlines()[0]}"
+    return signature
+
+def class_signature(cls: "ClassMetadata", js: bool = False) -> str:
+    lines = [f"class {cls.name}" + (f"  # {cls.docstring.strip().splitlines()[0]}" if cls.docstring else "")]
+    for method in cls.methods:
+        # Private helpers are not part of what an importer can rely on
+        if not method.name or (method.name.startswith("_") and method.name != "__init__"):
+            continue
+        lines.append("    " + function_signature(method, js))
+    return "\n".join(lines)
+
+class Import:
+    """
+    One resolved import: the repository file it refers to, the symbol names
+    taken from it (None for the whole module) and the name it is bound to.
+    """
+
+    def __init__(self, target: str, names: Optional[list[str]] = None, bound: Optional[str] = None):
+        self.target = target
+        self.names = names
+        self.bound = bound
+
+class SymbolIndex:
+    """
+    Definitions of every parsed file in a repository, keyed by module, plus
+    the import graph between those files. Built once per run and used to
+    give each per-file prompt the signatures of exactly what it imports.
+    """
+
+    def __init__(self, metadata_list: Iterable[AnyMetadata], root: str):
+        self.root = root
+        self.files = {}
+        self.modules = {}
+        self.definitions = {}
+        self.resolved = {}
+        self.imports = {}
+        for metadata in metadata_list:
+            self._add(metadata)
+        self._link(self.files)
+
+    def _add(self, metadata: AnyMetadata):
+        name = module_name(os.path.relpath(metadata.file_path, self.root))
+        self.files[metadata.file_path] = metadata
+        self.modules[name] = metadata.file_path
+        js = metadata.file_path.endswith(JS_EXTENSIONS)
+        symbols = {}
+        for cls in metadata.classes:
+            symbols[cls.name] = class_signature(cls, js)
+        for func in metadata.functions:
+            symbols[func.name] = function_signature(func, js)
+        self.definitions[metadata.file_path] = symbols
+
+    def _link(self, file_paths: Iterable[str]):
+        # Resolves the imports of `file_paths` and rebuilds the reverse graph
+        for path in file_paths:
+            self.resolved[path] = self._resolve(self.files[path])
+            self.imports[path] = {i.target for i in self.resolved[path]}
+        self.importers = defaultdict(set)
+        for path, targets in self.imports.items():
+            for target in targets:
+                self.importers[target].add(path)
+
+    def update(self, metadata: AnyMetadata):
+        """
+        Adds or replaces one file after it was edited. A new file can satisfy
+        imports that did not resolve before, so that re-resolves every file.
+        """
+        added = metadata.file_path not in self.files
+        self._add(metadata)
+        self._link(list(self.files) if added else [metadata.file_path])
+
+    def remove(self, file_path: str):
+        if file_path not in self.files:
+            return
+        del self.files[file_path]
+        del self.definitions[file_path]
+        self.resolved.pop(file_path, None)
+        self.imports.pop(file_path, None)
+        self.modules = {name: path for name, path in self.modules.items() if path != file_path}
+        self._link(list(self.files))
+
+    def _find_module(self, name: str) -> Optional[str]:
+        if name in self.modules:
+            return self.modules[name]
+        # Repositories with a src/ layout import "pkg.mod" for "src/pkg/mod.py"
+        matches = [path for module, path in self.modules.items() if module.endswith("." + name)]
+        return matches[0] if len(matches) == 1 else None
+
+    def _find_js_module(self, file_path: str, source: str) -> Optional[str]:
+        if not source.startswith("."):
+            return None  # a package from node_modules
+        rel_dir = os.path.dirname(os.path.relpath(file_path, self.root))
+        base = os.path.normpath(os.path.join(rel_dir, source)).replace(os.sep, "/")
+        for candidate in (base, base + "/index"):
+            stem = os.path.splitext(candidate)[0] if candidate.endswith(JS_EXTENSIONS) else candidate
+            if stem in self.modules:
+                return self.modules[stem]
+        return None
+
+    def _resolve(self, metadata: AnyMetadata) -> list[Import]:
+        if metadata.file_path.endswith(JS_EXTENSIONS):
+            return self._resolve_js(metadata)
+
+        package = module_name(os.path.relpath(metadata.file_path, self.root)).split(".")
+        if not metadata.file_path.endswith("__init__.py"):
+            package = package[:-1]
+
+        resolved = []
+        for statement in metadata.imports:
+            try:
+                nodes = ast.parse(statement).body
+            except SyntaxError:
+                continue
+            for node in nodes:
+                if isinstance(node, ast.Import):
+                    for alias in node.names:
+                        target = self._find_module(alias.name)
+                        if target:
+                            resolved.append(Import(target, bound=alias.asname or alias.name))
+                elif isinstance(node, ast.ImportFrom):
+                    base = package[:len(package) - node.level + 1] if node.level else []
+                    if node.level and node.level - 1 > len(package):
+                        continue
+                    module = ".".join(base + ([node.module] if node.module else []))
+                    target = self._find_module(module) if module else None
+                    names = []
+                    for alias in node.names:
+                        # "from pkg import mod" imports a module, not a symbol
+                        submodule = self._find_module(f"{module}.{alias.name}" if module else alias.name)
+                        if submodule and (target is None or alias.name not in self.definitions[target]):
+                            resolved.append(Import(submodule, bound=alias.asname or alias.name))
+                        elif target:
+                            names.append(alias.name)
+                    if target and names:
+                        resolved.append(Import(target, names=names))
+        return resolved
+
+    def _resolve_js(self, metadata: AnyMetadata) -> list[Import]:
+        resolved = []
+        for statement in metadata.imports:
+            match = JS_IMPORT.match(statement)
+            if not match:
+                continue
+            target = self._find_js_module(metadata.file_path, match.group("source"))
+            if not target:
+                continue
+            clause = match.group("clause")
+            namespace = re.search(r"\*\s+as\s+(\w+)", clause)
+            if namespace:
+                resolved.append(Import(target, bound=namespace.group(1)))
+            named = re.search(r"\{(.*?)\}", clause, re.S)
+            if named:
+                names = [part.split(" as ")[0].strip() for part in named.group(1).split(",") if part.strip()]
+                resolved.append(Import(target, names=names))
+        return resolved
+
+    def _lookup(self, file_path: str, name: str, depth: int = 3) -> Optional[tuple[str, str]]:
+        """
+        Finds the signature of `name` as seen from `file_path`, following
+        re-exports such as `from .impl import name` in a package __init__.
+        """
+        signature = self.definitions.get(file_path, {}).get(name)
+        if signature is not None:
+            return file_path, signature
+        if depth:
+            for imp in self.resolved.get(file_path, []):
+                if imp.names and (name in imp.names or "*" in imp.names):
+                    found = self._lookup(imp.target, name, depth - 1)
+                    if found:
+                        return found
+        return None
+
+    def dependents(self, file_paths: Iterable[str]) -> set[str]:
+        """
+        Returns the files that import any of `file_paths` directly.
+        """
+        return set().union(*(self.importers.get(path, set()) for path in file_paths))
+
+    def context_for(self, metadata: AnyMetadata, code: str, max_chars: int = DEFAULT_CONTEXT_CHARS) -> str:
+        """
+        Returns the signatures of the repository symbols `metadata` imports,
+        grouped by the file that defines them. Whole-module imports contribute
+        only the attributes the code actually uses (`mod.name`).
+        """
+        wanted = []
+        for imp in self.resolved.get(metadata.file_path, []):
+            if imp.target == metadata.file_path:
+                continue
+            if imp.names is None:
+                used = re.findall(rf"\b{re.escape(imp.bound)}\.(\w+)", code)
+                names = list(dict.fromkeys(used))
+            elif "*" in imp.names:
+                names = [n for n in self.definitions[imp.target] if not n.startswith("_")]
+            else:
+                names = imp.names
+            for name in names:
+                found = self._lookup(imp.target, name)
+                if found and found not in wanted:
+                    wanted.append(found)
+
+        grouped = defaultdict(list)
+        for path, signature in wanted:
+            grouped[path].append(signature)
+
+        sections = []
+        size = 0
+        for path, signatures in grouped.items():
+            section = f"From {os.path.relpath(path, self.root)}:\n" + "\n".join(signatures)
+            if size + len(section) > max_chars:
+                break
+            sections.append(section)
+            size += len(section)
+        return "\n\n".join(sections)
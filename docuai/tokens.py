@@ -0,0 +1,103 @@
+import math
+from dataclasses import dataclass, field
+from typing import Optional
+from docuai.source import sources
+
+DEFAULT_CONTEXT_LIMIT = 128000
+# Tokens held back from the context window for the model's answer
+DEFAULT_OUTPUT_RESERVE = 4096
+# Average characters per token for code, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+def _get_encoding(model: str):
+    if model in _encodings:
+        return _encodings[model]
+
+    encoding = None
+    try:
+        # Imported on first use to keep CLI startup fast
+        import tiktoken
+    except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+        tiktoken = None
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            try:
+                encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                encoding = None
+        except Exception:
+            # tiktoken downloads its BPE tables on first use; offline we fall back to the heuristic
+            encoding = None
+    _encodings[model] = encoding
+    return encoding
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Returns the number of tokens `text` costs for `model`.
+    Uses tiktoken when available, otherwise a characters-per-token estimate.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def prompt_tokens(prompt, inputs: Optional[dict] = None, model: str = "gpt-4o") -> int:
+    """
+    Returns the token cost of a prompt template rendered with `inputs`.
+    Missing variables are rendered empty, so `prompt_tokens(prompt)` is the
+    fixed overhead of the template itself.
+    """
+    values = {name: "" for name in prompt.input_variables}
+    values.update(inputs or {})
+    return count_tokens(prompt.format(**values), model)
+
+def file_tokens(file_path: str, model: str = "gpt-4o") -> int:
+    try:
+        return count_tokens(sources.text(file_path), model)
+    except Exception:
+        return 0
+
+@dataclass
+class Bin:
+    items: list = field(default_factory=list)
+    tokens: int = 0
+
+def pack(costs: dict, budget: int) -> list[Bin]:
+    """
+    Groups items into as few bins as possible without any bin exceeding
+    `budget` tokens (first-fit decreasing). `costs` maps item -> tokens.
+    Items larger than the budget get a bin of their own.
+    """
+    bins = []
+    for item, tokens in sorted(costs.items(), key=lambda pair: pair[1], reverse=True):
+        for b in bins:
+            if b.tokens + tokens <= budget:
+                b.items.append(item)
+                b.tokens += tokens
+                break
+        else:
+            bins.append(Bin([item], tokens))
+    return bins
+
+@dataclass
+class RequestPlan:
+    """
+    What a run would send to the model: one entry per planned request.
+    """
+    requests: list = field(default_factory=list)
+    oversized: list = field(default_factory=list)
+
+    def add(self, label: str, tokens: int, limit: int):
+        self.requests.append((label, tokens))
+        if tokens > limit:
+            self.oversized.append((label, tokens))
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(tokens for _, tokens in self.requests)
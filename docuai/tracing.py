@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional
+
+class Tracer:
+    """
+    Collects timed spans and counters for one run.
+
+    Spans nest freely and may overlap (concurrent calls get their own lanes
+    in Chrome trace output). Recording is a no-op until `enabled` is set, so
+    instrumentation can stay in place permanently.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def reset(self, enabled: bool = False):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(int)
+
+    @staticmethod
+    def _lane() -> int:
+        # Concurrent asyncio tasks share a thread, so give each task its own lane
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return id(task) if task is not None else threading.get_ident()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            yield attrs
+            return
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, time.perf_counter() - start, start=start, **attrs)
+
+    def record(self, name: str, seconds: float, start: Optional[float] = None, **attrs):
+        """
+        Adds a span measured elsewhere, e.g. in a worker process.
+        """
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - seconds
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start": start - self.origin,
+                "duration": seconds,
+                "lane": self._lane(),
+                "attrs": attrs,
+            })
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+
+    def record_usage(self, usage: Optional[dict], attrs: Optional[dict] = None):
+        """
+        Adds token counts from an LLM response's usage metadata to the run
+        totals and, if given, to the attributes of the call's span.
+        """
+        if not usage:
+            return
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        self.count("llm.prompt_tokens", prompt)
+        self.count("llm.completion_tokens", completion)
+        if attrs is not None:
+            attrs["prompt_tokens"] = attrs.get("prompt_tokens", 0) + prompt
+            attrs["completion_tokens"] = attrs.get("completion_tokens", 0) + completion
+
+    def summary(self) -> list[tuple[str, int, float, float, float]]:
+        """
+        Returns (name, count, total, mean, max) per span name, slowest total first.
+        """
+        groups = defaultdict(list)
+        for span in self.spans:
+            groups[span["name"]].append(span["duration"])
+        rows = [
+            (name, len(durations), sum(durations), sum(durations) / len(durations), max(durations))
+            for name, durations in groups.items()
+        ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def write(self, path: str):
+        """
+        Writes spans to `path`: JSON lines for *.jsonl, otherwise Chrome trace
+        format (load it in chrome://tracing or https://ui.perfetto.dev).
+        """
+        if path.endswith(".jsonl"):
+            with open(path, "w") as f:
+                for span in self.spans:
+                    f.write(json.dumps(span) + "\n")
+                f.write(json.dumps({"counters": dict(self.counters)}) + "\n")
+            return
+
+        lanes = {}
+        events = []
+        for span in self.spans:
+            tid = lanes.setdefault(span["lane"], len(lanes) + 1)
+            events.append({
+                "name": span["name"],
+                "ph": "X",
+                "ts": span["start"] * 1e6,
+                "dur": span["duration"] * 1e6,
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": span["attrs"],
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "otherData": {"counters": dict(self.counters)}}, f)
+
+tracer = Tracer()
@@ -0,0 +1,301 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Iterable, Optional
+
+# Quiet time after the last change before a burst of saves is acted on
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 1.0
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+# Saves are seen once the file is closed (or renamed into place), not on every write
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+class Watcher(ABC):
+    """
+    Reports changed paths under a set of watched directories. `changes`
+    returns ("file", path) for files written, created, moved or deleted,
+    and ("dir", path) for new directories; the caller decides whether to
+    `watch` those.
+    """
+
+    @abstractmethod
+    def watch(self, directory: str):
+        pass
+
+    @abstractmethod
+    def changes(self, timeout: float) -> list[tuple[str, str]]:
+        pass
+
+    def close(self):
+        pass
+
+class InotifyWatcher(Watcher):
+    """
+    Linux inotify, called through ctypes so no extra package is needed.
+    Directories are watched one by one, so ignored ones cost nothing.
+    """
+
+    def __init__(self, directories: Iterable[str]):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._errno = ctypes.get_errno
+        self.directories = {}
+        for directory in directories:
+            self.watch(directory)
+
+    def watch(self, directory: str):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            code = self._errno()
+            if code == errno.ENOSPC:
+                raise OSError(code, "inotify watch limit reached; raise fs.inotify.max_user_watches or use --poll")
+            if code != errno.ENOENT:
+                raise OSError(code, f"Cannot watch {directory}")
+            return
+        self.directories[wd] = directory
+
+    def changes(self, timeout: float) -> list[tuple[str, str]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changes = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                raise OSError("inotify event queue overflowed")
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changes.append(("dir", path))
+            elif not mask & IN_CREATE:
+                # A created file is reported again once it is closed
+                changes.append(("file", path))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher(Watcher):
+    """
+    Portable fallback: stats the known files and directories every
+    `interval` seconds. Only directories whose mtime changed are listed
+    again, so new and deleted files are found without rescanning the tree.
+    """
+
+    def __init__(self, directories: Iterable[str], files: Iterable[str], interval: float = DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+        # `watch` runs on the event loop and `changes` on the pump thread; both update the maps
+        self.lock = threading.Lock()
+        self.files = {path: self._stat(path) for path in files}
+        self.directories = {}
+        for directory in directories:
+            self.watch(directory)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def watch(self, directory: str):
+        st = self._stat(directory)
+        if st is None:
+            return
+        entries = [(entry.path, self._stat(entry.path)) for entry in os.scandir(directory) if entry.is_file()]
+        with self.lock:
+            self.directories[directory] = st[0]
+            for path, file_st in entries:
+                self.files.setdefault(path, file_st)
+
+    def changes(self, timeout: float) -> list[tuple[str, str]]:
+        time.sleep(min(timeout, self.interval))
+        with self.lock:
+            return self._scan()
+
+    def _scan(self) -> list[tuple[str, str]]:
+        changes = []
+        for directory, mtime in list(self.directories.items()):
+            st = self._stat(directory)
+            if st is None:
+                del self.directories[directory]
+                continue
+            if st[0] == mtime:
+                continue
+            self.directories[directory] = st[0]
+            for entry in os.scandir(directory):
+                if entry.is_dir(follow_symlinks=False) and entry.path not in self.directories:
+                    changes.append(("dir", entry.path))
+                elif entry.is_file() and entry.path not in self.files:
+                    self.files[entry.path] = None
+        for path, before in list(self.files.items()):
+            after = self._stat(path)
+            if after != before:
+                changes.append(("file", path))
+                if after is None:
+                    del self.files[path]
+                else:
+                    self.files[path] = after
+        return changes
+
+def open_watcher(directories: list[str], files: list[str], poll: bool = False, interval: float = DEFAULT_POLL_INTERVAL) -> Watcher:
+    """
+    An inotify watcher where the platform has one, unless `poll` is set or
+    inotify is unavailable, otherwise a polling watcher.
+    """
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, files, interval)
+
+def walk_new_directory(directory: str, accepts_dir: Callable[[str], bool]) -> tuple[list[str], list[str]]:
+    """
+    Lists the directories and files inside a directory that appeared while
+    watching (e.g. a checkout), since their own events were missed.
+    """
+    directories, files = [], []
+    for current, subdirs, names in os.walk(directory):
+        subdirs[:] = [d for d in subdirs if accepts_dir(os.path.join(current, d))]
+        directories.append(current)
+        files.extend(os.path.join(current, name) for name in names)
+    return directories, files
+
+async def watch_loop(
+    watcher: Watcher,
+    accepts: Callable[[str], bool],
+    accepts_dir: Callable[[str], bool],
+    regenerate: Callable[[str, bool, float], Awaitable[Optional[Iterable[str]]]],
+    debounce: float = DEFAULT_DEBOUNCE,
+    jobs: int = 4,
+    on_cancel: Optional[Callable[[str], None]] = None,
+    on_error: Optional[Callable[[str, Exception], None]] = None,
+):
+    """
+    Runs until cancelled, calling `regenerate(path, forced, changed_at)` for
+    changed files accepted by `accepts`.
+
+    Changes are coalesced per file and only acted on once no change has
+    arrived for `debounce` seconds, so a burst of saves (a formatter, a
+    branch switch) costs one regeneration per file. A newer change to a
+    file cancels its regeneration still in flight, model call included.
+    `regenerate` may return more files to regenerate even though they did
+    not change (`forced`), e.g. the importers of a file whose interface
+    changed. At most `jobs` regenerations run at once.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def pump():
+        # The watcher blocks, so it runs on its own thread and hands changes to the loop
+        while not stop.is_set():
+            try:
+                changes = watcher.changes(0.5)
+            except OSError as e:
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+                return
+            for change in changes:
+                loop.call_soon_threadsafe(queue.put_nowait, change)
+
+    semaphore = asyncio.Semaphore(max(1, jobs))
+    running = {}
+    pending = {}
+
+    async def run_one(path: str, forced: bool, changed_at: float):
+        async with semaphore:
+            try:
+                follow_ups = await regenerate(path, forced, changed_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if on_error is not None:
+                    on_error(path, e)
+                return
+        for follow_up in follow_ups or ():
+            if follow_up not in pending:
+                queue.put_nowait(("forced", follow_up))
+
+    def start(path: str, forced: bool, changed_at: float):
+        task = asyncio.ensure_future(run_one(path, forced, changed_at))
+        running[path] = task
+        task.add_done_callback(lambda t, p=path: running.pop(p) if running.get(p) is t else None)
+
+    thread = threading.Thread(target=pump, name="docuai-watch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                kind, value = await asyncio.wait_for(queue.get(), debounce if pending else None)
+            except asyncio.TimeoutError:
+                # Quiet for `debounce` seconds: the burst is over
+                for path, (forced, changed_at) in pending.items():
+                    start(path, forced, changed_at)
+                pending.clear()
+                continue
+
+            if kind == "error":
+                raise value
+            if kind == "dir":
+                if accepts_dir(value):
+                    directories, files = walk_new_directory(value, accepts_dir)
+                    for directory in directories:
+                        watcher.watch(directory)
+                    for path in files:
+                        queue.put_nowait(("file", path))
+                continue
+            if kind == "file" and not accepts(value):
+                continue
+
+            forced = kind == "forced"
+            previous = pending.get(value)
+            pending[value] = (forced or (previous is not None and previous[0]), time.monotonic())
+            task = running.pop(value, None)
+            if task is not None and not task.done():
+                # Made stale by the newer change
+                task.cancel()
+                if on_cancel is not None:
+                    on_cancel(value)
+    finally:
+        stop.set()
+        for task in running.values():
+            task.cancel()
+        thread.join(timeout=1)
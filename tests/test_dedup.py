@@ -0,0 +1,28 @@
+from docuai.dedup import find_duplicates, normalize
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_floor_division_is_not_a_comment(tmp_path):
+    a = write(tmp_path, "a.py", "def half(n):\n    return n // 2\n")
+    b = write(tmp_path, "b.py", "def half(n):\n    return n // 3 + launch_missiles()\n")
+    assert find_duplicates([a, b]).clusters == []
+
+def test_url_strings_are_not_comments(tmp_path):
+    a = write(tmp_path, "a.js", 'const url = "http://example.com/a";\n')
+    b = write(tmp_path, "b.js", 'const url = "http://evil.example/b";\n')
+    assert find_duplicates([a, b]).clusters == []
+
+def test_comments_are_ignored(tmp_path):
+    a = write(tmp_path, "a.py", "x = 1  # one\n")
+    b = write(tmp_path, "b.py", "# set x\nx = 1\n")
+    c = write(tmp_path, "c.js", "/* set */ let x = 1; // one\n")
+    d = write(tmp_path, "d.js", "let x = 1;\n")
+    clusters = find_duplicates([a, b, c, d])
+    assert sorted(map(sorted, clusters.clusters)) == [[a, b], [c, d]]
+    assert clusters.exact == 2
+
+def test_python_hash_inside_string_is_kept():
+    assert normalize('s = "#x"  # note\n', "m.py") == ["s", "=", '"', "#", "x", '"']
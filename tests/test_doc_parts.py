@@ -0,0 +1,22 @@
+import pytest
+
+from docuai.agent import DocuAIAgent
+from docuai.chunking import MIN_PART_TOKENS
+from docuai.parsers import get_parser
+from docuai.tokens import DEFAULT_OUTPUT_RESERVE
+
+@pytest.fixture
+def large_file(tmp_path):
+    path = tmp_path / "big.py"
+    path.write_text("".join(f"def f{i}(x):\n    return x + {i}  # {'padding ' * 8}\n\n" for i in range(600)))
+    return get_parser(str(path)).parse_compact(str(path))
+
+def test_parts_fit_the_context_limit(large_file):
+    agent = DocuAIAgent(context_limit=DEFAULT_OUTPUT_RESERVE + 3000)
+    parts = agent._doc_parts(large_file, agent._doc_inputs(large_file, record=False))
+    assert len(parts) > 1
+
+def test_too_small_context_limit_is_a_clear_error(large_file):
+    agent = DocuAIAgent(context_limit=DEFAULT_OUTPUT_RESERVE + MIN_PART_TOKENS // 2)
+    with pytest.raises(ValueError, match="raise the context limit"):
+        agent._doc_parts(large_file, agent._doc_inputs(large_file, record=False))
@@ -0,0 +1,109 @@
+import os
+import subprocess
+
+import pytest
+
+from docuai.git_utils import cleanup_repo, clone_repo
+
+pytestmark = pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL) != 0, reason="git is not installed")
+
+def git(*args, cwd=None) -> str:
+    return subprocess.check_output(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", "-c", "init.defaultBranch=main", *args],
+        cwd=cwd, text=True
+    ).strip()
+
+def commit(work, files: dict, message: str):
+    for path, text in files.items():
+        os.makedirs(os.path.dirname(os.path.join(work, path)) or work, exist_ok=True)
+        with open(os.path.join(work, path), "w") as f:
+            f.write(text)
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", message, cwd=work)
+    git("push", "-q", "origin", "HEAD:main", "--tags", cwd=work)
+
+@pytest.fixture
+def remote(tmp_path):
+    """
+    A bare repository served over file:// (so depth and filters apply), with
+    a tag `v1` one commit behind `main`.
+    """
+    bare = tmp_path / "remote.git"
+    work = tmp_path / "work"
+    git("init", "-q", "--bare", str(bare))
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    git("clone", "-q", str(bare), str(work))
+    commit(work, {"app.py": "VERSION = 1\n", "README.md": "docs\n"}, "first")
+    git("tag", "v1", cwd=work)
+    commit(work, {"app.py": "VERSION = 2\n", "pkg/util.js": "export const x = 1;\n"}, "second")
+    return f"file://{bare}", work
+
+def read(directory, path) -> str:
+    with open(os.path.join(directory, path)) as f:
+        return f.read()
+
+def test_plain_clone_has_full_history(remote):
+    url, _ = remote
+    clone = clone_repo(url)
+    try:
+        assert read(clone, "app.py") == "VERSION = 2\n"
+        assert git("rev-list", "--count", "HEAD", cwd=clone) == "2"
+    finally:
+        cleanup_repo(clone)
+
+def test_depth_makes_a_shallow_clone(remote):
+    url, _ = remote
+    clone = clone_repo(url, depth=1)
+    try:
+        assert git("rev-list", "--count", "HEAD", cwd=clone) == "1"
+        assert git("rev-parse", "--is-shallow-repository", cwd=clone) == "true"
+    finally:
+        cleanup_repo(clone)
+
+def test_filter_makes_a_partial_clone(remote):
+    url, _ = remote
+    clone = clone_repo(url, blob_filter="blob:none")
+    try:
+        assert git("config", "remote.origin.partialclonefilter", cwd=clone) == "blob:none"
+        assert read(clone, "pkg/util.js") == "export const x = 1;\n"
+    finally:
+        cleanup_repo(clone)
+
+def test_ref_checks_out_a_tag(remote):
+    url, _ = remote
+    clone = clone_repo(url, ref="v1")
+    try:
+        assert read(clone, "app.py") == "VERSION = 1\n"
+        assert not os.path.exists(os.path.join(clone, "pkg"))
+    finally:
+        cleanup_repo(clone)
+
+def test_mirror_exports_sources_and_refetches(remote, tmp_path):
+    url, work = remote
+    mirrors = tmp_path / "mirrors"
+
+    first = clone_repo(url, mirror_dir=str(mirrors))
+    try:
+        # Only supported source files are written, with no working tree
+        assert sorted(os.listdir(first)) == ["app.py", "pkg"]
+        assert read(first, "app.py") == "VERSION = 2\n"
+    finally:
+        cleanup_repo(first)
+    assert len(os.listdir(mirrors)) == 1
+
+    commit(work, {"app.py": "VERSION = 3\n"}, "third")
+    second = clone_repo(url, ref="v1", mirror_dir=str(mirrors))
+    latest = clone_repo(url, mirror_dir=str(mirrors))
+    try:
+        assert read(second, "app.py") == "VERSION = 1\n"
+        assert read(latest, "app.py") == "VERSION = 3\n"
+    finally:
+        cleanup_repo(second)
+        cleanup_repo(latest)
+    # Fetched into the same mirror, and no interrupted clone was left behind
+    assert len(os.listdir(mirrors)) == 1
+
+def test_mirror_rejects_depth(remote, tmp_path):
+    url, _ = remote
+    with pytest.raises(ValueError, match="full history"):
+        clone_repo(url, depth=1, mirror_dir=str(tmp_path / "mirrors"))
@@ -0,0 +1,58 @@
+import pytest
+from docuai.parsers import ts_parser
+from docuai.parsers.js_parser import JSParser
+
+BACKENDS = [
+    pytest.param(JSParser, id="esprima"),
+    pytest.param(
+        ts_parser.TreeSitterParser, id="tree-sitter",
+        marks=pytest.mark.skipif(not ts_parser.available(), reason="tree-sitter is not installed"),
+    ),
+]
+
+def parse(parser_class, tmp_path, source, name="mod.js"):
+    path = tmp_path / name
+    path.write_text(source)
+    return parser_class().parse(str(path))
+
+def names(metadata):
+    return [f.name for f in metadata.functions], [c.name for c in metadata.classes]
+
+@pytest.mark.parametrize("parser_class", BACKENDS)
+def test_declarations_inside_an_iife(parser_class, tmp_path):
+    metadata = parse(parser_class, tmp_path, "(function(){ function helper(){} class Widget{} })()\n")
+    assert names(metadata) == (["helper"], ["Widget"])
+
+@pytest.mark.parametrize("parser_class", BACKENDS)
+def test_declarations_inside_a_callback(parser_class, tmp_path):
+    metadata = parse(parser_class, tmp_path, "describe('x', () => { function inner(){} })\n")
+    assert names(metadata) == (["inner"], [])
+
+@pytest.mark.parametrize("parser_class", BACKENDS)
+def test_declarations_inside_statements_and_members(parser_class, tmp_path):
+    source = (
+        "for (;;) { function inLoop(){} }\n"
+        "switch (a) { case 1: function inCase(){} }\n"
+        "outer: { function labeled(){} }\n"
+        "const obj = { run() { function inMethod(){} } };\n"
+        "class Box { open() { function inClass(){} } }\n"
+    )
+    functions, classes = names(parse(parser_class, tmp_path, source))
+    assert functions == ["inLoop", "inCase", "labeled", "inMethod", "inClass"]
+    assert classes == ["Box"]
+
+@pytest.mark.parametrize("parser_class", BACKENDS)
+@pytest.mark.parametrize("source, expected", [
+    ("export default function(){}\n", (["default"], [])),
+    ("export default () => {}\n", (["default"], [])),
+    ("export default class { open(){} }\n", ([], ["default"])),
+])
+def test_default_exports(parser_class, tmp_path, source, expected):
+    assert names(parse(parser_class, tmp_path, source)) == expected
+
+@pytest.mark.parametrize("parser_class", BACKENDS)
+def test_method_keys(parser_class, tmp_path):
+    source = "class Bag { [Symbol.iterator]() {} 'str'() {} add(x) {} }\n"
+    metadata = parse(parser_class, tmp_path, source)
+    methods = [m.name for m in metadata.classes[0].methods]
+    assert "add" in methods and None not in methods
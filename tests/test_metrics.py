@@ -0,0 +1,27 @@
+import pytest
+
+from docuai.metrics import MAX_FUNCTION_LINES, FileMetrics, measure_file
+from docuai.parsers import ts_parser
+
+@pytest.mark.skipif(not ts_parser.available(), reason="tree-sitter is not installed")
+def test_typescript_is_measured(tmp_path):
+    path = tmp_path / "mod.ts"
+    path.write_text(
+        "function f(a: number, b?: string): void {\n"
+        "    if (a && b) {\n"
+        "        for (const x of [a]) {}\n"
+        "    }\n"
+        "}\n"
+        "const g = (x: number) => x ? 1 : 2;\n"
+    )
+    metrics = measure_file(str(path))
+    assert not metrics.unparsed
+    functions = {f.name: f for f in metrics.functions}
+    assert (functions["f"].complexity, functions["f"].nesting, functions["f"].params) == (4, 2, 2)
+    assert functions["g"].complexity == 2
+
+def test_unparsed_files_are_scored_by_size():
+    short = FileMetrics("a.ts", MAX_FUNCTION_LINES, unparsed=True)
+    long = FileMetrics("b.ts", 3 * MAX_FUNCTION_LINES, unparsed=True)
+    assert short.score == 0
+    assert long.score == 2
@@ -0,0 +1,53 @@
+import pytest
+
+from docuai.parsers import JS_PARSER_ENV, ts_parser
+from docuai.prompt_compaction import compact
+
+BODY = "".join(f"    a += {i};\n" for i in range(6))
+
+BACKENDS = [
+    "esprima",
+    pytest.param("tree-sitter", marks=pytest.mark.skipif(not ts_parser.available(), reason="tree-sitter is not installed")),
+]
+
+def test_python_signatures_keep_public_bodies():
+    body = BODY.replace(";", "")
+    method = body.replace("    ", "        ")
+    source = f"def pub():\n{body}\ndef _helper():\n{body}\nclass A:\n    def m(self):\n{method}\n    def _p(self):\n{method}"
+    compacted = compact(source, "mod.py", "signatures")
+    assert compacted.count("a += 5") == 2
+    assert "def _helper():\n    ..." in compacted
+    assert "def _p(self):\n        ..." in compacted
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_js_signatures_keep_exported_bodies(monkeypatch, backend):
+    monkeypatch.setenv(JS_PARSER_ENV, backend)
+    source = (
+        f"export function pub() {{\n{BODY}}}\n"
+        f"function helper() {{\n{BODY}}}\n"
+        f"export class A {{\n  m() {{\n{BODY}  }}\n  _p() {{\n{BODY}  }}\n}}\n"
+    )
+    compacted = compact(source, "mod.js", "signatures")
+    assert compacted.count("a += 5") == 2
+    assert "function helper() { ... }" in compacted
+    assert "_p() { ... }" in compacted
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_js_script_without_exports_keeps_declarations(monkeypatch, backend):
+    monkeypatch.setenv(JS_PARSER_ENV, backend)
+    source = f"function main() {{\n{BODY}}}\nsetTimeout(function () {{\n{BODY}}});\n"
+    compacted = compact(source, "script.js", "signatures")
+    assert compacted.count("a += 5") == 1
+    assert "function () { ... }" in compacted
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_long_strings_keep_their_delimiters(monkeypatch, backend):
+    monkeypatch.setenv(JS_PARSER_ENV, backend)
+    long = "café \\n " * 40
+    source = f"const a = `{long}`;\nconst b = '{long}';\nconst c = `${{long}} {long}`;\n"
+    compacted = compact(source, "mod.js", "literals").split("\n")
+    # esprima has no template-literal data, so only tree-sitter cuts the first line
+    if backend == "tree-sitter":
+        assert compacted[0].startswith("const a = `café \\n ") and "` ... (" in compacted[0]
+    assert compacted[1].startswith("const b = 'café \\n ") and "' ... (" in compacted[1]
+    assert compacted[2] == source.split("\n")[2]
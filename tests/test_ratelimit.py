@@ -0,0 +1,191 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import openai
+import pytest
+from langchain_openai import ChatOpenAI
+
+from docuai.agent import DocuAIAgent
+from docuai.ratelimit import RateLimiter
+
+def api_error(status: int, headers: dict = None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "http://stub/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    error_class = openai.RateLimitError if status == 429 else openai.InternalServerError
+    return error_class("stub error", response=response, body=None)
+
+class Flaky:
+    """
+    Fails with the given errors, in order, then returns "ok" after `work` seconds.
+    """
+
+    def __init__(self, errors, work: float = 0.0):
+        self.errors = list(errors)
+        self.work = work
+        self.attempts = []
+
+    def __call__(self):
+        self.attempts.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        time.sleep(self.work)
+        return "ok"
+
+def test_retry_after_ms_is_honoured():
+    limiter = RateLimiter(max_retries=3)
+    fn = Flaky([api_error(429, {"retry-after-ms": "300"})], work=0.1)
+    assert limiter.call(fn) == "ok"
+    assert fn.attempts[1] - fn.attempts[0] >= 0.3
+    assert limiter.retries == 1
+    # The wait counts as throttled, the successful call as working
+    assert 0.28 <= limiter.throttled_seconds < 0.4
+    assert 0.1 <= limiter.working_seconds < 0.25
+
+def test_retry_after_seconds_on_server_error():
+    limiter = RateLimiter(max_retries=3)
+    fn = Flaky([api_error(503, {"retry-after": "0.2"})])
+    assert limiter.call(fn) == "ok"
+    assert fn.attempts[1] - fn.attempts[0] >= 0.2
+    assert limiter.throttled_seconds >= 0.19
+
+def test_exponential_backoff_without_retry_after():
+    limiter = RateLimiter(max_retries=3, base_delay=0.05)
+    fn = Flaky([api_error(500), api_error(502)])
+    assert limiter.call(fn) == "ok"
+    assert limiter.retries == 2
+    # Jittered between half and all of 0.05 then 0.1 seconds
+    assert fn.attempts[2] - fn.attempts[0] >= 0.07
+
+def test_gives_up_after_max_retries():
+    limiter = RateLimiter(max_retries=1, base_delay=0.01)
+    fn = Flaky([api_error(429), api_error(429)])
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(fn)
+    assert len(fn.attempts) == 2
+
+def test_client_errors_are_not_retried():
+    limiter = RateLimiter(max_retries=3)
+    request = httpx.Request("POST", "http://stub")
+    error = openai.BadRequestError("bad", response=httpx.Response(400, request=request), body=None)
+    fn = Flaky([error])
+    with pytest.raises(openai.BadRequestError):
+        limiter.call(fn)
+    assert limiter.retries == 0
+
+def test_acall_honours_retry_after():
+    limiter = RateLimiter(max_retries=3)
+    attempts = []
+
+    async def fn():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise api_error(429, {"retry-after-ms": "200"})
+        return "ok"
+
+    assert asyncio.run(limiter.acall(fn)) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+    assert limiter.throttled_seconds >= 0.19
+
+def test_stream_is_retried_until_its_first_item():
+    limiter = RateLimiter(max_retries=3)
+    opened = []
+
+    def open_stream():
+        opened.append(time.monotonic())
+        if len(opened) == 1:
+            raise api_error(429, {"retry-after-ms": "100"})
+        yield "a"
+        yield "b"
+
+    assert list(limiter.stream(open_stream)) == ["a", "b"]
+    assert len(opened) == 2 and opened[1] - opened[0] >= 0.1
+
+def test_stream_failure_after_output_is_not_retried():
+    limiter = RateLimiter(max_retries=3)
+    opened = []
+
+    def open_stream():
+        opened.append(1)
+        yield "a"
+        raise api_error(503)
+
+    chunks = limiter.stream(open_stream)
+    assert next(chunks) == "a"
+    with pytest.raises(openai.InternalServerError):
+        next(chunks)
+    assert len(opened) == 1
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Chat completions endpoint that answers the first request with 429 and
+    `retry-after-ms`, then with a completion (streamed if asked).
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.requests.append(time.monotonic())
+        if len(server.requests) == 1:
+            self.send_response(429)
+            self.send_header("retry-after-ms", "250")
+            self.send_header("Content-Type", "application/json")
+            payload = json.dumps({"error": {"message": "slow down", "type": "rate_limit"}}).encode()
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for text in ("stub ", "docs"):
+                chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                         "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        payload = json.dumps({
+            "id": "c", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "stub docs"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+@pytest.fixture
+def stub_agent():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # As build_agent does with a rate limiter: the limiter owns retries
+    llm = ChatOpenAI(model="gpt-4o", api_key="stub", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+    agent = DocuAIAgent(llm=llm, rate_limiter=RateLimiter(rpm=600, max_retries=3))
+    try:
+        yield agent, server
+    finally:
+        server.shutdown()
+
+@pytest.mark.parametrize("streamed", [False, True], ids=["call", "stream"])
+def test_stub_server_rate_limit(stub_agent, tmp_path, streamed):
+    agent, server = stub_agent
+    path = tmp_path / "mod.py"
+    path.write_text("def f():\n    return 1\n")
+    if streamed:
+        text = "".join(agent.stream_analysis(str(path)))
+    else:
+        text = agent.analyze_code(str(path))
+    assert text == "stub docs"
+    assert len(server.requests) == 2
+    assert server.requests[1] - server.requests[0] >= 0.25
+    assert agent.rate_limiter.retries == 1
+    assert agent.rate_limiter.throttled_seconds >= 0.24